@@ -0,0 +1,32 @@
+"""
+Ahead-of-time build of the behavior signature kernels.
+
+Compiles the numeric kernels from behavior_signatures into a native
+``behavior_kernels`` extension next to this file, so serving processes
+don't pay Numba JIT compilation on their first classification. Run at
+deploy time (requires numba and a C compiler):
+
+    python -m app._behavior_kernels_aot
+
+behavior_signatures falls back to the JIT kernels when the extension is
+missing. The parallel batch kernel is always JIT-compiled (AOT does not
+support prange).
+"""
+
+import os
+
+from numba.pycc import CC
+
+from .behavior_signatures import _timing_stats, _timing_pattern_id, _score_all, ipt_histogram
+
+cc = CC("behavior_kernels")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+cc.export("timing_stats", "UniTuple(f8, 4)(f8[:])")(_timing_stats.py_func)
+cc.export("timing_pattern_id", "i8(f8)")(_timing_pattern_id.py_func)
+cc.export("score_all", "f8[:, :](i8, f8, f8, i8, f8, f8, f8)")(_score_all.py_func)
+cc.export("ipt_histogram", "i8[:](f8[:], i8, f8)")(ipt_histogram.py_func)
+
+
+if __name__ == "__main__":
+    cc.compile()
@@ -1,19 +1,31 @@
 """
 Authentication module for Police Officer Login with OTP
-Uses Twilio Free Tier for SMS and MongoDB for storage
+Uses Twilio Free Tier for SMS and MongoDB (async Motor driver) for storage
 """
 
 from fastapi import APIRouter, HTTPException, status, Request
-from pydantic import BaseModel, validator
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, StringConstraints
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Annotated, Optional
 from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+import asyncio
+import base64
+import calendar
+import hashlib
+import hmac
+import json
 import secrets
-import re
 import os
 from dotenv import load_dotenv
+from cachetools import TTLCache
 import jwt
 import logging
 
-from .database import get_db
+from .database import get_async_db
 
 load_dotenv()
 
@@ -21,28 +33,119 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+@dataclass(frozen=True)
+class AuthConfig:
+    """Auth settings, read from the environment once at import"""
+    otp_length: int = 6
+    otp_expiry_seconds: int = 120
+    otp_rate_limit_count: int = 5
+    otp_max_attempts: int = 3
+    jwt_secret_key: str = 'default-secret-key'
+    jwt_algorithm: str = 'HS256'
+    jwt_expire_hours: int = 8
+    twilio_phone_number: Optional[str] = None
+    sms_per_second: float = 1.0
+    environment: Optional[str] = None
+    
+    @classmethod
+    def from_env(cls) -> 'AuthConfig':
+        """Build config from environment variables, falling back to defaults"""
+        sms_per_second = float(os.getenv('SMS_PER_SEC', 1.0))
+        if sms_per_second <= 0:
+            # The SMS worker paces sends at 1/sms_per_second seconds
+            raise ValueError(f"SMS_PER_SEC must be positive, got {sms_per_second}")
+        return cls(
+            otp_length=int(os.getenv('OTP_LENGTH', 6)),
+            otp_expiry_seconds=int(os.getenv('OTP_EXPIRY_SECONDS', 120)),
+            otp_rate_limit_count=int(os.getenv('OTP_RATE_LIMIT_COUNT', 5)),
+            otp_max_attempts=int(os.getenv('OTP_MAX_ATTEMPTS', 3)),
+            jwt_secret_key=os.getenv('JWT_SECRET_KEY', 'default-secret-key'),
+            jwt_algorithm=os.getenv('JWT_ALGORITHM', 'HS256'),
+            jwt_expire_hours=int(os.getenv('JWT_EXPIRE_HOURS', 8)),
+            twilio_phone_number=os.getenv('TWILIO_PHONE_NUMBER'),
+            sms_per_second=sms_per_second,
+            environment=os.getenv('ENVIRONMENT'),
+        )
+
+CFG = AuthConfig.from_env()
+
 # ============================================================================
 # MONGODB CONNECTION
 # ============================================================================
 
-def get_database():
-    """Get database instance from unified database module"""
-    return get_db()
+async def get_database():
+    """Get async database instance from unified database module"""
+    return await get_async_db()
 
-def get_otp_collection():
+# Unique compound index used for every per-officer OTP lookup
+OTP_LOOKUP_INDEX = [("login_id", 1), ("mobile_number", 1)]
+OTP_LOOKUP_INDEX_NAME = "login_id_1_mobile_number_1"
+
+# Bound once by the startup hook so request handlers skip the connection lookup
+_otp_collection = None
+
+async def get_otp_collection():
     """Get OTP collection"""
-    db = get_database()
-    collection = db.get_collection('otp_records')
-    # Create indexes for better performance
-    collection.create_index([("expires_at", 1)], expireAfterSeconds=0)
-    collection.create_index([("login_id", 1), ("mobile_number", 1)])
-    return collection
-
-def get_user_collection():
+    if _otp_collection is not None:
+        return _otp_collection
+    db = await get_database()
+    return db.get_collection('otp_records')
+
+async def get_user_collection():
     """Get user collection"""
-    db = get_database()
+    db = await get_database()
     return db.get_collection('users')
 
+async def create_otp_indexes(collection):
+    """Create OTP collection indexes (run once at startup)"""
+    # TTL only over pending OTPs keeps the index (and the TTL monitor's scan) small
+    existing = await collection.index_information()
+    if "expires_at_1" in existing and "partialFilterExpression" not in existing["expires_at_1"]:
+        # Replace the full TTL index created by earlier versions
+        await collection.drop_index("expires_at_1")
+    await collection.create_index(
+        [("expires_at", 1)],
+        expireAfterSeconds=0,
+        partialFilterExpression={"verified": False}
+    )
+    # One active OTP per officer/mobile pair; also the lookup path for upserts
+    lookup = existing.get(OTP_LOOKUP_INDEX_NAME)
+    if lookup is None or not lookup.get("unique"):
+        if lookup is not None:
+            # Earlier versions built the same keys without uniqueness, which
+            # would make create_index fail with IndexKeySpecsConflict
+            await collection.drop_index(OTP_LOOKUP_INDEX_NAME)
+        await delete_duplicate_otps(collection)
+    await collection.create_index(OTP_LOOKUP_INDEX, unique=True)
+
+async def delete_duplicate_otps(collection) -> int:
+    """
+    Keep only the newest OTP per officer/mobile pair so the unique index can
+    build. Older duplicates are stale anyway: verify_otp only ever checks
+    the code from the latest send.
+    """
+    stale_ids = []
+    duplicates = collection.aggregate([
+        {"$sort": {"created_at": -1}},
+        {"$group": {
+            "_id": {"login_id": "$login_id", "mobile_number": "$mobile_number"},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ])
+    async for group in duplicates:
+        stale_ids.extend(group["ids"][1:])
+    if not stale_ids:
+        return 0
+    result = await collection.delete_many({"_id": {"$in": stale_ids}})
+    logger.warning(f"Deleted {result.deleted_count} duplicate OTP records before building unique index")
+    return result.deleted_count
+
 # ============================================================================
 # TWILIO CONFIGURATION (FREE TIER)
 # ============================================================================
@@ -66,48 +169,49 @@ def get_twilio_client():
 
 twilio_client = get_twilio_client()
 
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+# Per-IP OTP request counters for a fixed one-minute window. Counters live in
+# process memory, so each worker enforces its own limit.
+RATE_LIMIT_WINDOW_SECONDS = 60
+rate_limit_cache = TTLCache(maxsize=100_000, ttl=RATE_LIMIT_WINDOW_SECONDS)
+
+def check_rate_limit(client_ip: str) -> bool:
+    """Count an OTP request for client_ip; False if the limit is exceeded"""
+    counter = rate_limit_cache.get(client_ip)
+    if counter is None:
+        # Window starts at the first request; in-place increments below
+        # don't reset the TTL
+        rate_limit_cache[client_ip] = [1]
+        return True
+    if counter[0] >= CFG.otp_rate_limit_count:
+        return False
+    counter[0] += 1
+    return True
+
 # ============================================================================
 # REQUEST/RESPONSE MODELS
 # ============================================================================
 
+# Validated field types; constraints run in pydantic-core, with no Python
+# validator callbacks per request
+LoginId = Annotated[str, StringConstraints(strip_whitespace=True, min_length=3)]
+# Indian mobile: 10 digits, or international format like 919876543210
+MobileNumber = Annotated[str, StringConstraints(pattern=r'^(?:[6-9]\d{9}|91[6-9]\d{9})$')]
+OTPCode = Annotated[str, StringConstraints(pattern=r'^\d{6}$')]
+
 class SendOTPRequest(BaseModel):
     """Request model for sending OTP"""
-    loginId: str
-    mobileNumber: str
-    
-    @validator('loginId')
-    def validate_login_id(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Login ID cannot be empty')
-        if len(v) < 3:
-            raise ValueError('Login ID must be at least 3 characters')
-        return v.strip()
-    
-    @validator('mobileNumber')
-    def validate_mobile(cls, v):
-        # Support both Indian numbers (10 digits) and international format
-        if len(v) == 10:
-            if not re.match(r'^[6-9]\d{9}$', v):
-                raise ValueError('Invalid Indian mobile number')
-        elif len(v) == 12 and v.startswith('91'):
-            # International format like 919876543210
-            if not re.match(r'^91[6-9]\d{9}$', v):
-                raise ValueError('Invalid Indian mobile number')
-        else:
-            raise ValueError('Mobile must be 10 digits or +91 format')
-        return v
+    loginId: LoginId
+    mobileNumber: MobileNumber
 
 class VerifyOTPRequest(BaseModel):
     """Request model for verifying OTP"""
     loginId: str
     mobileNumber: str
-    otp: str
-    
-    @validator('otp')
-    def validate_otp(cls, v):
-        if not re.match(r'^\d{6}$', v):
-            raise ValueError('OTP must be 6 digits')
-        return v
+    otp: OTPCode
 
 class OTPResponse(BaseModel):
     """Response model for OTP operations"""
@@ -126,81 +230,133 @@ class LoginResponse(BaseModel):
 # OTP FUNCTIONS
 # ============================================================================
 
+OTP_MODULUS = 10 ** CFG.otp_length
+
 def generate_otp() -> str:
-    """Generate a random 6-digit OTP"""
-    otp_length = int(os.getenv('OTP_LENGTH', 6))
-    return str(int(secrets.token_hex(3), 16) % (10 ** otp_length)).zfill(otp_length)
+    """Generate a random 6-digit OTP (uniform, no modulo bias)"""
+    return f"{secrets.randbelow(OTP_MODULUS):0{CFG.otp_length}d}"
 
-def store_otp(login_id: str, mobile: str, otp: str) -> bool:
+async def store_otp(login_id: str, mobile: str, otp: str, now: Optional[datetime] = None) -> bool:
     """Store OTP in MongoDB with expiry"""
     try:
-        expiry_seconds = int(os.getenv('OTP_EXPIRY_SECONDS', 120))
-        
+        now = now or datetime.utcnow()
         otp_record = {
             'login_id': login_id,
             'mobile_number': mobile,
             'otp_code': otp,
-            'created_at': datetime.utcnow(),
-            'expires_at': datetime.utcnow() + timedelta(seconds=expiry_seconds),
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=CFG.otp_expiry_seconds),
             'attempts': 0,
             'verified': False
         }
         
-        # Delete old OTP for this user first
-        get_otp_collection().delete_many({
-            'login_id': login_id,
-            'mobile_number': mobile
-        })
+        collection = await get_otp_collection()
         
-        # Insert new OTP
-        result = get_otp_collection().insert_one(otp_record)
+        # Replace any old OTP for this user in a single atomic upsert
+        result = await collection.replace_one(
+            {
+                'login_id': login_id,
+                'mobile_number': mobile
+            },
+            otp_record,
+            upsert=True
+        )
         logger.info(f"OTP stored for {login_id}: {otp}")
-        return result.inserted_id is not None
+        return result.acknowledged
     
     except Exception as e:
         logger.error(f"Error storing OTP: {str(e)}")
         return False
 
-def get_otp_record(login_id: str, mobile: str):
+async def get_otp_record(login_id: str, mobile: str, now: Optional[datetime] = None):
     """Retrieve OTP record from MongoDB"""
     try:
-        record = get_otp_collection().find_one({
-            'login_id': login_id,
-            'mobile_number': mobile,
-            'expires_at': {'$gt': datetime.utcnow()}  # Not expired
-        })
+        collection = await get_otp_collection()
+        record = await collection.find_one(
+            {
+                'login_id': login_id,
+                'mobile_number': mobile,
+                'expires_at': {'$gt': now or datetime.utcnow()}  # Not expired
+            },
+            # Only the fields verify_otp reads (find_one already limits to 1)
+            projection={'_id': 0, 'otp_code': 1, 'attempts': 1, 'expires_at': 1},
+            # Force the unique (login_id, mobile_number) index
+            hint=OTP_LOOKUP_INDEX
+        )
         return record
     except Exception as e:
         logger.error(f"Error retrieving OTP: {str(e)}")
         return None
 
-def delete_otp(login_id: str, mobile: str):
+async def delete_otp(login_id: str, mobile: str):
     """Delete OTP after successful verification"""
     try:
-        get_otp_collection().delete_one({
+        collection = await get_otp_collection()
+        await collection.delete_one({
             'login_id': login_id,
             'mobile_number': mobile
         })
     except Exception as e:
         logger.error(f"Error deleting OTP: {str(e)}")
 
-def increment_attempts(login_id: str, mobile: str):
-    """Increment verification attempts"""
+async def claim_attempt(login_id: str, mobile: str, max_attempts: int, now: Optional[datetime] = None):
+    """
+    Atomically count a verification attempt against an unexpired, unlocked OTP.
+    Returns the record as it was before the increment, or None if the OTP is
+    expired, missing or already locked.
+    """
     try:
-        get_otp_collection().update_one(
+        collection = await get_otp_collection()
+        return await collection.find_one_and_update(
             {
                 'login_id': login_id,
-                'mobile_number': mobile
+                'mobile_number': mobile,
+                'expires_at': {'$gt': now or datetime.utcnow()},  # Not expired
+                'attempts': {'$lt': max_attempts}  # Not locked
             },
-            {'$inc': {'attempts': 1}}
+            {'$inc': {'attempts': 1}},
+            projection={'_id': 0, 'otp_code': 1, 'attempts': 1},
+            return_document=ReturnDocument.BEFORE
         )
     except Exception as e:
-        logger.error(f"Error incrementing attempts: {str(e)}")
+        logger.error(f"Error claiming OTP attempt: {str(e)}")
+        return None
+
+async def consume_otp(login_id: str, mobile: str, otp: str) -> bool:
+    """
+    Delete a verified OTP. Returns False if it was already consumed or
+    replaced by a newer OTP, so only one request can log in with it.
+    """
+    try:
+        collection = await get_otp_collection()
+        result = await collection.delete_one({
+            'login_id': login_id,
+            'mobile_number': mobile,
+            'otp_code': otp
+        })
+        return result.deleted_count == 1
+    except Exception as e:
+        logger.error(f"Error consuming OTP: {str(e)}")
+        return False
 
 # ============================================================================
 # SMS FUNCTIONS
 # ============================================================================
 
+SMS_OTP_TEMPLATE = (
+    "Tamil Nadu Police - TOR UNVEIL\n"
+    "Your OTP: %s\n"
+    "Valid for 2 minutes\n"
+    "Do not share with anyone."
+)
+
+@lru_cache(maxsize=4096)
+def format_phone(mobile_number: str) -> str:
+    """Normalize a validated mobile number to E.164 (+91...) for Twilio"""
+    if len(mobile_number) == 10:
+        return f"+91{mobile_number}"
+    return mobile_number if mobile_number.startswith('+') else f"+{mobile_number}"
+
 def send_sms_otp(mobile_number: str, otp_code: str) -> dict:
     """
     Send OTP via SMS using Twilio Free Tier
@@ -210,10 +366,7 @@ def send_sms_otp(mobile_number: str, otp_code: str) -> dict:
     """
     
     # Format phone number for Twilio
-    if len(mobile_number) == 10:
-        phone = f"+91{mobile_number}"
-    else:
-        phone = f"+{mobile_number}" if not mobile_number.startswith('+') else mobile_number
+    phone = format_phone(mobile_number)
     
     try:
         # Check if we have Twilio configured
@@ -226,10 +379,9 @@ def send_sms_otp(mobile_number: str, otp_code: str) -> dict:
             }
         
         # Send via Twilio
-        twilio_phone = os.getenv('TWILIO_PHONE_NUMBER')
         message = twilio_client.messages.create(
-            body=f"Tamil Nadu Police - TOR UNVEIL\nYour OTP: {otp_code}\nValid for 2 minutes\nDo not share with anyone.",
-            from_=twilio_phone,
+            body=SMS_OTP_TEMPLATE % otp_code,
+            from_=CFG.twilio_phone_number,
             to=phone
         )
         
@@ -243,7 +395,7 @@ def send_sms_otp(mobile_number: str, otp_code: str) -> dict:
     except Exception as e:
         logger.error(f"Failed to send SMS to {phone}: {str(e)}")
         # In demo mode, still allow login
-        if os.getenv('ENVIRONMENT') == 'development':
+        if CFG.environment == 'development':
             logger.info(f"Development mode: OTP {otp_code} would be sent to {phone}")
             return {
                 "status": "success",
@@ -255,11 +407,148 @@ def send_sms_otp(mobile_number: str, otp_code: str) -> dict:
             "message": str(e)
         }
 
+# Outbound SMS queue, drained by a single worker at the provider's allowed
+# rate (Twilio: ~1 msg/sec per sending number). Created at startup.
+sms_queue: Optional[asyncio.Queue] = None
+_sms_worker_task: Optional[asyncio.Task] = None
+
+SMS_BUSY_DETAIL = "SMS service is busy. Please try again shortly."
+
+def sms_queue_size() -> int:
+    """
+    Queue bound: messages the worker can send within one OTP lifetime.
+    Anything queued further back would expire before it went out.
+    """
+    return max(1, int(CFG.otp_expiry_seconds * CFG.sms_per_second))
+
+async def sms_worker(queue: asyncio.Queue):
+    """Send queued OTP SMS messages, pacing calls to CFG.sms_per_second"""
+    interval = 1.0 / CFG.sms_per_second
+    while True:
+        mobile_number, otp_code, expires_at = await queue.get()
+        if expires_at <= datetime.utcnow():
+            # The code can no longer be verified; skip it without using a send slot
+            logger.warning(f"Dropping expired queued SMS to {format_phone(mobile_number)}")
+            queue.task_done()
+            continue
+        try:
+            sms_result = await run_in_threadpool(send_sms_otp, mobile_number, otp_code)
+            if sms_result.get("status") != "success":
+                logger.error(f"Queued SMS to {format_phone(mobile_number)} failed: {sms_result.get('message')}")
+        except Exception as e:
+            logger.error(f"SMS worker error: {str(e)}")
+        finally:
+            queue.task_done()
+        await asyncio.sleep(interval)
+
+async def enqueue_sms_otp(mobile_number: str, otp_code: str, expires_at: datetime) -> dict:
+    """
+    Queue an OTP SMS; sends inline if the worker is not running.
+    Raises asyncio.QueueFull when the paced backlog is at capacity.
+    """
+    if sms_queue is None:
+        return await run_in_threadpool(send_sms_otp, mobile_number, otp_code)
+    sms_queue.put_nowait((mobile_number, otp_code, expires_at))
+    return {
+        "status": "success",
+        "message": "OTP queued for delivery",
+        "phone": format_phone(mobile_number)
+    }
+
+# ============================================================================
+# JWT FUNCTIONS
+# ============================================================================
+
+_JWT_HMAC_DIGESTS = {
+    'HS256': hashlib.sha256,
+    'HS384': hashlib.sha384,
+    'HS512': hashlib.sha512,
+}
+
+def _b64url(data: bytes) -> bytes:
+    """Unpadded base64url encoding used by JWS"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+# Header segment and keyed HMAC state are fixed for the process lifetime, so
+# build them once; each token then only hashes its own payload.
+_JWT_HEADER_SEGMENT = _b64url(
+    json.dumps({"alg": CFG.jwt_algorithm, "typ": "JWT"}, separators=(',', ':')).encode()
+)
+_JWT_HMAC = (
+    hmac.new(CFG.jwt_secret_key.encode(), digestmod=_JWT_HMAC_DIGESTS[CFG.jwt_algorithm])
+    if CFG.jwt_algorithm in _JWT_HMAC_DIGESTS else None
+)
+
+def sign_jwt(payload: dict) -> str:
+    """
+    Encode and sign a JWT with the configured secret.
+    Produces the same token as jwt.encode(); non-HMAC algorithms go through PyJWT.
+    """
+    if _JWT_HMAC is None:
+        return jwt.encode(payload, CFG.jwt_secret_key, algorithm=CFG.jwt_algorithm)
+    
+    # Registered time claims are NumericDate (UTC epoch seconds), as in PyJWT
+    claims = {
+        key: calendar.timegm(value.utctimetuple()) if isinstance(value, datetime) else value
+        for key, value in payload.items()
+    }
+    signing_input = (
+        _JWT_HEADER_SEGMENT + b'.' +
+        _b64url(json.dumps(claims, separators=(',', ':')).encode())
+    )
+    mac = _JWT_HMAC.copy()
+    mac.update(signing_input)
+    return (signing_input + b'.' + _b64url(mac.digest())).decode()
+
 # ============================================================================
 # API ROUTER
 # ============================================================================
 
-router = APIRouter(prefix="/api/auth", tags=["authentication"])
+# orjson encodes responses in C, much faster than the stdlib json default
+router = APIRouter(
+    prefix="/api/auth",
+    tags=["authentication"],
+    default_response_class=ORJSONResponse
+)
+
+@router.on_event("startup")
+async def startup_auth_db():
+    """Warm the MongoDB connection pool and create OTP indexes once"""
+    global _otp_collection
+    try:
+        # Connecting pings the server and lets the driver pre-fill minPoolSize
+        db = await get_database()
+        _otp_collection = db.get_collection('otp_records')
+        await create_otp_indexes(_otp_collection)
+    except Exception as e:
+        # Endpoints retry the connection lazily; don't block app startup
+        logger.error(f"Error initialising OTP collection: {str(e)}")
+
+@router.on_event("startup")
+async def start_sms_worker():
+    """Create the SMS queue and start its paced worker"""
+    global sms_queue, _sms_worker_task
+    sms_queue = asyncio.Queue(maxsize=sms_queue_size())
+    _sms_worker_task = asyncio.create_task(sms_worker(sms_queue))
+
+@router.on_event("shutdown")
+async def stop_sms_worker():
+    """Deliver any queued SMS, then stop the SMS worker"""
+    global sms_queue, _sms_worker_task
+    if _sms_worker_task is not None:
+        # Let in-flight sends finish: cancelling mid-send would drop OTPs
+        # and interrupt the threadpool call
+        try:
+            await asyncio.wait_for(sms_queue.join(), timeout=10)
+        except asyncio.TimeoutError:
+            logger.error(f"Dropping {sms_queue.qsize()} queued SMS on shutdown")
+        _sms_worker_task.cancel()
+        try:
+            await _sms_worker_task
+        except asyncio.CancelledError:
+            pass
+    sms_queue = None
+    _sms_worker_task = None
 
 # ============================================================================
 # ENDPOINTS
@@ -286,26 +575,18 @@ async def send_otp(request: SendOTPRequest, client_request: Request):
     try:
         # Rate limiting check
         client_ip = client_request.client.host
-        rate_limit_key = f"rate_limit:{client_ip}"
-        
-        # Check if user has exceeded rate limit
-        rate_limit_doc = get_otp_collection().find_one(
-            {'_id': rate_limit_key}
-        )
-        
-        if rate_limit_doc:
-            if rate_limit_doc.get('count', 0) >= int(os.getenv('OTP_RATE_LIMIT_COUNT', 5)):
-                if datetime.utcnow() < rate_limit_doc.get('expires_at', datetime.utcnow()):
-                    raise HTTPException(
-                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                        detail="Too many OTP requests. Please wait a minute."
-                    )
+        if not check_rate_limit(client_ip):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many OTP requests. Please wait a minute."
+            )
         
-        # Validate input
-        if not request.loginId.strip():
+        # Refuse before replacing the officer's current OTP if the SMS
+        # backlog could not deliver a new one in time
+        if sms_queue is not None and sms_queue.full():
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Login ID is required"
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=SMS_BUSY_DETAIL
             )
         
         # Generate OTP
@@ -313,14 +594,24 @@ async def send_otp(request: SendOTPRequest, client_request: Request):
         logger.info(f"Generated OTP for {request.loginId}: {otp_code}")
         
         # Store OTP in MongoDB
-        if not store_otp(request.loginId, request.mobileNumber, otp_code):
+        now = datetime.utcnow()
+        if not await store_otp(request.loginId, request.mobileNumber, otp_code, now):
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to store OTP"
             )
         
-        # Send SMS
-        sms_result = send_sms_otp(request.mobileNumber, otp_code)
+        # Queue SMS for the paced sender
+        try:
+            sms_result = await enqueue_sms_otp(
+                request.mobileNumber, otp_code,
+                now + timedelta(seconds=CFG.otp_expiry_seconds)
+            )
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=SMS_BUSY_DETAIL
+            )
         
         if sms_result.get("status") != "success":
             raise HTTPException(
@@ -330,8 +621,8 @@ async def send_otp(request: SendOTPRequest, client_request: Request):
         
         return OTPResponse(
             status="success",
-            message=f"OTP sent to +91{request.mobileNumber}",
-            expiresIn=int(os.getenv('OTP_EXPIRY_SECONDS', 120))
+            message=f"OTP sent to {format_phone(request.mobileNumber)}",
+            expiresIn=CFG.otp_expiry_seconds
         )
     
     except HTTPException:
@@ -356,65 +647,68 @@ async def verify_otp(request: VerifyOTPRequest):
     """
     
     try:
-        # Get OTP record
-        otp_record = get_otp_record(request.loginId, request.mobileNumber)
+        # One timestamp for expiry checks, token claims and login time
+        now = datetime.utcnow()
+        
+        # Count this attempt and fetch the OTP in one atomic update
+        otp_record = await claim_attempt(
+            request.loginId, request.mobileNumber, CFG.otp_max_attempts, now
+        )
         
         if not otp_record:
+            # Only the failure path pays for a second lookup to pick the error
+            if await get_otp_record(request.loginId, request.mobileNumber, now):
+                await delete_otp(request.loginId, request.mobileNumber)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many failed attempts. Please request a new OTP."
+                )
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="OTP expired or not found. Please request a new OTP."
             )
         
-        # Check attempt limit
-        max_attempts = int(os.getenv('OTP_MAX_ATTEMPTS', 3))
-        if otp_record.get('attempts', 0) >= max_attempts:
-            delete_otp(request.loginId, request.mobileNumber)
+        # Constant-time comparison so response timing doesn't leak digits;
+        # a wrong code keeps the incremented attempt count
+        if not hmac.compare_digest(otp_record.get('otp_code', ''), request.otp):
             raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many failed attempts. Please request a new OTP."
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid OTP. Please try again."
             )
         
-        # Verify OTP
-        if otp_record.get('otp_code') != request.otp:
-            increment_attempts(request.loginId, request.mobileNumber)
+        # Consume the OTP, so parallel requests cannot both log in
+        if not await consume_otp(request.loginId, request.mobileNumber, request.otp):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid OTP. Please try again."
+                detail="OTP expired or not found. Please request a new OTP."
             )
         
         # OTP verified successfully
-        delete_otp(request.loginId, request.mobileNumber)
         
         # Generate JWT token
-        jwt_secret = os.getenv('JWT_SECRET_KEY', 'default-secret-key')
-        jwt_expire_hours = int(os.getenv('JWT_EXPIRE_HOURS', 8))
-        
         payload = {
             "loginId": request.loginId,
             "mobileNumber": request.mobileNumber,
-            "iat": datetime.utcnow(),
-            "exp": datetime.utcnow() + timedelta(hours=jwt_expire_hours)
+            "iat": now,
+            "exp": now + timedelta(hours=CFG.jwt_expire_hours)
         }
         
-        token = jwt.encode(
-            payload,
-            jwt_secret,
-            algorithm=os.getenv('JWT_ALGORITHM', 'HS256')
-        )
+        token = sign_jwt(payload)
         
         # Log successful login
         logger.info(f"Successful login for {request.loginId}")
         
-        return LoginResponse(
-            status="success",
-            message="Login successful",
-            token=token,
-            user={
+        # Plain dict: response_model validates it once on the way out
+        return {
+            "status": "success",
+            "message": "Login successful",
+            "token": token,
+            "user": {
                 "loginId": request.loginId,
                 "mobileNumber": request.mobileNumber,
-                "loginTime": datetime.utcnow().isoformat()
+                "loginTime": now.isoformat()
             }
-        )
+        }
     
     except HTTPException:
         raise
@@ -444,7 +738,8 @@ async def health_check():
     """Health check endpoint"""
     try:
         # Check MongoDB connection
-        get_db().command('ping')
+        db = await get_database()
+        await db.command('ping')
         return {
             "status": "healthy",
             "database": "connected",
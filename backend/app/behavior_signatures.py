@@ -12,16 +12,90 @@ Classifies TOR activity into behavioral categories based on:
 Supports law enforcement behavioral analysis and session fingerprinting.
 """
 
+from collections import Counter
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Dict, Tuple, Optional, Any
-from datetime import datetime, timedelta
-import statistics
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import List, Dict, Tuple, Optional, Any, Union
+from datetime import datetime, timedelta, timezone
 import logging
 
+import numpy as np
+from pymongo import ReplaceOne
+
+# Optional Numba import - JIT-compiles the numeric kernels below
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
 logger = logging.getLogger(__name__)
 
 
+def _timing_stats_numpy(times: np.ndarray) -> Tuple[float, float, float, float]:
+    """Mean, sample std dev, min and max of inter-packet times."""
+    return (
+        float(times.mean()),
+        float(times.std(ddof=1)),
+        float(times.min()),
+        float(times.max()),
+    )
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _timing_stats(times):
+        """Mean, sample std dev, min and max in one Welford pass."""
+        mean = 0.0
+        m2 = 0.0
+        mn = times[0]
+        mx = times[0]
+        for i in range(times.shape[0]):
+            x = times[i]
+            delta = x - mean
+            mean += delta / (i + 1)
+            m2 += (x - mean) * delta
+            if x < mn:
+                mn = x
+            if x > mx:
+                mx = x
+        return mean, np.sqrt(m2 / (times.shape[0] - 1)), mn, mx
+else:
+    _timing_stats = _timing_stats_numpy
+
+
+# IPT histogram binning, matching correlator.CorrelationConfig
+IPT_HISTOGRAM_BINS = 20
+IPT_MAX_DELAY_MS = 5000.0
+
+
+def ipt_histogram(gaps, n_bins=IPT_HISTOGRAM_BINS, max_ms=IPT_MAX_DELAY_MS):
+    """
+    Count inter-packet gaps (ms) into fixed-width bins over [0, max_ms).
+    
+    Gaps beyond max_ms fall into the last bin, as in
+    correlator.TimingVector.to_histogram.
+    """
+    out = np.zeros(n_bins, dtype=np.int64)
+    bin_width = max_ms / n_bins
+    for i in range(gaps.shape[0]):
+        g = gaps[i]
+        if g < 0:
+            continue
+        idx = int(g / bin_width)
+        if idx > n_bins - 1:
+            idx = n_bins - 1
+        out[idx] += 1
+    return out
+
+
+if NUMBA_AVAILABLE:
+    ipt_histogram = njit(cache=True, fastmath=True)(ipt_histogram)
+
+
 class BehaviorType(Enum):
     """Classification of TOR behavioral patterns."""
     EMAIL = "email"                    # Email/messaging protocols
@@ -40,34 +114,47 @@ class PacketPattern(Enum):
     STREAMING = "streaming"        # Continuous flow
     BIDIRECTIONAL = "bidirectional"  # Balanced send/receive
     UNIDIRECTIONAL = "unidirectional"  # One-way dominant
+    UNKNOWN = "unknown"            # No clear pattern
 
 
-@dataclass
+@dataclass(slots=True)
 class TimingMetrics:
     """Packet timing statistics for a session."""
-    inter_packet_times: List[float] = field(default_factory=list)  # ms between packets
+    inter_packet_times: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=np.float64)
+    )  # ms between packets
     mean_iat: float = 0.0  # Mean inter-arrival time
     std_dev_iat: float = 0.0  # Standard deviation
     min_iat: float = 0.0  # Minimum gap
     max_iat: float = 0.0  # Maximum gap
     coefficient_variation: float = 0.0  # std_dev / mean
     
+    def __post_init__(self) -> None:
+        # Accept plain lists from older callers
+        self.inter_packet_times = np.asarray(self.inter_packet_times, dtype=np.float64)
+    
+    @property
+    def ipt_histogram(self) -> np.ndarray:
+        """Gap counts per IPT band, binned on access."""
+        return _kernels.ipt_histogram(
+            self.inter_packet_times, IPT_HISTOGRAM_BINS, IPT_MAX_DELAY_MS
+        )
+    
     def calculate(self) -> None:
         """Calculate timing statistics from inter-packet times."""
         if len(self.inter_packet_times) < 2:
             return
         
-        self.mean_iat = statistics.mean(self.inter_packet_times)
-        self.min_iat = min(self.inter_packet_times)
-        self.max_iat = max(self.inter_packet_times)
+        # Sample std dev, as statistics.stdev
+        self.mean_iat, self.std_dev_iat, self.min_iat, self.max_iat = _kernels.timing_stats(
+            self.inter_packet_times
+        )
         
-        if len(self.inter_packet_times) > 1:
-            self.std_dev_iat = statistics.stdev(self.inter_packet_times)
-            if self.mean_iat > 0:
-                self.coefficient_variation = self.std_dev_iat / self.mean_iat
+        if self.mean_iat > 0:
+            self.coefficient_variation = self.std_dev_iat / self.mean_iat
 
 
-@dataclass
+@dataclass(slots=True)
 class TrafficMetrics:
     """Traffic volume and characteristics."""
     total_packets: int = 0
@@ -100,7 +187,7 @@ class TrafficMetrics:
         return (self.total_bytes * 8.0 * 1000.0) / (duration_ms * 1_000_000.0)
 
 
-@dataclass
+@dataclass(slots=True)
 class BehaviorSignature:
     """Complete behavioral signature for a TOR session."""
     session_id: str
@@ -125,8 +212,270 @@ class BehaviorSignature:
     reason: str = ""
     
     # Metadata
-    detected_at: datetime = field(default_factory=datetime.utcnow)
+    detected_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     signature_version: str = "1.0"
+    
+    def to_mongo(self) -> Dict[str, Any]:
+        """Build the MongoDB document for this signature."""
+        return {
+            "session_id": self.session_id,
+            "case_id": self.case_id,
+            "behavior_type": self.behavior_type.value,
+            "confidence": self.confidence,
+            "timing_metrics": {
+                "mean_iat": self.timing_metrics.mean_iat,
+                "std_dev_iat": self.timing_metrics.std_dev_iat,
+                "coefficient_variation": self.timing_metrics.coefficient_variation,
+            },
+            "traffic_metrics": {
+                "total_packets": self.traffic_metrics.total_packets,
+                "total_bytes": self.traffic_metrics.total_bytes,
+                "symmetry_ratio": self.traffic_metrics.get_symmetry_ratio(),
+            },
+            "packet_pattern": self.packet_pattern.value,
+            "duration_ms": self.duration_ms,
+            "protocols": self.protocols,
+            "indicators": self.indicators,
+            "reason": self.reason,
+            "detected_at": self.detected_at,
+        }
+    
+    @classmethod
+    def from_mongo(cls, doc: Dict[str, Any]) -> 'BehaviorSignature':
+        """Rebuild a signature from a (possibly projected) MongoDB document."""
+        timing_doc = doc.get("timing_metrics") or {}
+        traffic_doc = doc.get("traffic_metrics") or {}
+        signature = cls(
+            session_id=doc.get("session_id", ""),
+            case_id=doc.get("case_id", ""),
+            behavior_type=BehaviorType(doc.get("behavior_type", "unknown")),
+            confidence=doc.get("confidence", 0),
+            timing_metrics=TimingMetrics(
+                mean_iat=timing_doc.get("mean_iat", 0),
+                std_dev_iat=timing_doc.get("std_dev_iat", 0),
+                coefficient_variation=timing_doc.get("coefficient_variation", 0),
+            ),
+            packet_pattern=PacketPattern(doc.get("packet_pattern", "unknown")),
+            traffic_metrics=TrafficMetrics(
+                total_packets=traffic_doc.get("total_packets", 0),
+                total_bytes=traffic_doc.get("total_bytes", 0),
+            ),
+            duration_ms=doc.get("duration_ms", 0),
+            protocols=doc.get("protocols", []),
+            indicators=doc.get("indicators", {}),
+            reason=doc.get("reason", ""),
+        )
+        if "detected_at" in doc:
+            signature.detected_at = doc["detected_at"]
+        return signature
+
+
+# Detector scoring. The four detectors share the same session features, so
+# they are scored together by one kernel; rows follow _SCORED_BEHAVIORS.
+_SCORED_BEHAVIORS = (
+    BehaviorType.EMAIL,
+    BehaviorType.INTERACTIVE_BROWSING,
+    BehaviorType.AUTOMATED_BOT,
+    BehaviorType.DARK_WEB_SERVICE,
+)
+
+_INDICATOR_NAMES = (
+    ("bursty_pattern", "typical_email_rate", "email_protocol", "email_duration"),
+    ("bursty_pattern", "http_protocol", "browsing_duration", "bidirectional_traffic"),
+    ("constant_pattern", "high_timing_regularity", "high_packet_rate", "unidirectional_traffic"),
+    ("onion_service", "long_duration", "consistent_pattern", "typical_service_throughput"),
+)
+
+_PATTERN_UNKNOWN = 0
+_PATTERN_BURSTY = 1
+_PATTERN_CONSTANT = 2
+_PATTERN_STREAMING = 3
+_PATTERN_BY_ID = (
+    PacketPattern.UNKNOWN,
+    PacketPattern.BURSTY,
+    PacketPattern.CONSTANT,
+    PacketPattern.STREAMING,
+)
+_PATTERN_CONFIDENCE = (0.5, 0.9, 0.85, 0.8)
+_PATTERN_IDS = {pattern: i for i, pattern in enumerate(_PATTERN_BY_ID)}
+
+_PROTOCOL_EMAIL = 1
+_PROTOCOL_WEB = 2
+_PROTOCOL_ONION = 3
+_EMAIL_PROTOCOLS = frozenset({"smtp", "imap", "pop3", "tls"})
+_WEB_PROTOCOLS = frozenset({"http", "https"})
+PROTOCOL_IDS = {
+    **dict.fromkeys(_EMAIL_PROTOCOLS, _PROTOCOL_EMAIL),
+    **dict.fromkeys(_WEB_PROTOCOLS, _PROTOCOL_WEB),
+}
+
+
+@lru_cache(maxsize=256)
+def _protocol_id(protocol: Optional[str]) -> int:
+    """
+    Encode a dominant protocol for the scoring kernel (0 = other/none).
+    
+    Cached: sessions share a handful of protocol names, so each is
+    lower-cased and looked up once.
+    """
+    if not protocol:
+        return 0
+    if ".onion" in protocol:  # Hidden service (would be in protocol/domain)
+        return _PROTOCOL_ONION
+    return PROTOCOL_IDS.get(protocol.lower(), 0)
+
+
+# Timing pattern by IAT coefficient of variation, as a bucket lookup:
+#   cv < 0.4 constant, 0.4 <= cv < 0.7 streaming, 0.7 <= cv <= 1.5 unknown,
+#   cv > 1.5 bursty
+_CV_BOUNDS = np.array([0.4, 0.7, np.nextafter(1.5, np.inf)])
+_CV_PATTERN_IDS = np.array(
+    [_PATTERN_CONSTANT, _PATTERN_STREAMING, _PATTERN_UNKNOWN, _PATTERN_BURSTY],
+    dtype=np.int64
+)
+
+
+def _timing_pattern_id(cv):
+    """Timing pattern of a session from its IAT coefficient of variation."""
+    return _CV_PATTERN_IDS[np.searchsorted(_CV_BOUNDS, cv, side="right")]
+
+
+def _score_all(pattern_id, cv, packet_rate, protocol_id, duration_ms, symmetry, throughput):
+    """Indicator contributions of each detector (4 detectors x 4 indicators)."""
+    out = np.zeros((4, 4))
+    
+    # Email: bursty user actions, 50-500 pps, mail protocol, 1-10 minute sessions
+    if pattern_id == _PATTERN_BURSTY:
+        out[0, 0] = 0.3
+    if 50 < packet_rate < 500:
+        out[0, 1] = 0.25
+    if protocol_id == _PROTOCOL_EMAIL:
+        out[0, 2] = 0.25
+    if 60_000 < duration_ms < 600_000:
+        out[0, 3] = 0.2
+    
+    # Browsing: bursty clicks, HTTP(S), 30min-2hr sessions, bidirectional
+    if pattern_id == _PATTERN_BURSTY:
+        out[1, 0] = 0.25
+    if protocol_id == _PROTOCOL_WEB:
+        out[1, 1] = 0.3
+    if 1_800_000 < duration_ms < 7_200_000:
+        out[1, 2] = 0.2
+    if 0.4 < symmetry < 0.9:
+        out[1, 3] = 0.25
+    
+    # Bot: constant intervals, CV < 0.2, 1000+ pps, unidirectional
+    if pattern_id == _PATTERN_CONSTANT:
+        out[2, 0] = 0.35
+    if cv < 0.2:
+        out[2, 1] = 0.25
+    if packet_rate > 1000:
+        out[2, 2] = 0.2
+    if symmetry < 0.3:
+        out[2, 3] = 0.2
+    
+    # Dark web: onion service, >10 minutes, consistent pattern, 0.1-10 Mbps
+    if protocol_id == _PROTOCOL_ONION:
+        out[3, 0] = 0.4
+    if duration_ms > 600_000:
+        out[3, 1] = 0.2
+    if pattern_id == _PATTERN_CONSTANT:
+        out[3, 2] = 0.2
+    if 0.1 < throughput < 10.0:
+        out[3, 3] = 0.2
+    
+    return out
+
+
+def _batch_classify(gaps, gap_offsets, timestamps, sizes, is_uplink, offsets, protocol_ids):
+    """
+    Features and detector scores for many sessions at once.
+    
+    Sessions are stored CSR-style: session i owns packets
+    offsets[i]:offsets[i+1] and positive gaps gap_offsets[i]:gap_offsets[i+1].
+    Returns per-session timing stats (mean, std, min, max, cv), traffic
+    totals (uplink packets, uplink bytes, total bytes), durations, timing
+    pattern ids and detector contributions.
+    """
+    n_sessions = offsets.shape[0] - 1
+    stats = np.zeros((n_sessions, 5))
+    traffic = np.zeros((n_sessions, 3), dtype=np.int64)
+    durations = np.zeros(n_sessions)
+    pattern_ids = np.zeros(n_sessions, dtype=np.int64)
+    contributions = np.zeros((n_sessions, 4, 4))
+    
+    for i in prange(n_sessions):
+        start, end = offsets[i], offsets[i + 1]
+        if end == start:
+            continue
+        
+        # Timing metrics (as TimingMetrics.calculate)
+        g_start, g_end = gap_offsets[i], gap_offsets[i + 1]
+        cv = 0.0
+        if g_end - g_start >= 2:
+            mean, std, mn, mx = _timing_stats(gaps[g_start:g_end])
+            stats[i, 0] = mean
+            stats[i, 1] = std
+            stats[i, 2] = mn
+            stats[i, 3] = mx
+            if mean > 0:
+                cv = std / mean
+        stats[i, 4] = cv
+        pattern_ids[i] = _timing_pattern_id(cv)
+        
+        # Traffic metrics
+        duration_ms = (timestamps[end - 1] - timestamps[start]) * 1000
+        durations[i] = duration_ms
+        up_packets = 0
+        up_bytes = 0
+        total_bytes = 0
+        for j in range(start, end):
+            total_bytes += sizes[j]
+            if is_uplink[j]:
+                up_packets += 1
+                up_bytes += sizes[j]
+        traffic[i, 0] = up_packets
+        traffic[i, 1] = up_bytes
+        traffic[i, 2] = total_bytes
+        
+        # Derived features (as TrafficMetrics.get_*)
+        packet_rate = 0.0
+        throughput = 0.0
+        if duration_ms != 0:
+            packet_rate = ((end - start) * 1000.0) / duration_ms
+            throughput = (total_bytes * 8.0 * 1000.0) / (duration_ms * 1_000_000.0)
+        symmetry = 0.0
+        max_bytes = max(up_bytes, total_bytes - up_bytes)
+        if total_bytes != 0 and max_bytes != 0:
+            symmetry = min(up_bytes, total_bytes - up_bytes) / max_bytes
+        
+        contributions[i] = _score_all(
+            pattern_ids[i], cv, packet_rate, protocol_ids[i],
+            duration_ms, symmetry, throughput
+        )
+    
+    return stats, traffic, durations, pattern_ids, contributions
+
+
+if NUMBA_AVAILABLE:
+    _timing_pattern_id = njit(cache=True)(_timing_pattern_id)
+    _score_all = njit(cache=True)(_score_all)
+    _batch_classify = njit(cache=True, parallel=True)(_batch_classify)
+
+# Precompiled kernels (built by _behavior_kernels_aot.py) for calls made from
+# Python, so a cold process skips JIT compilation. _batch_classify keeps
+# calling the JIT kernels, which are compiled together with its loop.
+try:
+    from . import behavior_kernels as _kernels
+    AOT_KERNELS_AVAILABLE = True
+except ImportError:
+    AOT_KERNELS_AVAILABLE = False
+    _kernels = SimpleNamespace(
+        timing_stats=_timing_stats,
+        timing_pattern_id=_timing_pattern_id,
+        score_all=_score_all,
+        ipt_histogram=ipt_histogram,
+    )
 
 
 class BehaviorSignatureLibrary:
@@ -140,25 +489,38 @@ class BehaviorSignatureLibrary:
     def __init__(self, db: Optional[Any] = None):
         self.db = db
         self.collection_name = "behavior_signatures"
+        if db is not None:
+            self._ensure_indexes()
+    
+    def _ensure_indexes(self) -> None:
+        """Create indexes for signature lookups."""
+        indexes = [
+            # One signature per session (get_signature)
+            ([("session_id", 1)], {"unique": True, "name": "idx_session_id"}),
+            # Case-wide queries (get_case_behaviors)
+            ([("case_id", 1)], {"name": "idx_case_id"}),
+            # Most recent detections first
+            ([("detected_at", -1)], {"name": "idx_detected_at"}),
+        ]
+        collection = self.db[self.collection_name]
+        for keys, options in indexes:
+            try:
+                collection.create_index(keys, **options)
+            except Exception as e:
+                # e.g. existing duplicate sessions; keep the other indexes
+                logger.error(f"Error creating behavior signature index {options['name']}: {e}")
     
     def _calculate_timing_pattern(self, timing: TimingMetrics) -> Tuple[PacketPattern, float]:
         """
         Determine packet timing pattern and confidence.
         
-        Bursty: High variation (user clicks) - CV > 1.0
-        Constant: Low variation (automated) - CV < 0.5
-        Streaming: Regular intervals - CV 0.3-0.6
+        Bursty: High variation (user clicks) - CV > 1.5
+        Constant: Low variation (automated) - CV < 0.4
+        Streaming: Regular intervals - CV 0.4-0.7
+        Unknown: CV 0.7-1.5
         """
-        cv = timing.coefficient_variation
-        
-        if cv > 1.5:
-            return PacketPattern.BURSTY, 0.9
-        elif cv < 0.4:
-            return PacketPattern.CONSTANT, 0.85
-        elif 0.3 < cv < 0.7:
-            return PacketPattern.STREAMING, 0.8
-        else:
-            return PacketPattern.UNKNOWN, 0.5
+        pattern_id = _kernels.timing_pattern_id(timing.coefficient_variation)
+        return _PATTERN_BY_ID[pattern_id], _PATTERN_CONFIDENCE[pattern_id]
     
     def _calculate_symmetry_pattern(self, traffic: TrafficMetrics) -> Tuple[PacketPattern, float]:
         """Determine if traffic is directional or bidirectional."""
@@ -171,165 +533,53 @@ class BehaviorSignatureLibrary:
         else:
             return PacketPattern.BIDIRECTIONAL, 0.6
     
-    def _detect_email_signature(self, signature: BehaviorSignature) -> float:
+    def _session_features(self, signature: BehaviorSignature) -> Tuple[float, float, float]:
+        """Packet rate, symmetry ratio and throughput shared by the detectors."""
+        traffic = signature.traffic_metrics
+        return (
+            traffic.get_packet_rate(signature.duration_ms),
+            traffic.get_symmetry_ratio(),
+            traffic.get_throughput_mbps(signature.duration_ms),
+        )
+    
+    def _score_signature(
+        self,
+        signature: BehaviorSignature,
+        packet_rate: float,
+        symmetry: float,
+        throughput: float
+    ) -> np.ndarray:
         """
-        Detect email/messaging behavior.
+        Score all behavior detectors in one kernel call.
         
-        Indicators:
-        - Bursty packet pattern (user actions)
-        - Medium packet rate (50-500 pps)
-        - TCP/TLS protocol
-        - Periodic check-ins
-        """
-        score = 0.0
-        indicators = {}
-        
-        # Pattern check
-        if signature.packet_pattern == PacketPattern.BURSTY:
-            score += 0.3
-            indicators["bursty_pattern"] = 0.3
-        
-        # Packet rate (50-500 pps for email)
-        packet_rate = signature.traffic_metrics.get_packet_rate(signature.duration_ms)
-        if 50 < packet_rate < 500:
-            score += 0.25
-            indicators["typical_email_rate"] = 0.25
-        
-        # Protocol check (SMTP, IMAP, POP3)
-        email_protocols = {"smtp", "imap", "pop3", "tls"}
-        if signature.dominant_protocol and signature.dominant_protocol.lower() in email_protocols:
-            score += 0.25
-            indicators["email_protocol"] = 0.25
-        
-        # Duration pattern (short sessions, multiple daily)
-        if 60_000 < signature.duration_ms < 600_000:  # 1-10 minutes
-            score += 0.2
-            indicators["email_duration"] = 0.2
-        
-        signature.indicators = indicators
-        return min(score, 1.0)
-    
-    def _detect_browsing_signature(self, signature: BehaviorSignature) -> float:
-        """
-        Detect interactive web browsing behavior.
-        
-        Indicators:
-        - Very bursty pattern (user clicks)
-        - Variable packet rate
-        - HTTP/HTTPS protocol
-        - Long session duration
-        - Bidirectional traffic
-        """
-        score = 0.0
-        indicators = {}
-        
-        # Pattern check
-        if signature.packet_pattern == PacketPattern.BURSTY:
-            score += 0.25
-            indicators["bursty_pattern"] = 0.25
-        
-        # Protocol check (HTTP/HTTPS)
-        if signature.dominant_protocol and signature.dominant_protocol.lower() in {"http", "https"}:
-            score += 0.3
-            indicators["http_protocol"] = 0.3
-        
-        # Session duration (typically 30min-2hrs)
-        if 1_800_000 < signature.duration_ms < 7_200_000:
-            score += 0.2
-            indicators["browsing_duration"] = 0.2
-        
-        # Bidirectional traffic
-        symmetry = signature.traffic_metrics.get_symmetry_ratio()
-        if 0.4 < symmetry < 0.9:
-            score += 0.25
-            indicators["bidirectional_traffic"] = 0.25
-        
-        signature.indicators = indicators
-        return min(score, 1.0)
-    
-    def _detect_bot_signature(self, signature: BehaviorSignature) -> float:
+        Returns per-indicator contributions, one row per _SCORED_BEHAVIORS
+        entry and one column per _INDICATOR_NAMES entry.
         """
-        Detect automated bot/crawler behavior.
-        
-        Indicators:
-        - Constant packet pattern (regular intervals)
-        - High packet rate (1000+ pps)
-        - Very low timing variation (CV < 0.2)
-        - Unidirectional traffic
-        - Consistent protocol
-        """
-        score = 0.0
-        indicators = {}
-        
-        # Pattern check
-        if signature.packet_pattern == PacketPattern.CONSTANT:
-            score += 0.35
-            indicators["constant_pattern"] = 0.35
-        
-        # Timing regularity
-        if signature.timing_metrics.coefficient_variation < 0.2:
-            score += 0.25
-            indicators["high_timing_regularity"] = 0.25
-        
-        # Packet rate (high for bots)
-        packet_rate = signature.traffic_metrics.get_packet_rate(signature.duration_ms)
-        if packet_rate > 1000:
-            score += 0.2
-            indicators["high_packet_rate"] = 0.2
-        
-        # Unidirectional or scanning pattern
-        symmetry = signature.traffic_metrics.get_symmetry_ratio()
-        if symmetry < 0.3:
-            score += 0.2
-            indicators["unidirectional_traffic"] = 0.2
-        
-        signature.indicators = indicators
-        return min(score, 1.0)
-    
-    def _detect_dark_web_signature(self, signature: BehaviorSignature) -> float:
-        """
-        Detect dark web service access (hidden service).
-        
-        Indicators:
-        - Connection to onion address (port 80/443 to hidden service)
-        - Consistent connection pattern
-        - Medium traffic volume
-        - Long session duration
-        - Specific timing characteristics
-        """
-        score = 0.0
-        indicators = {}
-        
-        # Check for .onion characteristics (would be in protocol/domain)
-        if signature.dominant_protocol and ".onion" in signature.dominant_protocol:
-            score += 0.4
-            indicators["onion_service"] = 0.4
-        
-        # Session duration (can be long for service hosting)
-        if signature.duration_ms > 600_000:  # >10 minutes
-            score += 0.2
-            indicators["long_duration"] = 0.2
-        
-        # Pattern consistency
-        if signature.packet_pattern == PacketPattern.CONSTANT:
-            score += 0.2
-            indicators["consistent_pattern"] = 0.2
-        
-        # Traffic volume (moderate for services)
-        throughput = signature.traffic_metrics.get_throughput_mbps(signature.duration_ms)
-        if 0.1 < throughput < 10.0:
-            score += 0.2
-            indicators["typical_service_throughput"] = 0.2
-        
-        signature.indicators = indicators
-        return min(score, 1.0)
+        return _kernels.score_all(
+            _PATTERN_IDS.get(signature.packet_pattern, 0),
+            signature.timing_metrics.coefficient_variation,
+            packet_rate,
+            _protocol_id(signature.dominant_protocol),
+            signature.duration_ms,
+            symmetry,
+            throughput,
+        )
+    
+    def _apply_detector(self, signature: BehaviorSignature, contributions: np.ndarray, row: int) -> float:
+        """Record one detector's indicators on the signature and return its score."""
+        signature.indicators = {
+            name: float(value)
+            for name, value in zip(_INDICATOR_NAMES[row], contributions[row])
+            if value
+        }
+        return min(float(contributions[row].sum()), 1.0)
     
     def classify_session(
         self,
         session_id: str,
         case_id: str,
         packets: List[Dict],  # List of packet dicts with timestamp, size, direction
-        protocols: List[str] = None
+        protocols: Union[List[str], Dict[str, int]] = None
     ) -> BehaviorSignature:
         """
         Classify a TOR session behavioral signature.
@@ -338,7 +588,8 @@ class BehaviorSignatureLibrary:
             session_id: Unique session identifier
             case_id: Associated investigation case ID
             packets: List of packet data with timing and size info
-            protocols: Detected protocols used in session
+            protocols: Detected protocols used in session, either one entry
+                per observation or a protocol -> count mapping
         
         Returns:
             BehaviorSignature with classification and confidence
@@ -348,24 +599,29 @@ class BehaviorSignatureLibrary:
             case_id=case_id,
             behavior_type=BehaviorType.UNKNOWN,
             confidence=0.0,
-            protocols=protocols or []
+            protocols=list(protocols or [])
         )
         
         if not packets:
             signature.reason = "No packet data available"
             return signature
         
+        # Extract packet fields once into arrays
+        n_packets = len(packets)
+        timestamps = np.fromiter(
+            (p.get("timestamp", 0) for p in packets), dtype=np.float64, count=n_packets
+        )
+        sizes = np.fromiter(
+            (p.get("size", 0) for p in packets), dtype=np.int64, count=n_packets
+        )
+        direction_idx = np.fromiter(  # 0 = "up", 1 = "down"
+            (0 if p.get("direction", "down").lower() == "up" else 1 for p in packets),
+            dtype=np.int8, count=n_packets
+        )
+        
         # Calculate timing metrics
-        timing_data = []
-        total_duration = 0
-        for i in range(1, len(packets)):
-            prev_ts = packets[i-1].get("timestamp", 0)
-            curr_ts = packets[i].get("timestamp", 0)
-            if curr_ts > prev_ts:
-                gap = (curr_ts - prev_ts) * 1000  # Convert to ms
-                timing_data.append(gap)
-        
-        signature.timing_metrics.inter_packet_times = timing_data
+        gaps = np.diff(timestamps) * 1000  # Convert to ms
+        signature.timing_metrics.inter_packet_times = gaps[gaps > 0]
         signature.timing_metrics.calculate()
         
         # Determine timing pattern
@@ -373,40 +629,49 @@ class BehaviorSignatureLibrary:
         signature.packet_pattern = timing_pattern
         
         # Calculate traffic metrics
-        signature.duration_ms = (packets[-1].get("timestamp", 0) - packets[0].get("timestamp", 0)) * 1000
+        signature.duration_ms = float(timestamps[-1] - timestamps[0]) * 1000
         
-        for packet in packets:
-            size = packet.get("size", 0)
-            direction = packet.get("direction", "down")  # "up" or "down"
-            
-            signature.traffic_metrics.total_packets += 1
-            signature.traffic_metrics.total_bytes += size
-            
-            if direction.lower() == "up":
-                signature.traffic_metrics.uplink_packets += 1
-                signature.traffic_metrics.uplink_bytes += size
-            else:
-                signature.traffic_metrics.downlink_packets += 1
-                signature.traffic_metrics.downlink_bytes += size
+        # Per-direction packet and byte totals in one pass each
+        packet_counts = np.bincount(direction_idx, minlength=2)
+        byte_sums = np.bincount(direction_idx, weights=sizes, minlength=2)
         
-        # Determine symmetry pattern
-        symmetry_pattern, _ = self._calculate_symmetry_pattern(signature.traffic_metrics)
+        traffic = signature.traffic_metrics
+        traffic.total_packets = n_packets
+        traffic.total_bytes = int(sizes.sum())
+        traffic.uplink_packets = int(packet_counts[0])
+        traffic.downlink_packets = int(packet_counts[1])
+        traffic.uplink_bytes = int(byte_sums[0])
+        traffic.downlink_bytes = int(byte_sums[1])
         
         # Set dominant protocol
-        if signature.protocols:
-            signature.dominant_protocol = max(signature.protocols, key=str)
-        
-        # Classify behavior
-        scores = {
-            BehaviorType.EMAIL: self._detect_email_signature(signature),
-            BehaviorType.INTERACTIVE_BROWSING: self._detect_browsing_signature(signature),
-            BehaviorType.AUTOMATED_BOT: self._detect_bot_signature(signature),
-            BehaviorType.DARK_WEB_SERVICE: self._detect_dark_web_signature(signature),
-        }
+        signature.dominant_protocol = self._select_dominant_protocol(protocols)
+        
+        # Classify behavior - features computed once, all detectors in one pass
+        packet_rate, symmetry, throughput = self._session_features(signature)
+        self._apply_scores(
+            signature, self._score_signature(signature, packet_rate, symmetry, throughput)
+        )
+        return signature
+    
+    def _select_dominant_protocol(
+        self, protocols: Optional[Union[List[str], Dict[str, int]]]
+    ) -> Optional[str]:
+        """Pick the session's most frequent protocol."""
+        if not protocols:
+            return None
+        if isinstance(protocols, dict):  # Already counted upstream
+            return max(protocols.items(), key=lambda kv: kv[1])[0]
+        return Counter(protocols).most_common(1)[0][0]
+    
+    def _apply_scores(self, signature: BehaviorSignature, contributions: np.ndarray) -> None:
+        """Classify a signature from its detector contributions."""
+        scores = np.minimum(contributions.sum(axis=1), 1.0)
         
-        # Find best match
-        best_type = max(scores, key=scores.get)
-        best_score = scores[best_type]
+        # Find best match (first detector wins ties)
+        best_idx = int(scores.argmax())
+        best_type = _SCORED_BEHAVIORS[best_idx]
+        best_score = float(scores[best_idx])
+        self._apply_detector(signature, contributions, best_idx)
         
         # Only classify if confidence > 0.4
         if best_score > 0.4:
@@ -415,47 +680,148 @@ class BehaviorSignatureLibrary:
             signature.reason = f"Matched {best_type.value} signature with {best_score:.1%} confidence"
         else:
             signature.behavior_type = BehaviorType.UNKNOWN
-            signature.confidence = max(scores.values())
+            signature.confidence = best_score
             signature.reason = "No behavior signature matched with sufficient confidence"
+    
+    def classify_sessions_batch(self, sessions: List[Dict]) -> List[BehaviorSignature]:
+        """
+        Classify many TOR sessions in one vectorized pass.
         
-        return signature
+        Gives the same result as calling classify_session for each session,
+        but runs feature extraction and scoring for all sessions in a single
+        (parallel, when numba is available) kernel call.
+        
+        Args:
+            sessions: Session dicts with session_id, case_id, packets and
+                optional protocols (as classify_session's arguments)
+        
+        Returns:
+            BehaviorSignature per session, in input order
+        """
+        if not sessions:
+            return []
+        
+        # Flatten all packets into one CSR-style layout
+        counts = np.fromiter((len(s.get("packets") or ()) for s in sessions), dtype=np.int64)
+        offsets = np.zeros(len(sessions) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        all_packets = [p for s in sessions for p in (s.get("packets") or ())]
+        n_packets = len(all_packets)
+        timestamps = np.fromiter(
+            (p.get("timestamp", 0) for p in all_packets), dtype=np.float64, count=n_packets
+        )
+        sizes = np.fromiter(
+            (p.get("size", 0) for p in all_packets), dtype=np.int64, count=n_packets
+        )
+        is_uplink = np.fromiter(
+            (p.get("direction", "down").lower() == "up" for p in all_packets),
+            dtype=bool, count=n_packets
+        )
+        
+        # Positive gaps within each session (never across session boundaries)
+        gaps = np.diff(timestamps) * 1000  # Convert to ms
+        valid = gaps > 0
+        starts = offsets[1:-1]
+        valid[starts[(starts > 0) & (starts < n_packets)] - 1] = False
+        # valid_before[k] = number of kept gaps before packet k
+        valid_before = np.zeros(n_packets + 1, dtype=np.int64)
+        np.cumsum(valid, out=valid_before[1:n_packets])
+        valid_before[n_packets] = valid_before[n_packets - 1] if n_packets else 0
+        gap_offsets = valid_before[offsets]
+        gaps = gaps[valid]
+        
+        dominant = [
+            self._select_dominant_protocol(s.get("protocols")) for s in sessions
+        ]
+        protocol_ids = np.fromiter(
+            (_protocol_id(p) for p in dominant), dtype=np.int64, count=len(sessions)
+        )
+        
+        stats, traffic, durations, pattern_ids, contributions = _batch_classify(
+            gaps, gap_offsets, timestamps, sizes, is_uplink, offsets, protocol_ids
+        )
+        
+        # Build signatures from the kernel output
+        signatures = []
+        for i, session in enumerate(sessions):
+            signature = BehaviorSignature(
+                session_id=session.get("session_id", ""),
+                case_id=session.get("case_id", ""),
+                behavior_type=BehaviorType.UNKNOWN,
+                confidence=0.0,
+                protocols=list(session.get("protocols") or [])
+            )
+            signatures.append(signature)
+            
+            if counts[i] == 0:
+                signature.reason = "No packet data available"
+                continue
+            
+            timing = signature.timing_metrics
+            timing.inter_packet_times = gaps[gap_offsets[i]:gap_offsets[i + 1]]
+            (timing.mean_iat, timing.std_dev_iat, timing.min_iat,
+             timing.max_iat, timing.coefficient_variation) = stats[i].tolist()
+            signature.packet_pattern = _PATTERN_BY_ID[pattern_ids[i]]
+            signature.duration_ms = float(durations[i])
+            
+            metrics = signature.traffic_metrics
+            metrics.total_packets = int(counts[i])
+            metrics.uplink_packets = int(traffic[i, 0])
+            metrics.uplink_bytes = int(traffic[i, 1])
+            metrics.total_bytes = int(traffic[i, 2])
+            metrics.downlink_packets = metrics.total_packets - metrics.uplink_packets
+            metrics.downlink_bytes = metrics.total_bytes - metrics.uplink_bytes
+            
+            signature.dominant_protocol = dominant[i]
+            self._apply_scores(signature, contributions[i])
+        
+        return signatures
     
     def store_signature(self, signature: BehaviorSignature) -> bool:
-        """Store behavior signature in MongoDB."""
+        """Store behavior signature in MongoDB, replacing any earlier one for the session."""
         if self.db is None:
             return False
         
         try:
-            sig_dict = {
-                "session_id": signature.session_id,
-                "case_id": signature.case_id,
-                "behavior_type": signature.behavior_type.value,
-                "confidence": signature.confidence,
-                "timing_metrics": {
-                    "mean_iat": signature.timing_metrics.mean_iat,
-                    "std_dev_iat": signature.timing_metrics.std_dev_iat,
-                    "coefficient_variation": signature.timing_metrics.coefficient_variation,
-                },
-                "traffic_metrics": {
-                    "total_packets": signature.traffic_metrics.total_packets,
-                    "total_bytes": signature.traffic_metrics.total_bytes,
-                    "symmetry_ratio": signature.traffic_metrics.get_symmetry_ratio(),
-                },
-                "packet_pattern": signature.packet_pattern.value,
-                "duration_ms": signature.duration_ms,
-                "protocols": signature.protocols,
-                "indicators": signature.indicators,
-                "reason": signature.reason,
-                "detected_at": signature.detected_at,
-            }
-            
-            self.db[self.collection_name].insert_one(sig_dict)
+            # session_id is unique, so a reclassified session must replace
+            # its old signature rather than insert a second one
+            self.db[self.collection_name].replace_one(
+                {"session_id": signature.session_id}, signature.to_mongo(), upsert=True
+            )
             logger.info(f"Stored behavior signature for session {signature.session_id}")
             return True
         except Exception as e:
             logger.error(f"Error storing behavior signature: {e}")
             return False
     
+    def store_signatures(self, signatures: List[BehaviorSignature]) -> int:
+        """
+        Store many behavior signatures in one round trip, replacing any
+        earlier signatures for the same sessions.
+        
+        Returns the number of signatures stored.
+        """
+        if self.db is None or not signatures:
+            return 0
+        
+        try:
+            result = self.db[self.collection_name].bulk_write(
+                [
+                    ReplaceOne({"session_id": sig.session_id}, sig.to_mongo(), upsert=True)
+                    for sig in signatures
+                ],
+                ordered=False  # One bad document doesn't stop the rest
+            )
+            stored = result.matched_count + result.upserted_count
+            logger.info(f"Stored {stored} behavior signatures")
+            return stored
+        except Exception as e:
+            # Unordered writes still apply the operations that didn't fail
+            details = getattr(e, "details", None) or {}
+            stored = details.get("nMatched", 0) + details.get("nUpserted", 0)
+            logger.error(f"Error storing behavior signatures ({stored} stored): {e}")
+            return stored
+    
     def get_signature(self, session_id: str) -> Optional[BehaviorSignature]:
         """Retrieve stored behavior signature."""
         if self.db is None:
@@ -466,32 +832,7 @@ class BehaviorSignatureLibrary:
             if not sig_doc:
                 return None
             
-            # Reconstruct BehaviorSignature from document
-            timing = TimingMetrics(
-                mean_iat=sig_doc.get("timing_metrics", {}).get("mean_iat", 0),
-                std_dev_iat=sig_doc.get("timing_metrics", {}).get("std_dev_iat", 0),
-                coefficient_variation=sig_doc.get("timing_metrics", {}).get("coefficient_variation", 0),
-            )
-            
-            traffic = TrafficMetrics(
-                total_packets=sig_doc.get("traffic_metrics", {}).get("total_packets", 0),
-                total_bytes=sig_doc.get("traffic_metrics", {}).get("total_bytes", 0),
-            )
-            
-            signature = BehaviorSignature(
-                session_id=sig_doc.get("session_id", ""),
-                case_id=sig_doc.get("case_id", ""),
-                behavior_type=BehaviorType(sig_doc.get("behavior_type", "unknown")),
-                confidence=sig_doc.get("confidence", 0),
-                timing_metrics=timing,
-                packet_pattern=PacketPattern(sig_doc.get("packet_pattern", "unknown")),
-                traffic_metrics=traffic,
-                duration_ms=sig_doc.get("duration_ms", 0),
-                protocols=sig_doc.get("protocols", []),
-                indicators=sig_doc.get("indicators", {}),
-                reason=sig_doc.get("reason", ""),
-            )
-            return signature
+            return BehaviorSignature.from_mongo(sig_doc)
         except Exception as e:
             logger.error(f"Error retrieving behavior signature: {e}")
             return None
@@ -502,25 +843,19 @@ class BehaviorSignatureLibrary:
             return []
         
         try:
-            signatures = []
-            cursor = self.db[self.collection_name].find({"case_id": case_id})
-            for doc in cursor:
-                timing = TimingMetrics(
-                    mean_iat=doc.get("timing_metrics", {}).get("mean_iat", 0),
-                    std_dev_iat=doc.get("timing_metrics", {}).get("std_dev_iat", 0),
-                )
-                
-                signature = BehaviorSignature(
-                    session_id=doc.get("session_id", ""),
-                    case_id=case_id,
-                    behavior_type=BehaviorType(doc.get("behavior_type", "unknown")),
-                    confidence=doc.get("confidence", 0),
-                    timing_metrics=timing,
-                    reason=doc.get("reason", ""),
-                )
-                signatures.append(signature)
-            
-            return signatures
+            cursor = self.db[self.collection_name].find(
+                {"case_id": case_id},
+                # Only the fields rebuilt for case overviews
+                projection={
+                    "session_id": 1,
+                    "case_id": 1,
+                    "behavior_type": 1,
+                    "confidence": 1,
+                    "timing_metrics": 1,
+                    "reason": 1,
+                },
+            ).batch_size(1000)
+            return [BehaviorSignature.from_mongo(doc) for doc in cursor]
         except Exception as e:
             logger.error(f"Error retrieving case behaviors: {e}")
             return []
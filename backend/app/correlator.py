@@ -22,21 +22,38 @@ from __future__ import annotations
 
 import uuid
 import math
+import heapq
 import hashlib
-from datetime import datetime, timedelta
+import re
+from datetime import datetime, timedelta, timezone
 from typing import (
-    List, Dict, Any, Optional, Tuple, 
+    List, Dict, Any, Optional, Tuple, Sequence,
     NamedTuple, Protocol, TypeVar, Generic
 )
 from dataclasses import dataclass, field, asdict
 from enum import Enum, auto
 from abc import ABC, abstractmethod
-import statistics
 import os
+import logging
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 from dateutil import parser as date_parser
 from .database import get_db
 
+# Optional Numba import - JIT-compiles the pairwise kernels below
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+logger = logging.getLogger(__name__)
+
 
 # =============================================================================
 # DATABASE CONNECTION
@@ -47,6 +64,39 @@ def get_database():
     return get_db()
 
 
+_INDEXES_ENSURED = False
+
+
+def _ensure_indexes(db) -> None:
+    """Create the indexes behind the relay and result queries (once per process)."""
+    global _INDEXES_ENSURED
+    if _INDEXES_ENSURED or db is None:
+        return
+    
+    indexes = [
+        # Guard candidates (correlate_exit_traffic) and bandwidth-ordered
+        # guard/middle listings (generate_candidate_paths)
+        ("relays", [("is_guard", 1), ("running", 1), ("advertised_bandwidth", -1)],
+         {"name": "idx_guard_running_bw"}),
+        # Bandwidth-ordered exit listings (generate_candidate_paths)
+        ("relays", [("is_exit", 1), ("running", 1), ("advertised_bandwidth", -1)],
+         {"name": "idx_exit_running_bw"}),
+        # get_correlation_results lookups
+        ("correlation_results", [("investigation_id", 1)],
+         {"unique": True, "name": "idx_investigation_id"}),
+    ]
+    created = True
+    for collection, keys, options in indexes:
+        try:
+            db[collection].create_index(keys, **options)
+        except Exception as e:
+            # e.g. no server or duplicate investigation ids; keep the others
+            # and retry on the next call
+            logger.error(f"Error creating correlator index {options['name']}: {e}")
+            created = False
+    _INDEXES_ENSURED = created
+
+
 # =============================================================================
 # CONSTANTS AND CONFIGURATION
 # =============================================================================
@@ -97,25 +147,160 @@ class EvidenceType(Enum):
     BANDWIDTH_FEASIBILITY = "bandwidth_feasibility"
     CIRCUIT_LIFETIME_PLAUSIBILITY = "circuit_lifetime_plausibility"
     BEHAVIORAL_CONSISTENCY = "behavioral_consistency"
+    
+    def __init__(self, value: str):
+        # Dense index and one bit per member so types can be stored as
+        # small ints and sets of types tracked as an int mask
+        self.index = len(self.__class__.__members__)
+        self.bit = 1 << self.index
 
 
 # =============================================================================
 # DATA STRUCTURES
 # =============================================================================
 
-@dataclass(frozen=True)
+# Default IPT histogram layout: bin index = delay_ms * _HIST_SCALE
+_HIST_BINS = CorrelationConfig.IPT_SIMILARITY_BANDS
+_HIST_SCALE = _HIST_BINS / CorrelationConfig.IPT_MAX_DELAY_MS
+
+
+def _unrounded(value: float, ndigits: Optional[int] = None) -> float:
+    """Stand-in for round() when serializing at full precision."""
+    return value
+
+
+def _epoch_seconds(value: datetime) -> float:
+    """POSIX timestamp of a datetime; naive values are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def _epoch_micros(value: datetime) -> int:
+    """Exact integer POSIX time in microseconds; naive values are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _ONE_MICROSECOND
+
+
+class _DigestCache:
+    """
+    Thread-safe bounded LRU map for memoized similarity results.
+    
+    Keys are content digests rather than the vectors themselves, so cached
+    entries never keep TimingVectors or batches alive.
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Tuple) -> Any:
+        """Cached value for key (marked most recently used), or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key: Tuple, value: Any) -> None:
+        """Store value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass(frozen=True, eq=False, slots=True)
 class TimingVector:
     """
     Represents inter-packet timing characteristics of a traffic session.
     Immutable to ensure forensic integrity.
     """
-    inter_packet_times_ms: Tuple[float, ...]  # Inter-packet delays in milliseconds
+    inter_packet_times_ms: np.ndarray  # Inter-packet delays in milliseconds (float32)
     mean_ipt_ms: float
     std_ipt_ms: float
     median_ipt_ms: float
     min_ipt_ms: float
     max_ipt_ms: float
     packet_count: int
+    _histograms: Dict[int, np.ndarray] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _hash: Optional[int] = field(default=None, init=False, repr=False)
+    _digest: Optional[bytes] = field(default=None, init=False, repr=False)
+    
+    def __post_init__(self):
+        # float32 keeps ~0.1 us resolution at multi-second delays; the summary
+        # statistics are taken from the float64 source before narrowing
+        ipt = np.asarray(self.inter_packet_times_ms, dtype=np.float32)
+        ipt.flags.writeable = False
+        object.__setattr__(self, "inter_packet_times_ms", ipt)
+    
+    def __hash__(self) -> int:
+        # Content hash over the first 128 IPTs bounds the hashing cost;
+        # vectors sharing a prefix are told apart by __eq__
+        h = self._hash
+        if h is None:
+            ipt = self.inter_packet_times_ms
+            digest = hashlib.blake2b(ipt[:128].tobytes(), digest_size=16).digest()
+            h = hash((self.packet_count, ipt.size, digest))
+            object.__setattr__(self, "_hash", h)
+        return h
+    
+    @property
+    def digest(self) -> bytes:
+        """Content digest over the packet count and every IPT."""
+        d = self._digest
+        if d is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(self.packet_count.to_bytes(8, "little", signed=True))
+            h.update(self.inter_packet_times_ms.tobytes())
+            d = h.digest()
+            object.__setattr__(self, "_digest", d)
+        return d
+    
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, TimingVector):
+            return NotImplemented
+        return (
+            self.packet_count == other.packet_count and
+            np.array_equal(self.inter_packet_times_ms, other.inter_packet_times_ms)
+        )
+    
+    @classmethod
+    def _from_ipt_array(cls, ipt_ms: np.ndarray, packet_count: int) -> 'TimingVector':
+        """Build a TimingVector from a float64 array of inter-packet times."""
+        return cls(
+            inter_packet_times_ms=ipt_ms,
+            mean_ipt_ms=float(ipt_ms.mean()),
+            std_ipt_ms=float(ipt_ms.std(ddof=1)) if ipt_ms.size > 1 else 0.0,
+            median_ipt_ms=float(np.median(ipt_ms)),
+            min_ipt_ms=float(ipt_ms.min()),
+            max_ipt_ms=float(ipt_ms.max()),
+            packet_count=packet_count
+        )
     
     @classmethod
     def from_timestamps(cls, timestamps: List[float]) -> Optional['TimingVector']:
@@ -131,24 +316,17 @@ class TimingVector:
         if len(timestamps) < CorrelationConfig.MIN_PACKETS_FOR_TIMING_ANALYSIS:
             return None
         
-        sorted_ts = sorted(timestamps)
-        ipt_ms = tuple(
-            (sorted_ts[i+1] - sorted_ts[i]) * 1000.0 
-            for i in range(len(sorted_ts) - 1)
-        )
+        ts = np.asarray(timestamps, dtype=np.float64)
+        gaps = np.diff(ts)
+        # Capture timestamps are almost always in order; only sort when not
+        if not (gaps >= 0).all():
+            gaps = np.diff(np.sort(ts))
+        ipt_ms = gaps * 1000.0
         
-        if not ipt_ms:
+        if not ipt_ms.size:
             return None
         
-        return cls(
-            inter_packet_times_ms=ipt_ms,
-            mean_ipt_ms=statistics.mean(ipt_ms),
-            std_ipt_ms=statistics.stdev(ipt_ms) if len(ipt_ms) > 1 else 0.0,
-            median_ipt_ms=statistics.median(ipt_ms),
-            min_ipt_ms=min(ipt_ms),
-            max_ipt_ms=max(ipt_ms),
-            packet_count=len(timestamps)
-        )
+        return cls._from_ipt_array(ipt_ms, len(timestamps))
     
     @classmethod
     def from_ipt_list(cls, ipt_ms_list: List[float]) -> Optional['TimingVector']:
@@ -156,40 +334,110 @@ class TimingVector:
         if len(ipt_ms_list) < CorrelationConfig.MIN_PACKETS_FOR_TIMING_ANALYSIS - 1:
             return None
         
-        ipt_tuple = tuple(ipt_ms_list)
-        return cls(
-            inter_packet_times_ms=ipt_tuple,
-            mean_ipt_ms=statistics.mean(ipt_tuple),
-            std_ipt_ms=statistics.stdev(ipt_tuple) if len(ipt_tuple) > 1 else 0.0,
-            median_ipt_ms=statistics.median(ipt_tuple),
-            min_ipt_ms=min(ipt_tuple),
-            max_ipt_ms=max(ipt_tuple),
-            packet_count=len(ipt_ms_list) + 1
-        )
+        ipt_ms = np.array(ipt_ms_list, dtype=np.float64)
+        if not ipt_ms.size:
+            return None
+        
+        return cls._from_ipt_array(ipt_ms, len(ipt_ms_list) + 1)
+    
+    def to_numpy(self) -> np.ndarray:
+        """Return the read-only float32 IPT buffer (no copy)."""
+        return self.inter_packet_times_ms
     
-    def to_histogram(self, bins: int = None) -> List[float]:
+    def to_histogram(self, bins: int = None) -> np.ndarray:
         """
         Convert timing vector to normalized histogram for comparison.
-        Uses fixed bins to enable consistent comparisons.
+        Uses fixed bins to enable consistent comparisons; delays beyond
+        IPT_MAX_DELAY_MS fall into the last bin.
+        
+        The vector is immutable, so each bin count is computed once and the
+        (read-only) result is reused by every later comparison.
         """
         bins = bins or CorrelationConfig.IPT_SIMILARITY_BANDS
-        max_delay = CorrelationConfig.IPT_MAX_DELAY_MS
-        bin_width = max_delay / bins
+        histogram = self._histograms.get(bins)
+        if histogram is not None:
+            return histogram
         
-        histogram = [0.0] * bins
-        for ipt in self.inter_packet_times_ms:
-            bin_idx = min(int(ipt / bin_width), bins - 1)
-            histogram[bin_idx] += 1
+        if bins == _HIST_BINS:
+            scale = _HIST_SCALE
+        else:
+            scale = bins / CorrelationConfig.IPT_MAX_DELAY_MS
+        
+        bin_idx = np.clip(
+            (self.inter_packet_times_ms * scale).astype(np.intp), 0, bins - 1
+        )
+        histogram = np.bincount(bin_idx, minlength=bins).astype(np.float32)
         
         # Normalize
-        total = sum(histogram)
+        total = histogram.sum()
         if total > 0:
-            histogram = [h / total for h in histogram]
+            histogram /= total
         
+        histogram.flags.writeable = False
+        self._histograms[bins] = histogram
         return histogram
 
 
-@dataclass
+@dataclass(frozen=True, eq=False, slots=True)
+class TimingVectorBatch:
+    """
+    Structure-of-arrays view over many TimingVectors.
+    
+    Packs the per-session statistics into parallel arrays (and the
+    histograms into one (N, B) matrix) once, so pairwise analysis can
+    stream over contiguous memory instead of touching each object.
+    """
+    means: np.ndarray           # float64, (N,)
+    stds: np.ndarray            # float64, (N,)
+    medians: np.ndarray         # float64, (N,)
+    packet_counts: np.ndarray   # int64, (N,)
+    histograms: np.ndarray      # float32, (N, B)
+    # Element-wise sqrt of the histograms. Each row has unit L2 norm, so the
+    # Bhattacharyya coefficient of two rows is just their dot product
+    sqrt_histograms: np.ndarray = field(init=False, repr=False)
+    _digest: Optional[bytes] = field(default=None, init=False, repr=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "sqrt_histograms", np.sqrt(self.histograms))
+    
+    @property
+    def digest(self) -> bytes:
+        """Content digest over every packed array."""
+        d = self._digest
+        if d is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(np.int64(self.histograms.shape[-1]).tobytes())
+            for array in (self.means, self.stds, self.medians, self.packet_counts, self.histograms):
+                h.update(np.ascontiguousarray(array).tobytes())
+            d = h.digest()
+            object.__setattr__(self, "_digest", d)
+        return d
+    
+    @classmethod
+    def from_vectors(
+        cls,
+        vectors: List[TimingVector],
+        bins: int = None
+    ) -> 'TimingVectorBatch':
+        """Pack a list of TimingVectors into contiguous arrays."""
+        bins = bins or CorrelationConfig.IPT_SIMILARITY_BANDS
+        n = len(vectors)
+        return cls(
+            means=np.fromiter((tv.mean_ipt_ms for tv in vectors), dtype=np.float64, count=n),
+            stds=np.fromiter((tv.std_ipt_ms for tv in vectors), dtype=np.float64, count=n),
+            medians=np.fromiter((tv.median_ipt_ms for tv in vectors), dtype=np.float64, count=n),
+            packet_counts=np.fromiter((tv.packet_count for tv in vectors), dtype=np.int64, count=n),
+            histograms=(
+                np.stack([tv.to_histogram(bins) for tv in vectors])
+                if vectors else np.empty((0, bins), dtype=np.float32)
+            )
+        )
+    
+    def __len__(self) -> int:
+        return self.means.shape[0]
+
+
+@dataclass(slots=True)
 class TrafficSession:
     """
     Represents a captured traffic session with timing and behavioral data.
@@ -204,63 +452,108 @@ class TrafficSession:
     source_ip_hash: Optional[str] = None  # Privacy-preserving hash
     destination_port: Optional[int] = None
     protocol: str = "unknown"
+    _start_ts: float = field(init=False, repr=False)
+    _end_ts: float = field(init=False, repr=False)
+    _start_us: int = field(init=False, repr=False)
+    _end_us: int = field(init=False, repr=False)
+    _duration_sec: float = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self._start_ts = _epoch_seconds(self.start_time)
+        self._end_ts = _epoch_seconds(self.end_time)
+        self._start_us = _epoch_micros(self.start_time)
+        self._end_us = _epoch_micros(self.end_time)
+        self._duration_sec = (self.end_time - self.start_time).total_seconds()
     
     @property
     def duration_seconds(self) -> float:
         """Session duration in seconds."""
-        return (self.end_time - self.start_time).total_seconds()
+        return self._duration_sec
     
     @property
     def packets_per_second(self) -> float:
         """Average packet rate."""
-        duration = self.duration_seconds
+        duration = self._duration_sec
         return self.packet_count / duration if duration > 0 else 0.0
     
     @property
     def bytes_per_second(self) -> float:
         """Average throughput."""
-        duration = self.duration_seconds
+        duration = self._duration_sec
         return self.total_bytes / duration if duration > 0 else 0.0
     
     def overlaps_with(self, other: 'TrafficSession') -> bool:
         """Check if sessions have temporal overlap."""
-        return not (self.end_time < other.start_time or self.start_time > other.end_time)
+        return not (self._end_ts < other._start_ts or self._start_ts > other._end_ts)
     
     def overlap_ratio(self, other: 'TrafficSession') -> float:
         """
         Calculate overlap ratio between sessions.
         Returns value between 0 (no overlap) and 1 (complete overlap).
         """
-        if not self.overlaps_with(other):
+        overlap_start = self._start_ts if self._start_ts > other._start_ts else other._start_ts
+        overlap_end = self._end_ts if self._end_ts < other._end_ts else other._end_ts
+        overlap_duration = overlap_end - overlap_start
+        if overlap_duration <= 0:
             return 0.0
         
-        overlap_start = max(self.start_time, other.start_time)
-        overlap_end = min(self.end_time, other.end_time)
-        overlap_duration = (overlap_end - overlap_start).total_seconds()
-        
         # Normalize by the shorter session
-        min_duration = min(self.duration_seconds, other.duration_seconds)
+        min_duration = min(self._end_ts - self._start_ts, other._end_ts - other._start_ts)
         if min_duration <= 0:
             return 0.0
         
         return min(1.0, overlap_duration / min_duration)
 
 
-@dataclass
+@dataclass(slots=True)
 class RelayActivityWindow:
     """
     Represents a guard node's observed activity window.
+    
+    Session arrays are packed at construction, so observed_sessions is
+    stored as a tuple; build a new window to change the sessions.
     """
     relay_fingerprint: str
     relay_nickname: str
     window_start: datetime
     window_end: datetime
-    observed_sessions: List[TrafficSession] = field(default_factory=list)
+    observed_sessions: Tuple[TrafficSession, ...] = field(default_factory=tuple)
     bandwidth_bytes_per_sec: Optional[float] = None
     flags: List[str] = field(default_factory=list)
     autonomous_system: Optional[str] = None
     country_code: Optional[str] = None
     
+    # Exact window bounds (epoch microseconds) for candidate pre-filtering
+    _start_us: int = field(init=False, repr=False)
+    _end_us: int = field(init=False, repr=False)
+    
+    # Observed session bounds (epoch seconds) and ids, packed at construction
+    _session_starts: np.ndarray = field(init=False, repr=False)
+    _session_ends: np.ndarray = field(init=False, repr=False)
+    _session_ids: np.ndarray = field(init=False, repr=False)
+    # Positive average packet sizes of the observed sessions
+    _packet_sizes: np.ndarray = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self._start_us = _epoch_micros(self.window_start)
+        self._end_us = _epoch_micros(self.window_end)
+        self.observed_sessions = tuple(self.observed_sessions)
+        
+        n = len(self.observed_sessions)
+        self._session_starts = np.fromiter(
+            (s._start_ts for s in self.observed_sessions), dtype=np.float64, count=n
+        )
+        self._session_ends = np.fromiter(
+            (s._end_ts for s in self.observed_sessions), dtype=np.float64, count=n
+        )
+        self._session_ids = np.array(
+            [s.session_id for s in self.observed_sessions], dtype=object
+        )
+        sizes = np.fromiter(
+            (s.avg_packet_size for s in self.observed_sessions), dtype=np.float64, count=n
+        )
+        self._packet_sizes = sizes[sizes > 0]
+    
     @property
     def is_guard(self) -> bool:
         return "Guard" in self.flags
@@ -270,7 +563,7 @@ class RelayActivityWindow:
         return (self.window_end - self.window_start).total_seconds()
 
 
-@dataclass
+@dataclass(slots=True)
 class ExitObservation:
     """
     Represents an exit relay traffic observation to correlate.
@@ -283,7 +576,7 @@ class ExitObservation:
     timestamp: datetime = field(default_factory=datetime.utcnow)
 
 
-@dataclass
+@dataclass(slots=True)
 class EvidenceItem:
     """
     A single piece of evidence supporting or weakening a hypothesis.
@@ -295,18 +588,70 @@ class EvidenceItem:
     weight: float  # Relative importance (0-1), NOT confidence
     supports_hypothesis: bool  # True if evidence supports, False if contradicts
     
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, rounded: bool = True) -> Dict[str, Any]:
+        """
+        Serialize evidence item. Pass rounded=False to skip display rounding
+        when the values are consumed programmatically.
+        """
+        r = round if rounded else _unrounded
         return {
             "type": self.evidence_type.value,
             "description": self.description,
-            "measured_value": round(self.measured_value, 4),
-            "reference_range": [round(r, 4) for r in self.reference_range],
-            "weight": round(self.weight, 4),
+            "measured_value": r(self.measured_value, 4),
+            "reference_range": [r(v, 4) for v in self.reference_range],
+            "weight": r(self.weight, 4),
             "supports_hypothesis": self.supports_hypothesis
         }
 
 
-@dataclass
+@dataclass(frozen=True, eq=False, slots=True)
+class EvidenceArray:
+    """
+    Structure-of-arrays view over a hypothesis' evidence items.
+    
+    Built once per hypothesis so uncertainty classification and the
+    combined evidence weight read the same contiguous arrays.
+    """
+    weights: np.ndarray         # float64, (K,)
+    supports: np.ndarray        # bool, (K,)
+    types: np.ndarray           # int8 EvidenceType.index, (K,)
+    values: np.ndarray          # float64, (K,)
+    ref_lo: np.ndarray          # float64, (K,)
+    ref_hi: np.ndarray          # float64, (K,)
+    descriptions: Tuple[str, ...]
+    
+    @classmethod
+    def from_items(cls, items: Sequence[EvidenceItem]) -> 'EvidenceArray':
+        """Pack evidence items into parallel arrays."""
+        n = len(items)
+        return cls(
+            weights=np.fromiter((e.weight for e in items), dtype=np.float64, count=n),
+            supports=np.fromiter((e.supports_hypothesis for e in items), dtype=bool, count=n),
+            types=np.fromiter((e.evidence_type.index for e in items), dtype=np.int8, count=n),
+            values=np.fromiter((e.measured_value for e in items), dtype=np.float64, count=n),
+            ref_lo=np.fromiter((e.reference_range[0] for e in items), dtype=np.float64, count=n),
+            ref_hi=np.fromiter((e.reference_range[1] for e in items), dtype=np.float64, count=n),
+            descriptions=tuple(e.description for e in items)
+        )
+    
+    def __len__(self) -> int:
+        return self.weights.shape[0]
+    
+    @property
+    def support_weight(self) -> float:
+        return float(self.weights[self.supports].sum())
+    
+    @property
+    def contradict_weight(self) -> float:
+        return float(self.weights[~self.supports].sum())
+    
+    @property
+    def net_weight(self) -> float:
+        """Supporting minus contradicting weight."""
+        return float(np.where(self.supports, self.weights, -self.weights).sum())
+
+
+@dataclass(slots=True)
 class CorrelationHypothesis:
     """
     A correlation hypothesis between exit observation and potential guard node.
@@ -321,7 +666,7 @@ class CorrelationHypothesis:
     exit_node_nickname: str
     timing_similarity_score: float  # Normalized 0-1, higher = more similar
     session_overlap_score: float    # Normalized 0-1, higher = more overlap
-    evidence_summary: List[EvidenceItem]
+    evidence_summary: Tuple[EvidenceItem, ...]
     uncertainty_level: UncertaintyLevel
     circuit_lifetime_estimate_sec: Optional[float] = None
     generated_at: datetime = field(default_factory=datetime.utcnow)
@@ -339,20 +684,32 @@ class CorrelationHypothesis:
         repr=False
     )
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Serialize hypothesis for API response."""
+    # Packed view of evidence_summary; built from it when not supplied
+    evidence_array: Optional[EvidenceArray] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        self.evidence_summary = tuple(self.evidence_summary)
+        if self.evidence_array is None:
+            self.evidence_array = EvidenceArray.from_items(self.evidence_summary)
+    
+    def to_dict(self, rounded: bool = True) -> Dict[str, Any]:
+        """
+        Serialize hypothesis for API response. Pass rounded=False to skip
+        display rounding when the values are consumed programmatically.
+        """
+        r = round if rounded else _unrounded
         return {
             "hypothesis_id": self.hypothesis_id,
             "guard_node_fingerprint": self.guard_node_fingerprint,
             "guard_node_nickname": self.guard_node_nickname,
             "exit_node_fingerprint": self.exit_node_fingerprint,
             "exit_node_nickname": self.exit_node_nickname,
-            "timing_similarity_score": round(self.timing_similarity_score, 4),
-            "session_overlap_score": round(self.session_overlap_score, 4),
-            "evidence_summary": [e.to_dict() for e in self.evidence_summary],
+            "timing_similarity_score": r(self.timing_similarity_score, 4),
+            "session_overlap_score": r(self.session_overlap_score, 4),
+            "evidence_summary": [e.to_dict(rounded) for e in self.evidence_summary],
             "uncertainty_level": self.uncertainty_level.name,
             "circuit_lifetime_estimate_sec": (
-                round(self.circuit_lifetime_estimate_sec, 2) 
+                r(self.circuit_lifetime_estimate_sec, 2) 
                 if self.circuit_lifetime_estimate_sec else None
             ),
             "generated_at": self.generated_at.isoformat() + "Z",
@@ -367,14 +724,12 @@ class CorrelationHypothesis:
         Calculate combined evidence weight (NOT confidence).
         This is a measure of evidence strength, not identification certainty.
         """
-        if not self.evidence_summary:
+        evidence = self.evidence_array
+        if not len(evidence):
             return 0.0
         
-        supporting = [e for e in self.evidence_summary if e.supports_hypothesis]
-        contradicting = [e for e in self.evidence_summary if not e.supports_hypothesis]
-        
-        support_weight = sum(e.weight for e in supporting)
-        contradict_weight = sum(e.weight for e in contradicting)
+        support_weight = evidence.support_weight
+        contradict_weight = evidence.contradict_weight
         
         total_weight = support_weight + contradict_weight
         if total_weight == 0:
@@ -384,6 +739,121 @@ class CorrelationHypothesis:
         return (support_weight - contradict_weight) / total_weight
 
 
+# =============================================================================
+# NUMERIC KERNELS
+# =============================================================================
+
+def _statistical_distance_kernel(
+    mean1: float, std1: float, med1: float,
+    mean2: float, std2: float, med2: float
+) -> float:
+    """Weighted, scale-normalized distance between two sets of IPT moments."""
+    # Normalize differences by reasonable scales
+    mean_diff = abs(mean1 - mean2) / max(mean1, mean2, 1.0)
+    std_diff = abs(std1 - std2) / max(std1, std2, 1.0)
+    median_diff = abs(med1 - med2) / max(med1, med2, 1.0)
+    
+    # Weighted combination (mean is most reliable)
+    distance = 0.5 * mean_diff + 0.3 * std_diff + 0.2 * median_diff
+    
+    return min(1.0, distance)
+
+
+def _statistical_distance_batch_numpy(
+    means_e: np.ndarray, stds_e: np.ndarray, meds_e: np.ndarray,
+    means_g: np.ndarray, stds_g: np.ndarray, meds_g: np.ndarray
+) -> np.ndarray:
+    """(N, M) statistical distances via broadcasting."""
+    distance = np.zeros((means_e.shape[0], means_g.shape[0]))
+    for e, g, weight in ((means_e, means_g, 0.5), (stds_e, stds_g, 0.3), (meds_e, meds_g, 0.2)):
+        e = e[:, None]
+        g = g[None, :]
+        distance += weight * (np.abs(e - g) / np.maximum(np.maximum(e, g), 1.0))
+    return np.minimum(1.0, distance)
+
+
+def _statistical_distance_batch(means_e, stds_e, meds_e, means_g, stds_g, meds_g):
+    """(N, M) statistical distances, parallel over all exit/guard pairs."""
+    n = means_e.shape[0]
+    m = means_g.shape[0]
+    out = np.empty((n, m))
+    for k in prange(n * m):
+        i = k // m
+        j = k % m
+        out[i, j] = _statistical_distance_kernel(
+            means_e[i], stds_e[i], meds_e[i],
+            means_g[j], stds_g[j], meds_g[j]
+        )
+    return out
+
+
+def _timing_similarity_kernel(
+    hist_e, mean_e, std_e, med_e, count_e,
+    hist_g, mean_g, std_g, med_g, count_g
+):
+    """
+    TimingSimilarityAnalyzer.calculate_similarity on raw arrays.
+    
+    Returns:
+        (combined, histogram, statistical, packet_rate) similarities, unrounded
+    """
+    # Bhattacharyya coefficient
+    bc = 0.0
+    for k in range(hist_e.shape[0]):
+        bc += math.sqrt(float(hist_e[k]) * float(hist_g[k]))
+    
+    stat_similarity = 1.0 - _statistical_distance_kernel(
+        mean_e, std_e, med_e, mean_g, std_g, med_g
+    )
+    
+    rate_ratio = count_e / max(count_g, 1)
+    rate_similarity = 1.0 - min(1.0, abs(rate_ratio - 0.9) / 0.5)
+    
+    combined = 0.5 * bc + 0.35 * stat_similarity + 0.15 * rate_similarity
+    return combined, bc, stat_similarity, rate_similarity
+
+
+def _timing_similarity_numpy(
+    hist_e, mean_e, std_e, med_e, count_e,
+    hist_g, mean_g, std_g, med_g, count_g
+):
+    """_timing_similarity_kernel with a vectorized histogram reduction."""
+    bc = float(np.sqrt(hist_e.astype(np.float64) * hist_g).sum())
+    
+    stat_similarity = 1.0 - _statistical_distance_kernel(
+        mean_e, std_e, med_e, mean_g, std_g, med_g
+    )
+    
+    rate_ratio = count_e / max(count_g, 1)
+    rate_similarity = 1.0 - min(1.0, abs(rate_ratio - 0.9) / 0.5)
+    
+    combined = 0.5 * bc + 0.35 * stat_similarity + 0.15 * rate_similarity
+    return combined, bc, stat_similarity, rate_similarity
+
+
+if NUMBA_AVAILABLE:
+    _statistical_distance_kernel = njit(cache=True)(_statistical_distance_kernel)
+    _statistical_distance_batch = njit(cache=True, parallel=True)(_statistical_distance_batch)
+    _timing_similarity_kernel = njit(cache=True, fastmath=True)(_timing_similarity_kernel)
+else:
+    _statistical_distance_batch = _statistical_distance_batch_numpy
+    _timing_similarity_kernel = _timing_similarity_numpy
+
+
+_KERNELS_WARM = False
+
+
+def _warm_up_kernels() -> None:
+    """Compile (or load from cache) the per-pair JIT kernels once per process."""
+    global _KERNELS_WARM
+    if _KERNELS_WARM or not NUMBA_AVAILABLE:
+        return
+    hist = np.full(CorrelationConfig.IPT_SIMILARITY_BANDS, 1.0 / CorrelationConfig.IPT_SIMILARITY_BANDS,
+                   dtype=np.float32)
+    _timing_similarity_kernel(hist, 1.0, 1.0, 1.0, 10, hist, 1.0, 1.0, 1.0, 10)
+    _KERNELS_WARM = True
+
+
 # =============================================================================
 # TIMING ANALYSIS ENGINE
 # =============================================================================
@@ -394,17 +864,25 @@ class TimingSimilarityAnalyzer:
     Uses multiple metrics for robust comparison.
     """
     
+    # Process-wide memo tables shared by every engine, keyed on content
+    # digests: (exit, guard, min_score) -> (score, components) and
+    # (exit, guard batch) -> similarity row
+    _similarity_cache = _DigestCache(maxsize=8192)
+    _row_cache = _DigestCache(maxsize=64)
+    
     @staticmethod
-    def histogram_distance(hist1: List[float], hist2: List[float]) -> float:
+    def histogram_distance(hist1: np.ndarray, hist2: np.ndarray) -> float:
         """
         Calculate normalized histogram distance (Bhattacharyya distance).
         Returns value between 0 (identical) and 1 (completely different).
         """
-        if len(hist1) != len(hist2):
+        hist1 = np.asarray(hist1, dtype=np.float64)
+        hist2 = np.asarray(hist2, dtype=np.float64)
+        if hist1.shape != hist2.shape:
             raise ValueError("Histograms must have same length")
         
         # Bhattacharyya coefficient
-        bc = sum(math.sqrt(h1 * h2) for h1, h2 in zip(hist1, hist2))
+        bc = float(np.sqrt(hist1 * hist2).sum())
         
         # Convert to distance (1 - coefficient)
         return 1.0 - bc
@@ -415,53 +893,75 @@ class TimingSimilarityAnalyzer:
         Calculate statistical distance between timing vectors.
         Uses multiple statistical moments for comparison.
         """
-        # Normalize differences by reasonable scales
-        mean_diff = abs(tv1.mean_ipt_ms - tv2.mean_ipt_ms) / max(tv1.mean_ipt_ms, tv2.mean_ipt_ms, 1.0)
-        
-        std_diff = abs(tv1.std_ipt_ms - tv2.std_ipt_ms) / max(tv1.std_ipt_ms, tv2.std_ipt_ms, 1.0)
-        
-        median_diff = abs(tv1.median_ipt_ms - tv2.median_ipt_ms) / max(tv1.median_ipt_ms, tv2.median_ipt_ms, 1.0)
-        
-        # Weighted combination (mean is most reliable)
-        distance = 0.5 * mean_diff + 0.3 * std_diff + 0.2 * median_diff
-        
-        return min(1.0, distance)
+        return _statistical_distance_kernel(
+            float(tv1.mean_ipt_ms), float(tv1.std_ipt_ms), float(tv1.median_ipt_ms),
+            float(tv2.mean_ipt_ms), float(tv2.std_ipt_ms), float(tv2.median_ipt_ms)
+        )
     
     @classmethod
     def calculate_similarity(
         cls,
         exit_timing: TimingVector,
-        guard_timing: TimingVector
-    ) -> Tuple[float, Dict[str, float]]:
+        guard_timing: TimingVector,
+        min_score: Optional[float] = None
+    ) -> Tuple[float, Dict[str, Any]]:
         """
         Calculate timing similarity score between exit and guard timing vectors.
         
+        Results are memoized on the vectors' contents, so repeated
+        comparisons of the same sessions are answered from cache.
+        
+        Args:
+            exit_timing: Exit-side timing vector
+            guard_timing: Guard-side timing vector
+            min_score: Optional cutoff; pairs whose packet rates alone rule
+                       out reaching it return 0.0 without histogramming
+        
         Returns:
             Tuple of (similarity_score, component_scores)
             - similarity_score: 0-1, higher = more similar
             - component_scores: breakdown of individual metrics
         """
-        # Histogram-based comparison
-        exit_hist = exit_timing.to_histogram()
-        guard_hist = guard_timing.to_histogram()
-        hist_distance = cls.histogram_distance(exit_hist, guard_hist)
-        hist_similarity = 1.0 - hist_distance
-        
-        # Statistical comparison
-        stat_distance = cls.statistical_distance(exit_timing, guard_timing)
-        stat_similarity = 1.0 - stat_distance
-        
+        key = (exit_timing.digest, guard_timing.digest, min_score)
+        cached = cls._similarity_cache.get(key)
+        if cached is None:
+            cached = cls._compute_similarity(exit_timing, guard_timing, min_score)
+            cls._similarity_cache.put(key, cached)
+        score, component_scores = cached
+        return score, dict(component_scores)
+    
+    @classmethod
+    def _compute_similarity(
+        cls,
+        exit_timing: TimingVector,
+        guard_timing: TimingVector,
+        min_score: Optional[float]
+    ) -> Tuple[float, Dict[str, Any]]:
+        """Uncached body of calculate_similarity."""
         # Packet rate similarity (within expected TOR relay behavior)
         # TOR adds latency, so guard should have slightly higher packet rate
         rate_ratio = exit_timing.packet_count / max(guard_timing.packet_count, 1)
         # Expect exit to have 0.8-1.0x the packets of guard (some loss expected)
         rate_similarity = 1.0 - min(1.0, abs(rate_ratio - 0.9) / 0.5)
         
-        # Combined score (histogram is most reliable for timing patterns)
-        combined_similarity = (
-            0.5 * hist_similarity +
-            0.35 * stat_similarity +
-            0.15 * rate_similarity
+        # Histogram and statistical similarity contribute at most 0.85
+        if min_score is not None and 0.85 + 0.15 * rate_similarity < min_score:
+            return 0.0, {
+                "packet_rate_similarity": round(rate_similarity, 4),
+                "short_circuit": "rate_mismatch"
+            }
+        
+        # Histogram (Bhattacharyya), statistical and packet rate comparison;
+        # histogram is most reliable for timing patterns
+        combined_similarity, hist_similarity, stat_similarity, rate_similarity = (
+            _timing_similarity_kernel(
+                exit_timing.to_histogram(), float(exit_timing.mean_ipt_ms),
+                float(exit_timing.std_ipt_ms), float(exit_timing.median_ipt_ms),
+                exit_timing.packet_count,
+                guard_timing.to_histogram(), float(guard_timing.mean_ipt_ms),
+                float(guard_timing.std_ipt_ms), float(guard_timing.median_ipt_ms),
+                guard_timing.packet_count
+            )
         )
         
         component_scores = {
@@ -471,6 +971,83 @@ class TimingSimilarityAnalyzer:
         }
         
         return round(combined_similarity, 4), component_scores
+    
+    @staticmethod
+    def batch_histogram_similarity(
+        exit_hists: np.ndarray,
+        guard_hists: np.ndarray
+    ) -> np.ndarray:
+        """
+        Bhattacharyya coefficients for every exit/guard histogram pair.
+        
+        Args:
+            exit_hists: (N, B) array of normalized exit histograms
+            guard_hists: (M, B) array of normalized guard histograms
+            
+        Returns:
+            (N, M) array of histogram similarities (1 - histogram_distance)
+        """
+        return np.sqrt(exit_hists) @ np.sqrt(guard_hists).T
+    
+    @classmethod
+    def similarity_row(
+        cls,
+        exit_timing: TimingVector,
+        guard_batch: TimingVectorBatch
+    ) -> np.ndarray:
+        """
+        Read-only batch_similarity row of one exit vector against a guard
+        batch, memoized per (exit vector contents, guard batch contents).
+        """
+        key = (exit_timing.digest, guard_batch.digest)
+        row = cls._row_cache.get(key)
+        if row is None:
+            row = cls.batch_similarity(
+                TimingVectorBatch.from_vectors([exit_timing]), guard_batch
+            )[0]
+            row.flags.writeable = False
+            cls._row_cache.put(key, row)
+        return row
+    
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all memoized similarity results."""
+        cls._similarity_cache.clear()
+        cls._row_cache.clear()
+    
+    @classmethod
+    def batch_similarity(
+        cls,
+        exit_batch: TimingVectorBatch,
+        guard_batch: TimingVectorBatch
+    ) -> np.ndarray:
+        """
+        Combined timing similarity for every exit/guard pair in one pass.
+        
+        Applies the same metrics and weights as calculate_similarity, but
+        as matrix/broadcast operations over the packed batches.
+        
+        Returns:
+            (N, M) array of unrounded similarity scores
+        """
+        # One GEMM over the pre-rooted histograms
+        hist_similarity = exit_batch.sqrt_histograms @ guard_batch.sqrt_histograms.T
+        
+        # Statistical comparison
+        stat_similarity = 1.0 - _statistical_distance_batch(
+            exit_batch.means, exit_batch.stds, exit_batch.medians,
+            guard_batch.means, guard_batch.stds, guard_batch.medians
+        )
+        
+        # Packet rate similarity (see calculate_similarity)
+        rate_ratio = exit_batch.packet_counts[:, None] / np.maximum(guard_batch.packet_counts, 1)[None, :]
+        rate_similarity = 1.0 - np.minimum(1.0, np.abs(rate_ratio - 0.9) / 0.5)
+        
+        return (
+            0.5 * hist_similarity +
+            0.35 * stat_similarity +
+            0.15 * rate_similarity
+        )
 
 
 # =============================================================================
@@ -482,6 +1059,31 @@ class SessionOverlapAnalyzer:
     Analyzes temporal overlap between exit observations and guard activity windows.
     """
     
+    @staticmethod
+    def overlap_matrix(
+        starts1: np.ndarray,
+        ends1: np.ndarray,
+        starts2: np.ndarray,
+        ends2: np.ndarray
+    ) -> np.ndarray:
+        """
+        Pairwise TrafficSession.overlap_ratio over epoch-second arrays.
+        
+        Returns:
+            (N, M) array of overlap ratios, normalized by the shorter session
+        """
+        starts1 = np.asarray(starts1, dtype=np.float64)[:, None]
+        ends1 = np.asarray(ends1, dtype=np.float64)[:, None]
+        starts2 = np.asarray(starts2, dtype=np.float64)[None, :]
+        ends2 = np.asarray(ends2, dtype=np.float64)[None, :]
+        
+        overlap = np.minimum(ends1, ends2) - np.maximum(starts1, starts2)
+        min_duration = np.minimum(ends1 - starts1, ends2 - starts2)
+        
+        valid = (overlap > 0) & (min_duration > 0)
+        ratio = np.divide(overlap, min_duration, out=np.zeros_like(overlap), where=valid)
+        return np.minimum(1.0, ratio)
+    
     @staticmethod
     def calculate_overlap_score(
         exit_session: TrafficSession,
@@ -516,11 +1118,15 @@ class SessionOverlapAnalyzer:
         session_match_score = 0.0
         best_matching_session = None
         
-        for guard_session in guard_window.observed_sessions:
-            session_overlap = exit_session.overlap_ratio(guard_session)
-            if session_overlap > session_match_score:
-                session_match_score = session_overlap
-                best_matching_session = guard_session.session_id
+        if guard_window._session_starts.size:
+            ratios = SessionOverlapAnalyzer.overlap_matrix(
+                [exit_session._start_ts], [exit_session._end_ts],
+                guard_window._session_starts, guard_window._session_ends
+            )[0]
+            best = int(ratios.argmax())
+            if ratios[best] > 0:
+                session_match_score = float(ratios[best])
+                best_matching_session = guard_window._session_ids[best]
         
         # Combined score
         if session_match_score > 0:
@@ -655,6 +1261,58 @@ class BandwidthFeasibilityAnalyzer:
             explanation = "reasonable_bandwidth_utilization"
         
         return True, round(score, 4), explanation
+    
+    # Explanation strings indexed by the codes from batch_assess_feasibility
+    EXPLANATIONS: Tuple[str, ...] = (
+        "guard_bandwidth_unknown",
+        "exceeds_guard_bandwidth",
+        "minimal_bandwidth_utilization",
+        "low_bandwidth_utilization",
+        "reasonable_bandwidth_utilization",
+    )
+    
+    @staticmethod
+    def batch_assess_feasibility(
+        exit_bps: float,
+        guard_bps: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized assess_feasibility of one exit rate against many guards.
+        
+        Args:
+            exit_bps: Exit session throughput (bytes per second)
+            guard_bps: (M,) guard bandwidths; NaN or <= 0 means unknown
+            
+        Returns:
+            Tuple of (is_feasible, feasibility_score, explanation_code) arrays;
+            codes index EXPLANATIONS and scores are unrounded
+        """
+        guard_bps = np.asarray(guard_bps, dtype=np.float64)
+        known = guard_bps > 0  # False for NaN
+        
+        # TOR overhead factor (encryption, cell padding)
+        required_with_overhead = exit_bps * 1.15
+        utilization = required_with_overhead / np.where(known, guard_bps, np.inf)
+        
+        conditions = [
+            ~known,
+            utilization > 1.0,
+            utilization < 0.001,
+            utilization < 0.1,
+        ]
+        score = np.select(
+            conditions,
+            [
+                0.5,
+                np.maximum(0.0, 1.0 - (utilization - 1.0)),
+                0.3,
+                0.5 + utilization * 3,
+            ],
+            default=np.minimum(1.0, 0.8 + utilization * 0.2)
+        )
+        explanation_code = np.select(conditions, [0, 1, 2, 3], default=4).astype(np.int8)
+        
+        return utilization <= 1.0, score, explanation_code
 
 
 # =============================================================================
@@ -674,21 +1332,67 @@ class UncertaintyCalculator:
         if not evidence_items:
             return UncertaintyLevel.VERY_HIGH
         
-        supporting = [e for e in evidence_items if e.supports_hypothesis]
-        contradicting = [e for e in evidence_items if not e.supports_hypothesis]
+        # Single pass: support/contradict totals, evidence type bitmask, and
+        # the sum of squared signed weights for the consistency variance
+        support_weight = 0.0
+        contradict_weight = 0.0
+        squared_weight_sum = 0.0
+        type_mask = 0
+        for e in evidence_items:
+            if e.supports_hypothesis:
+                support_weight += e.weight
+            else:
+                contradict_weight += e.weight
+            squared_weight_sum += e.weight * e.weight
+            type_mask |= e.evidence_type.bit
+        
+        type_diversity = type_mask.bit_count()
         
-        support_weight = sum(e.weight for e in supporting)
-        contradict_weight = sum(e.weight for e in contradicting)
+        # Calculate consistency (sample variance of signed weights)
+        n = len(evidence_items)
+        if n > 1:
+            signed_sum = support_weight - contradict_weight
+            weight_variance = (squared_weight_sum - signed_sum * signed_sum / n) / (n - 1)
+        else:
+            weight_variance = 1.0
         
-        # Count evidence types
-        evidence_types = set(e.evidence_type for e in evidence_items)
-        type_diversity = len(evidence_types)
+        return UncertaintyCalculator._classify(
+            support_weight, contradict_weight, type_diversity, weight_variance
+        )
+    
+    @staticmethod
+    def calculate_array(evidence: EvidenceArray) -> UncertaintyLevel:
+        """
+        Same as calculate, over a packed EvidenceArray.
+        """
+        n = len(evidence)
+        if not n:
+            return UncertaintyLevel.VERY_HIGH
         
-        # Calculate consistency (variance in support/contradict)
-        all_weights = [e.weight * (1 if e.supports_hypothesis else -1) for e in evidence_items]
-        weight_variance = statistics.variance(all_weights) if len(all_weights) > 1 else 1.0
+        type_diversity = int(np.count_nonzero(
+            np.bincount(evidence.types, minlength=len(EvidenceType))
+        ))
         
-        # Decision logic
+        # Calculate consistency (sample variance of signed weights)
+        if n > 1:
+            signed = np.where(evidence.supports, evidence.weights, -evidence.weights)
+            weight_variance = float(signed.var(ddof=1))
+        else:
+            weight_variance = 1.0
+        
+        return UncertaintyCalculator._classify(
+            evidence.support_weight, evidence.contradict_weight,
+            type_diversity, weight_variance
+        )
+    
+    @staticmethod
+    def _classify(
+        support_weight: float,
+        contradict_weight: float,
+        type_diversity: int,
+        weight_variance: float
+    ) -> UncertaintyLevel:
+        """Decision logic shared by calculate and calculate_array."""
         if contradict_weight > support_weight * 1.5:
             return UncertaintyLevel.VERY_HIGH
         
@@ -713,10 +1417,264 @@ class UncertaintyCalculator:
         return UncertaintyLevel.MODERATE
 
 
+# =============================================================================
+# PAIRWISE SCORING KERNEL
+# =============================================================================
+
+# Component order of the last axis of score_session_pairs output
+PAIR_SCORE_COMPONENTS: Tuple[str, ...] = (
+    "histogram_similarity",
+    "statistical_similarity",
+    "packet_rate_similarity",
+    "session_overlap",
+    "bandwidth_feasibility",
+    "lifetime_plausibility",
+)
+
+# Plain-float copies of the config so the JIT can freeze them as constants
+_MIN_LIFETIME_SEC = CorrelationConfig.MIN_CIRCUIT_LIFETIME_SEC
+_MAX_LIFETIME_SEC = CorrelationConfig.MAX_CIRCUIT_LIFETIME_SEC
+_TYPICAL_LIFETIME_SEC = CorrelationConfig.TYPICAL_CIRCUIT_LIFETIME_SEC
+_LIFETIME_PADDING_SEC = CorrelationConfig.TIMING_WINDOW_TOLERANCE_SEC * 3
+
+
+def _lifetime_plausibility_kernel(lifetime_sec: float) -> float:
+    """CircuitLifetimeAnalyzer classification and weight in one step."""
+    if lifetime_sec < _MIN_LIFETIME_SEC:
+        return 0.0
+    if lifetime_sec > _MAX_LIFETIME_SEC:
+        return max(0.0, 0.3 * math.exp(-(lifetime_sec - _MAX_LIFETIME_SEC) / 600.0))
+    if lifetime_sec > _TYPICAL_LIFETIME_SEC:
+        ratio = (lifetime_sec - _TYPICAL_LIFETIME_SEC) / (_MAX_LIFETIME_SEC - _TYPICAL_LIFETIME_SEC)
+        return max(0.5, 1.0 - 0.5 * ratio)
+    return 1.0
+
+
+def _bandwidth_score_kernel(exit_bps: float, guard_bps: float) -> float:
+    """BandwidthFeasibilityAnalyzer score; guard_bps <= 0 means unknown."""
+    if guard_bps <= 0:
+        return 0.5
+    # TOR overhead factor (encryption, cell padding)
+    utilization = exit_bps * 1.15 / guard_bps
+    if utilization > 1.0:
+        return max(0.0, 1.0 - (utilization - 1.0))
+    if utilization < 0.001:
+        return 0.3
+    if utilization < 0.1:
+        return 0.5 + utilization * 3
+    return min(1.0, 0.8 + utilization * 0.2)
+
+
+def _score_all_pairs(
+    mean_e, std_e, med_e, hist_e, count_e, start_e, end_e, bps_e,
+    mean_g, std_g, med_g, hist_g, count_g, starts_g, ends_g, bw_g
+):
+    """(N, M, 6) component scores for every exit/guard session pair."""
+    n = mean_e.shape[0]
+    m = mean_g.shape[0]
+    bins = hist_e.shape[1]
+    out = np.empty((n, m, 6))
+    for i in prange(n):
+        for j in range(m):
+            bc = 0.0
+            for k in range(bins):
+                bc += math.sqrt(hist_e[i, k] * hist_g[j, k])
+            out[i, j, 0] = bc
+            
+            out[i, j, 1] = 1.0 - _statistical_distance_kernel(
+                mean_e[i], std_e[i], med_e[i], mean_g[j], std_g[j], med_g[j]
+            )
+            
+            rate_ratio = count_e[i] / max(count_g[j], 1)
+            out[i, j, 2] = 1.0 - min(1.0, abs(rate_ratio - 0.9) / 0.5)
+            
+            overlap = min(end_e[i], ends_g[j]) - max(start_e[i], starts_g[j])
+            min_duration = min(end_e[i] - start_e[i], ends_g[j] - starts_g[j])
+            if overlap > 0 and min_duration > 0:
+                out[i, j, 3] = min(1.0, overlap / min_duration)
+            else:
+                out[i, j, 3] = 0.0
+            
+            out[i, j, 4] = _bandwidth_score_kernel(bps_e[i], bw_g[j])
+            out[i, j, 5] = _lifetime_plausibility_kernel(
+                end_e[i] - starts_g[j] + _LIFETIME_PADDING_SEC
+            )
+    return out
+
+
+def _score_all_pairs_numpy(
+    mean_e, std_e, med_e, hist_e, count_e, start_e, end_e, bps_e,
+    mean_g, std_g, med_g, hist_g, count_g, starts_g, ends_g, bw_g
+):
+    """(N, M, 6) component scores via broadcasting over the batch helpers."""
+    out = np.empty((mean_e.shape[0], mean_g.shape[0], 6))
+    out[..., 0] = TimingSimilarityAnalyzer.batch_histogram_similarity(hist_e, hist_g)
+    out[..., 1] = 1.0 - _statistical_distance_batch_numpy(
+        mean_e, std_e, med_e, mean_g, std_g, med_g
+    )
+    rate_ratio = count_e[:, None] / np.maximum(count_g, 1)[None, :]
+    out[..., 2] = 1.0 - np.minimum(1.0, np.abs(rate_ratio - 0.9) / 0.5)
+    out[..., 3] = SessionOverlapAnalyzer.overlap_matrix(start_e, end_e, starts_g, ends_g)
+    out[..., 4] = BandwidthFeasibilityAnalyzer.batch_assess_feasibility(
+        bps_e[:, None], bw_g[None, :]
+    )[1]
+    
+    lifetime = end_e[:, None] - starts_g[None, :] + _LIFETIME_PADDING_SEC
+    excess = np.maximum(lifetime - _MAX_LIFETIME_SEC, 0.0)
+    out[..., 5] = np.select(
+        [
+            lifetime < _MIN_LIFETIME_SEC,
+            lifetime > _MAX_LIFETIME_SEC,
+            lifetime > _TYPICAL_LIFETIME_SEC,
+        ],
+        [
+            0.0,
+            0.3 * np.exp(-excess / 600.0),
+            np.maximum(0.5, 1.0 - 0.5 * (lifetime - _TYPICAL_LIFETIME_SEC) / (
+                _MAX_LIFETIME_SEC - _TYPICAL_LIFETIME_SEC
+            )),
+        ],
+        default=1.0
+    )
+    return out
+
+
+if NUMBA_AVAILABLE:
+    _lifetime_plausibility_kernel = njit(cache=True)(_lifetime_plausibility_kernel)
+    _bandwidth_score_kernel = njit(cache=True)(_bandwidth_score_kernel)
+    _score_all_pairs = njit(cache=True, parallel=True, fastmath=True)(_score_all_pairs)
+else:
+    _score_all_pairs = _score_all_pairs_numpy
+
+
+def _pack_session_arrays(
+    sessions: List[TrafficSession],
+    bins: int
+) -> Tuple[np.ndarray, ...]:
+    """
+    SoA view of sessions for the pairwise kernel.
+    
+    Timing fields are zero for sessions without a timing vector; the
+    returned mask marks which rows carry real timing data.
+    """
+    n = len(sessions)
+    has_timing = np.fromiter(
+        (s.timing_vector is not None for s in sessions), dtype=bool, count=n
+    )
+    batch = TimingVectorBatch.from_vectors(
+        [s.timing_vector for s in sessions if s.timing_vector is not None], bins
+    )
+    
+    means, stds, medians = np.zeros(n), np.zeros(n), np.zeros(n)
+    counts = np.zeros(n, dtype=np.int64)
+    histograms = np.zeros((n, bins), dtype=np.float32)
+    means[has_timing] = batch.means
+    stds[has_timing] = batch.stds
+    medians[has_timing] = batch.medians
+    counts[has_timing] = batch.packet_counts
+    histograms[has_timing] = batch.histograms
+    
+    starts = np.fromiter((s._start_ts for s in sessions), dtype=np.float64, count=n)
+    ends = np.fromiter((s._end_ts for s in sessions), dtype=np.float64, count=n)
+    return has_timing, means, stds, medians, histograms, counts, starts, ends
+
+
+def score_session_pairs(
+    exit_sessions: List[TrafficSession],
+    guard_sessions: List[TrafficSession],
+    guard_bandwidth_bps: Optional[List[Optional[float]]] = None
+) -> np.ndarray:
+    """
+    Score every exit/guard session pair in one kernel call.
+    
+    Args:
+        exit_sessions: N exit-side sessions
+        guard_sessions: M guard-side sessions
+        guard_bandwidth_bps: Per guard session bandwidth of its relay
+                             (None entries, or no list, mean unknown)
+    
+    Returns:
+        (N, M, 6) array of unrounded component scores ordered as
+        PAIR_SCORE_COMPONENTS; timing components are NaN for pairs where
+        either session lacks a timing vector
+    """
+    bins = CorrelationConfig.IPT_SIMILARITY_BANDS
+    timing_e, *exit_arrays = _pack_session_arrays(exit_sessions, bins)
+    timing_g, *guard_arrays = _pack_session_arrays(guard_sessions, bins)
+    
+    bps_e = np.fromiter(
+        (s.bytes_per_second for s in exit_sessions), dtype=np.float64, count=len(exit_sessions)
+    )
+    # Unknown bandwidth is passed as 0 so the fastmath kernel never sees NaN
+    if guard_bandwidth_bps is None:
+        bw_g = np.zeros(len(guard_sessions))
+    else:
+        bw_g = np.nan_to_num(np.array(guard_bandwidth_bps, dtype=np.float64), nan=0.0)
+    
+    scores = _score_all_pairs(*exit_arrays, bps_e, *guard_arrays, bw_g)
+    scores[..., :3][~(timing_e[:, None] & timing_g[None, :])] = np.nan
+    return scores
+
+
 # =============================================================================
 # MAIN CORRELATION ENGINE
 # =============================================================================
 
+@dataclass(frozen=True, eq=False, slots=True)
+class GuardIndex:
+    """
+    Structure-of-arrays index over a list of guard activity windows.
+    
+    Built once per guard set and shared by every exit observation
+    correlated against it. Window g owns timing rows
+    timing_offsets[g]:timing_offsets[g + 1] of the packed timing batch.
+    """
+    windows: Tuple[RelayActivityWindow, ...]
+    start_ts: np.ndarray        # float64 window_start epoch seconds, (G,)
+    end_ts: np.ndarray          # float64 window_end epoch seconds, (G,)
+    start_us: np.ndarray        # int64 window_start epoch microseconds, (G,)
+    end_us: np.ndarray          # int64 window_end epoch microseconds, (G,)
+    bandwidths: np.ndarray      # float64 bytes/sec, NaN when unknown, (G,)
+    is_guard: np.ndarray        # bool, (G,)
+    timing: TimingVectorBatch   # guard sessions with timing vectors, (T,)
+    timing_offsets: np.ndarray  # int64, (G + 1,)
+    
+    @classmethod
+    def build(cls, guard_windows: Sequence[RelayActivityWindow]) -> 'GuardIndex':
+        """Pack guard windows and their observed session timing."""
+        n = len(guard_windows)
+        timing_vectors = []
+        timing_offsets = np.zeros(n + 1, dtype=np.int64)
+        for g, w in enumerate(guard_windows):
+            timing_vectors.extend(
+                s.timing_vector for s in w.observed_sessions if s.timing_vector
+            )
+            timing_offsets[g + 1] = len(timing_vectors)
+        
+        return cls(
+            windows=tuple(guard_windows),
+            start_ts=np.fromiter(
+                (_epoch_seconds(w.window_start) for w in guard_windows), dtype=np.float64, count=n
+            ),
+            end_ts=np.fromiter(
+                (_epoch_seconds(w.window_end) for w in guard_windows), dtype=np.float64, count=n
+            ),
+            start_us=np.fromiter((w._start_us for w in guard_windows), dtype=np.int64, count=n),
+            end_us=np.fromiter((w._end_us for w in guard_windows), dtype=np.int64, count=n),
+            bandwidths=np.fromiter(
+                (np.nan if w.bandwidth_bytes_per_sec is None else w.bandwidth_bytes_per_sec
+                 for w in guard_windows),
+                dtype=np.float64, count=n
+            ),
+            is_guard=np.fromiter((w.is_guard for w in guard_windows), dtype=bool, count=n),
+            timing=TimingVectorBatch.from_vectors(timing_vectors),
+            timing_offsets=timing_offsets
+        )
+    
+    def __len__(self) -> int:
+        return len(self.windows)
+
+
 class ForensicCorrelationEngine:
     """
     Main engine for performing forensic correlation analysis.
@@ -728,10 +1686,27 @@ class ForensicCorrelationEngine:
     def __init__(self, config: CorrelationConfig = None):
         self.config = config or CorrelationConfig()
         self.timing_analyzer = TimingSimilarityAnalyzer()
+        _warm_up_kernels()
         self.overlap_analyzer = SessionOverlapAnalyzer()
         self.lifetime_analyzer = CircuitLifetimeAnalyzer()
         self.bandwidth_analyzer = BandwidthFeasibilityAnalyzer()
         self.uncertainty_calculator = UncertaintyCalculator()
+        # Index built by the last correlate call
+        self._guard_index_cache: Optional[GuardIndex] = None
+    
+    def _guard_index(self, guard_windows: List[RelayActivityWindow]) -> GuardIndex:
+        """
+        Guard index, reused while the same windows are passed in order.
+        
+        The index keeps a tuple snapshot of the windows it was built from,
+        so replacing, adding or removing a list element forces a rebuild.
+        """
+        cached = self._guard_index_cache
+        if (cached is None or len(cached.windows) != len(guard_windows)
+                or any(a is not b for a, b in zip(cached.windows, guard_windows))):
+            cached = GuardIndex.build(guard_windows)
+            self._guard_index_cache = cached
+        return cached
     
     def correlate(
         self,
@@ -750,18 +1725,60 @@ class ForensicCorrelationEngine:
         Returns:
             List of CorrelationHypothesis objects, sorted by evidence strength
         """
+        return self.correlate_prebuilt(
+            exit_observation, self._guard_index(guard_activity_windows), max_hypotheses
+        )
+    
+    def correlate_prebuilt(
+        self,
+        exit_observation: ExitObservation,
+        guards: GuardIndex,
+        max_hypotheses: int = 10,
+        timing_scores: Optional[np.ndarray] = None
+    ) -> List[CorrelationHypothesis]:
+        """
+        Generate correlation hypotheses against a prebuilt GuardIndex.
+        
+        Same results as correlate(); use this when the same guard set is
+        correlated against many exit observations. timing_scores may carry
+        the observation's precomputed similarity_row against guards.timing.
+        """
         hypotheses: List[CorrelationHypothesis] = []
         exit_session = exit_observation.observed_session
         
-        for guard_window in guard_activity_windows:
-            # Skip if guard is not actually a guard node
-            if not guard_window.is_guard:
-                continue
-            
-            # Skip if no temporal overlap possible
-            if (guard_window.window_end < exit_session.start_time or
-                guard_window.window_start > exit_session.end_time):
-                continue
+        # Cheap pre-filters as masks over all windows: guard flag, temporal
+        # overlap, and the window-level overlap ratio that
+        # calculate_overlap_score would otherwise reject
+        candidates = (
+            guards.is_guard &
+            (guards.end_us >= exit_session._start_us) &
+            (guards.start_us <= exit_session._end_us)
+        )
+        base_overlap = self.overlap_analyzer.overlap_matrix(
+            [exit_session._start_ts], [exit_session._end_ts], guards.start_ts, guards.end_ts
+        )[0]
+        candidates &= base_overlap >= self.config.MIN_SESSION_OVERLAP_RATIO
+        candidate_idx = np.flatnonzero(candidates)
+        
+        # Bandwidth feasibility for every surviving guard at once
+        bw_feasible, bw_scores, bw_codes = self.bandwidth_analyzer.batch_assess_feasibility(
+            exit_session.bytes_per_second, guards.bandwidths[candidate_idx]
+        )
+        
+        # Timing similarity against every guard session in one batch; each
+        # window then takes the max over its own slice
+        exit_timing = exit_session.timing_vector
+        if exit_timing and len(guards.timing):
+            session_timing_scores = timing_scores
+            if session_timing_scores is None:
+                session_timing_scores = self.timing_analyzer.similarity_row(exit_timing, guards.timing)
+        
+        # Combined weights of the best max_hypotheses so far (min-heap)
+        top_weights: List[float] = []
+        generated_at = datetime.utcnow()
+        
+        for pos, window_idx in enumerate(candidate_idx.tolist()):
+            guard_window = guards.windows[window_idx]
             
             # Collect evidence for this guard
             evidence_items: List[EvidenceItem] = []
@@ -785,22 +1802,12 @@ class ForensicCorrelationEngine:
             
             # 2. Timing similarity analysis
             timing_score = 0.0
-            timing_components = {}
             
-            if exit_session.timing_vector and guard_window.observed_sessions:
-                # Find best matching guard session
-                best_timing_score = 0.0
-                for guard_session in guard_window.observed_sessions:
-                    if guard_session.timing_vector:
-                        score, components = self.timing_analyzer.calculate_similarity(
-                            exit_session.timing_vector,
-                            guard_session.timing_vector
-                        )
-                        if score > best_timing_score:
-                            best_timing_score = score
-                            timing_components = components
-                
-                timing_score = best_timing_score
+            if exit_timing and guard_window.observed_sessions:
+                lo = guards.timing_offsets[window_idx]
+                hi = guards.timing_offsets[window_idx + 1]
+                if hi > lo:
+                    timing_score = round(float(session_timing_scores[lo:hi].max()), 4)
                 
                 evidence_items.append(EvidenceItem(
                     evidence_type=EvidenceType.TIMING_SIMILARITY,
@@ -821,37 +1828,64 @@ class ForensicCorrelationEngine:
                     supports_hypothesis=False
                 ))
             
+            # Bandwidth feasibility was scored for all candidates above
+            is_feasible = bool(bw_feasible[pos])
+            bw_score = float(bw_scores[pos])
+            if is_feasible:
+                bw_score = round(bw_score, 4)
+            
+            # Skip guards that cannot reach the current top-K even if the
+            # lifetime (weight <= 0.7) and behavioral (<= 0.4) evidence both
+            # come out fully supporting; more support only raises the ratio
+            if max_hypotheses > 0 and len(top_weights) == max_hypotheses:
+                support = 1.1
+                contradict = 0.0
+                for item in evidence_items:
+                    if item.supports_hypothesis:
+                        support += item.weight
+                    else:
+                        contradict += item.weight
+                if is_feasible:
+                    support += bw_score * 0.5
+                else:
+                    contradict += bw_score * 0.5
+                if (support - contradict) / (support + contradict) < top_weights[0]:
+                    continue
+            
             # 3. Circuit lifetime analysis
             circuit_lifetime = None
             if guard_window.observed_sessions:
-                # Use the best overlapping session
-                for guard_session in guard_window.observed_sessions:
-                    if exit_session.overlaps_with(guard_session):
-                        lifetime, feasibility = self.lifetime_analyzer.estimate_circuit_lifetime(
-                            exit_session, guard_session
-                        )
-                        circuit_lifetime = lifetime
-                        plausibility_weight = self.lifetime_analyzer.lifetime_plausibility_weight(
-                            lifetime, feasibility
-                        )
-                        
-                        evidence_items.append(EvidenceItem(
-                            evidence_type=EvidenceType.CIRCUIT_LIFETIME_PLAUSIBILITY,
-                            description=f"Implied circuit lifetime: {feasibility}",
-                            measured_value=lifetime,
-                            reference_range=(
-                                self.config.MIN_CIRCUIT_LIFETIME_SEC,
-                                self.config.MAX_CIRCUIT_LIFETIME_SEC
-                            ),
-                            weight=plausibility_weight * 0.7,
-                            supports_hypothesis=feasibility.startswith("plausible")
-                        ))
-                        break
+                # Use the first overlapping session (TrafficSession.overlaps_with
+                # over the packed session bounds)
+                overlapping = (
+                    (guard_window._session_ends >= exit_session._start_ts) &
+                    (guard_window._session_starts <= exit_session._end_ts)
+                )
+                first = int(overlapping.argmax())
+                if overlapping[first]:
+                    guard_session = guard_window.observed_sessions[first]
+                    lifetime, feasibility = self.lifetime_analyzer.estimate_circuit_lifetime(
+                        exit_session, guard_session
+                    )
+                    circuit_lifetime = lifetime
+                    plausibility_weight = self.lifetime_analyzer.lifetime_plausibility_weight(
+                        lifetime, feasibility
+                    )
+                    
+                    evidence_items.append(EvidenceItem(
+                        evidence_type=EvidenceType.CIRCUIT_LIFETIME_PLAUSIBILITY,
+                        description=f"Implied circuit lifetime: {feasibility}",
+                        measured_value=lifetime,
+                        reference_range=(
+                            self.config.MIN_CIRCUIT_LIFETIME_SEC,
+                            self.config.MAX_CIRCUIT_LIFETIME_SEC
+                        ),
+                        weight=plausibility_weight * 0.7,
+                        supports_hypothesis=feasibility.startswith("plausible")
+                    ))
             
             # 4. Bandwidth feasibility
-            is_feasible, bw_score, bw_explanation = self.bandwidth_analyzer.assess_feasibility(
-                exit_session, guard_window.bandwidth_bytes_per_sec
-            )
+            bw_explanation = self.bandwidth_analyzer.EXPLANATIONS[bw_codes[pos]]
             
             evidence_items.append(EvidenceItem(
                 evidence_type=EvidenceType.BANDWIDTH_FEASIBILITY,
@@ -863,16 +1897,13 @@ class ForensicCorrelationEngine:
             ))
             
             # 5. Behavioral consistency (packet size patterns)
-            if guard_window.observed_sessions:
-                best_behavioral_match = 0.0
-                for guard_session in guard_window.observed_sessions:
-                    if guard_session.avg_packet_size > 0 and exit_session.avg_packet_size > 0:
-                        # TOR cells are typically 512 bytes, but application data varies
-                        size_ratio = min(
-                            exit_session.avg_packet_size / guard_session.avg_packet_size,
-                            guard_session.avg_packet_size / exit_session.avg_packet_size
-                        )
-                        best_behavioral_match = max(best_behavioral_match, size_ratio)
+            sizes = guard_window._packet_sizes
+            exit_size = exit_session.avg_packet_size
+            if sizes.size and exit_size > 0:
+                # TOR cells are typically 512 bytes, but application data varies
+                best_behavioral_match = float(
+                    np.minimum(exit_size / sizes, sizes / exit_size).max()
+                )
                 
                 if best_behavioral_match > 0:
                     evidence_items.append(EvidenceItem(
@@ -885,7 +1916,8 @@ class ForensicCorrelationEngine:
                     ))
             
             # Calculate uncertainty level
-            uncertainty = self.uncertainty_calculator.calculate(evidence_items)
+            evidence = EvidenceArray.from_items(evidence_items)
+            uncertainty = self.uncertainty_calculator.calculate_array(evidence)
             
             # Create hypothesis
             hypothesis = CorrelationHypothesis(
@@ -896,38 +1928,86 @@ class ForensicCorrelationEngine:
                 exit_node_nickname=exit_observation.exit_nickname,
                 timing_similarity_score=timing_score,
                 session_overlap_score=overlap_score,
-                evidence_summary=evidence_items,
+                evidence_summary=tuple(evidence_items),
                 uncertainty_level=uncertainty,
-                circuit_lifetime_estimate_sec=circuit_lifetime
+                circuit_lifetime_estimate_sec=circuit_lifetime,
+                generated_at=generated_at,
+                evidence_array=evidence
             )
             
             hypotheses.append(hypothesis)
-        
-        # Sort by combined evidence weight (strongest evidence first)
-        hypotheses.sort(key=lambda h: h.combined_evidence_weight, reverse=True)
-        
-        return hypotheses[:max_hypotheses]
+            
+            weight = hypothesis.combined_evidence_weight
+            if len(top_weights) < max_hypotheses:
+                heapq.heappush(top_weights, weight)
+            elif max_hypotheses > 0 and weight > top_weights[0]:
+                heapq.heapreplace(top_weights, weight)
+        
+        # Top-K by combined evidence weight (strongest evidence first)
+        return heapq.nlargest(
+            max_hypotheses, hypotheses, key=lambda h: h.combined_evidence_weight
+        )
     
     def correlate_batch(
         self,
         exit_observations: List[ExitObservation],
         guard_activity_windows: List[RelayActivityWindow],
-        max_hypotheses_per_observation: int = 5
+        max_hypotheses_per_observation: int = 5,
+        parallel: bool = False,
+        max_workers: Optional[int] = None
     ) -> Dict[str, List[CorrelationHypothesis]]:
         """
         Correlate multiple exit observations.
         
+        Observations are independent once the guard index is built, so
+        parallel=True spreads them over a thread pool. That is opt-in: the
+        per-guard evidence loop in correlate_prebuilt is Python and holds
+        the GIL, so threads currently give no speedup. All timing rows are
+        scored up front in one batch on the calling thread, so workers
+        never launch the parallel JIT kernels (which are not safe to enter
+        from several threads at once).
+        
         Returns:
             Dict mapping observation_id to list of hypotheses
         """
-        results = {}
-        
-        for observation in exit_observations:
-            hypotheses = self.correlate(
+        # Pack the guard set once for all observations
+        guards = GuardIndex.build(guard_activity_windows)
+        
+        # Timing similarity of every timed observation vs every guard session
+        timing_rows: List[Optional[np.ndarray]] = [None] * len(exit_observations)
+        timed = [
+            k for k, obs in enumerate(exit_observations)
+            if obs.observed_session.timing_vector
+        ]
+        if timed and len(guards.timing):
+            matrix = self.timing_analyzer.batch_similarity(
+                TimingVectorBatch.from_vectors(
+                    [exit_observations[k].observed_session.timing_vector for k in timed]
+                ),
+                guards.timing
+            )
+            for row, k in enumerate(timed):
+                timing_rows[k] = matrix[row]
+        
+        def correlate_one(
+            observation: ExitObservation,
+            timing_scores: Optional[np.ndarray]
+        ) -> List[CorrelationHypothesis]:
+            return self.correlate_prebuilt(
                 observation,
-                guard_activity_windows,
-                max_hypotheses=max_hypotheses_per_observation
+                guards,
+                max_hypotheses=max_hypotheses_per_observation,
+                timing_scores=timing_scores
             )
+        
+        if parallel and len(exit_observations) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+                all_hypotheses = list(executor.map(correlate_one, exit_observations, timing_rows))
+        else:
+            all_hypotheses = list(map(correlate_one, exit_observations, timing_rows))
+        
+        results = {}
+        for observation, hypotheses in zip(exit_observations, all_hypotheses):
             results[observation.observation_id] = hypotheses
         
         return results
@@ -937,6 +2017,14 @@ class ForensicCorrelationEngine:
 # DATABASE INTEGRATION HELPERS
 # =============================================================================
 
+# Relay document fields read by the window and path builders below
+_GUARD_WINDOW_PROJECTION = {
+    "fingerprint": 1, "nickname": 1, "first_seen": 1, "last_seen": 1,
+    "advertised_bandwidth": 1, "flags": 1, "as": 1, "country": 1, "_id": 0
+}
+_PATH_RELAY_PROJECTION = {"fingerprint": 1, "nickname": 1, "_id": 0}
+
+
 def parse_datetime(value: Any) -> Optional[datetime]:
     """Parse datetime from various formats."""
     if value is None:
@@ -949,21 +2037,95 @@ def parse_datetime(value: Any) -> Optional[datetime]:
         return None
 
 
+_NAT = np.datetime64("NaT", "us")
+
+# Offset-free ISO-8601 timestamps, the only strings handed to NumPy; NumPy
+# also accepts "now"/"today" and partial dates, which parse_datetime rejects
+_ISO_DATETIME = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?"
+)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an aware datetime to naive UTC; naive values pass through."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _batch_parse_dt(values: Sequence[Any]) -> np.ndarray:
+    """
+    Parse many timestamps at once into a datetime64[us] array (NaT if unparseable).
+    
+    Offset-free ISO-8601 strings are converted by NumPy in one pass.
+    Anything else (other formats, explicit UTC offsets) goes through
+    parse_datetime one value at a time; aware results are normalised to
+    naive UTC.
+    """
+    out = np.full(len(values), _NAT)
+    
+    fast = [
+        k for k, v in enumerate(values)
+        if isinstance(v, str) and _ISO_DATETIME.fullmatch(v)
+    ]
+    if fast:
+        try:
+            out[fast] = np.array([values[k] for k in fast], dtype="datetime64[us]")
+            fast = set(fast)
+        except ValueError:
+            # Out-of-range fields; let parse_datetime decide value by value
+            fast = set()
+    
+    for k, value in enumerate(values):
+        if k in fast or value is None:
+            continue
+        parsed = _naive_utc(parse_datetime(value))
+        if parsed is not None:
+            out[k] = np.datetime64(parsed, "us")
+    
+    return out
+
+
+def _relay_window(
+    relay: Dict[str, Any],
+    first_seen: datetime,
+    last_seen: datetime,
+    traffic_sessions: List[TrafficSession]
+) -> RelayActivityWindow:
+    return RelayActivityWindow(
+        relay_fingerprint=relay.get("fingerprint", "unknown"),
+        relay_nickname=relay.get("nickname", "unknown"),
+        window_start=first_seen,
+        window_end=last_seen,
+        observed_sessions=traffic_sessions,
+        bandwidth_bytes_per_sec=relay.get("advertised_bandwidth"),
+        flags=relay.get("flags", []),
+        autonomous_system=relay.get("as"),
+        country_code=relay.get("country")
+    )
+
+
 def build_guard_activity_window_from_relay(
     relay: Dict[str, Any],
-    sessions: List[Dict[str, Any]] = None
+    sessions: List[Dict[str, Any]] = None,
+    now: Optional[datetime] = None
 ) -> RelayActivityWindow:
     """
     Build a RelayActivityWindow from relay document and optional session data.
+    
+    `now` anchors the default window; pass one value when building many.
+    Window bounds are naive UTC, as in build_guard_windows_bulk.
     """
-    first_seen = parse_datetime(relay.get("first_seen"))
-    last_seen = parse_datetime(relay.get("last_seen"))
+    first_seen = _naive_utc(parse_datetime(relay.get("first_seen")))
+    last_seen = _naive_utc(parse_datetime(relay.get("last_seen")))
     
     # Default to last 24 hours if no timestamps
+    if not first_seen or not last_seen:
+        now = now or datetime.utcnow()
     if not first_seen:
-        first_seen = datetime.utcnow() - timedelta(days=1)
+        first_seen = now - timedelta(days=1)
     if not last_seen:
-        last_seen = datetime.utcnow()
+        last_seen = now
     
     # Convert sessions
     traffic_sessions = []
@@ -983,34 +2145,55 @@ def build_guard_activity_window_from_relay(
                 timing_vector=timing_vec
             ))
     
-    return RelayActivityWindow(
-        relay_fingerprint=relay.get("fingerprint", "unknown"),
-        relay_nickname=relay.get("nickname", "unknown"),
-        window_start=first_seen,
-        window_end=last_seen,
-        observed_sessions=traffic_sessions,
-        bandwidth_bytes_per_sec=relay.get("advertised_bandwidth"),
-        flags=relay.get("flags", []),
-        autonomous_system=relay.get("as"),
-        country_code=relay.get("country")
+    return _relay_window(relay, first_seen, last_seen, traffic_sessions)
+
+
+def build_guard_windows_bulk(
+    relays: List[Dict[str, Any]],
+    now: Optional[datetime] = None
+) -> List[RelayActivityWindow]:
+    """
+    Build session-less RelayActivityWindows for many relay documents.
+    
+    All first_seen/last_seen values are parsed in one batch into naive
+    UTC; missing or unparseable timestamps default to the last 24 hours,
+    as in build_guard_activity_window_from_relay.
+    """
+    n = len(relays)
+    parsed = _batch_parse_dt(
+        [r.get("first_seen") for r in relays] + [r.get("last_seen") for r in relays]
     )
+    bounds = parsed.astype(object)
+    
+    now = now or datetime.utcnow()
+    default_start = now - timedelta(days=1)
+    
+    return [
+        _relay_window(relay, bounds[k] or default_start, bounds[n + k] or now, [])
+        for k, relay in enumerate(relays)
+    ]
 
 
 def build_exit_observation_from_pcap_session(
     session_data: Dict[str, Any],
-    exit_relay: Dict[str, Any]
+    exit_relay: Dict[str, Any],
+    now: Optional[datetime] = None
 ) -> ExitObservation:
     """
     Build an ExitObservation from PCAP session data and exit relay info.
+    
+    `now` stamps the observation and fills missing session bounds; pass
+    one value when building many.
     """
+    now = now or datetime.utcnow()
     timing_vec = None
     if "inter_packet_times_ms" in session_data:
         timing_vec = TimingVector.from_ipt_list(session_data["inter_packet_times_ms"])
     elif "packet_timestamps" in session_data:
         timing_vec = TimingVector.from_timestamps(session_data["packet_timestamps"])
     
-    start_time = parse_datetime(session_data.get("start_time")) or datetime.utcnow()
-    end_time = parse_datetime(session_data.get("end_time")) or datetime.utcnow()
+    start_time = parse_datetime(session_data.get("start_time")) or now
+    end_time = parse_datetime(session_data.get("end_time")) or now
     
     traffic_session = TrafficSession(
         session_id=session_data.get("session_id", str(uuid.uuid4())),
@@ -1030,7 +2213,7 @@ def build_exit_observation_from_pcap_session(
         exit_nickname=exit_relay.get("nickname", "unknown"),
         observed_session=traffic_session,
         destination_info=session_data.get("destination_category"),
-        timestamp=datetime.utcnow()
+        timestamp=now
     )
 
 
@@ -1038,11 +2221,24 @@ def build_exit_observation_from_pcap_session(
 # HIGH-LEVEL API FUNCTIONS
 # =============================================================================
 
+# Shared engine for the high-level API; the analyzers hold no per-call state
+_DEFAULT_ENGINE: Optional[ForensicCorrelationEngine] = None
+
+
+def _get_engine() -> ForensicCorrelationEngine:
+    """Return the module-wide engine, creating it on first use."""
+    global _DEFAULT_ENGINE
+    if _DEFAULT_ENGINE is None:
+        _DEFAULT_ENGINE = ForensicCorrelationEngine()
+    return _DEFAULT_ENGINE
+
+
 def correlate_exit_traffic(
     pcap_sessions: List[Dict[str, Any]],
     exit_relay_info: Dict[str, Any],
     guard_candidates: List[Dict[str, Any]] = None,
-    max_hypotheses: int = 10
+    max_hypotheses: int = 10,
+    engine: Optional[ForensicCorrelationEngine] = None
 ) -> List[Dict[str, Any]]:
     """
     High-level API for correlating exit traffic with potential guard nodes.
@@ -1053,6 +2249,7 @@ def correlate_exit_traffic(
         guard_candidates: Optional list of guard relay candidates.
                           If None, fetches from database.
         max_hypotheses: Maximum hypotheses to return
+        engine: Optional engine to use instead of the shared default
         
     Returns:
         List of correlation hypothesis dictionaries
@@ -1062,42 +2259,45 @@ def correlate_exit_traffic(
         This is forensic correlation, NOT identification.
     """
     db = get_database()
-    engine = ForensicCorrelationEngine()
+    _ensure_indexes(db)
+    engine = engine or _get_engine()
+    # One clock read for every default timestamp in this call
+    now = datetime.utcnow()
     
     # Build exit observations
     exit_observations = [
-        build_exit_observation_from_pcap_session(sess, exit_relay_info)
+        build_exit_observation_from_pcap_session(sess, exit_relay_info, now)
         for sess in pcap_sessions
     ]
     
     # Get guard candidates
     if guard_candidates is None:
         guard_candidates = list(db.relays.find(
-            {"is_guard": True, "running": True}
+            {"is_guard": True, "running": True},
+            _GUARD_WINDOW_PROJECTION
         ).limit(200))
     
     # Build guard activity windows
-    guard_windows = [
-        build_guard_activity_window_from_relay(relay)
-        for relay in guard_candidates
-    ]
+    guard_windows = build_guard_windows_bulk(guard_candidates, now)
     
     # Perform correlation
-    all_hypotheses = []
+    # Keep only the strongest max_hypotheses across all observations in a
+    # bounded min-heap keyed on net evidence weight. The sequence number
+    # breaks ties in arrival order, as a stable sort would.
+    heap: List[Tuple[float, int, CorrelationHypothesis]] = []
+    seq = 0
     for observation in exit_observations:
-        hypotheses = engine.correlate(observation, guard_windows, max_hypotheses)
-        all_hypotheses.extend([h.to_dict() for h in hypotheses])
-    
-    # Sort by combined evidence and return top results
-    all_hypotheses.sort(
-        key=lambda h: sum(
-            e["weight"] * (1 if e["supports_hypothesis"] else -1)
-            for e in h["evidence_summary"]
-        ),
-        reverse=True
-    )
+        for h in engine.correlate(observation, guard_windows, max_hypotheses):
+            entry = (h.evidence_array.net_weight, -seq, h)
+            seq += 1
+            if len(heap) < max_hypotheses:
+                heapq.heappush(heap, entry)
+            elif heap and entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
     
-    return all_hypotheses[:max_hypotheses]
+    # Serialize only the survivors, strongest first
+    heap.sort(key=itemgetter(0, 1), reverse=True)
+    return [h.to_dict() for _, _, h in heap]
 
 
 def store_correlation_results(
@@ -1107,10 +2307,14 @@ def store_correlation_results(
     """
     Store correlation results in database for forensic record.
     
+    Storing again under an existing investigation_id replaces that
+    investigation's results with the new run.
+    
     Returns:
         The investigation ID
     """
     db = get_database()
+    _ensure_indexes(db)
     
     if investigation_id is None:
         investigation_id = str(uuid.uuid4())
@@ -1126,7 +2330,11 @@ def store_correlation_results(
         )
     }
     
-    db.correlation_results.insert_one(record)
+    # Upsert: investigation_id is unique, so a plain insert would raise
+    # DuplicateKeyError for a re-run with a caller-supplied id
+    db.correlation_results.replace_one(
+        {"investigation_id": investigation_id}, record, upsert=True
+    )
     
     return investigation_id
 
@@ -1145,6 +2353,11 @@ def get_correlation_results(investigation_id: str) -> Optional[Dict[str, Any]]:
 # LEGACY COMPATIBILITY LAYER
 # =============================================================================
 
+def _path_id(entry: str, middle: str, exit_fp: str) -> str:
+    """Content-derived path id: stable across runs, no entropy needed"""
+    return hashlib.blake2b(f"{entry}|{middle}|{exit_fp}".encode(), digest_size=8).hexdigest()
+
+
 def generate_candidate_paths() -> List[Dict[str, Any]]:
     """
     Legacy function for backward compatibility.
@@ -1153,55 +2366,61 @@ def generate_candidate_paths() -> List[Dict[str, Any]]:
     DEPRECATED: Use correlate_exit_traffic() for new implementations.
     """
     db = get_database()
+    _ensure_indexes(db)
     
     # Fetch relays
     guards = list(db.relays.find(
-        {"is_guard": True, "running": True}
+        {"is_guard": True, "running": True},
+        _PATH_RELAY_PROJECTION
     ).sort("advertised_bandwidth", -1).limit(50))
     
     middles = list(db.relays.find(
-        {"is_guard": False, "is_exit": False, "running": True}
+        {"is_guard": False, "is_exit": False, "running": True},
+        _PATH_RELAY_PROJECTION
     ).sort("advertised_bandwidth", -1).limit(100))
     
     exits = list(db.relays.find(
-        {"is_exit": True, "running": True}
+        {"is_exit": True, "running": True},
+        _PATH_RELAY_PROJECTION
     ).sort("advertised_bandwidth", -1).limit(50))
     
-    candidates = []
+    guards, middles, exits = guards[:30], middles[:30], exits[:20]
+    g_fps = np.array([g["fingerprint"] for g in guards], dtype=object)
+    m_fps = np.array([m["fingerprint"] for m in middles], dtype=object)
+    x_fps = np.array([x["fingerprint"] for x in exits], dtype=object)
+    
+    # Every (guard, middle, exit) index triple in loop order, minus those
+    # reusing a relay, capped at 500 paths
+    gi, mi, xi = (
+        idx.ravel() for idx in np.meshgrid(
+            np.arange(len(guards)), np.arange(len(middles)), np.arange(len(exits)),
+            indexing="ij"
+        )
+    )
+    distinct = (g_fps[gi] != m_fps[mi]) & (g_fps[gi] != x_fps[xi]) & (m_fps[mi] != x_fps[xi])
+    keep = np.flatnonzero(distinct)[:500]
+    
+    generated_at = datetime.utcnow().isoformat() + "Z"
+    candidates = [
+        {
+            "id": _path_id(g_fps[g], m_fps[m], x_fps[x]),
+            "entry": g_fps[g],
+            "middle": m_fps[m],
+            "exit": x_fps[x],
+            "entry_nickname": guards[g].get("nickname", "unknown"),
+            "middle_nickname": middles[m].get("nickname", "unknown"),
+            "exit_nickname": exits[x].get("nickname", "unknown"),
+            "generated_at": generated_at,
+            "_notice": "Legacy format - use correlation API for forensic analysis"
+        }
+        for g, m, x in zip(gi[keep].tolist(), mi[keep].tolist(), xi[keep].tolist())
+    ]
     
-    for g in guards[:30]:
-        for m in middles[:30]:
-            if g["fingerprint"] == m["fingerprint"]:
-                continue
-            
-            for x in exits[:20]:
-                if x["fingerprint"] in {g["fingerprint"], m["fingerprint"]}:
-                    continue
-                
-                candidate = {
-                    "id": str(uuid.uuid4()),
-                    "entry": g["fingerprint"],
-                    "middle": m["fingerprint"],
-                    "exit": x["fingerprint"],
-                    "entry_nickname": g.get("nickname", "unknown"),
-                    "middle_nickname": m.get("nickname", "unknown"),
-                    "exit_nickname": x.get("nickname", "unknown"),
-                    "generated_at": datetime.utcnow().isoformat() + "Z",
-                    "_notice": "Legacy format - use correlation API for forensic analysis"
-                }
-                candidates.append(candidate)
-                
-                if len(candidates) >= 500:
-                    break
-            if len(candidates) >= 500:
-                break
-        if len(candidates) >= 500:
-            break
-    
-    # Store for compatibility
+    # Store for compatibility; the collection carries no indexes, so dropping
+    # it is a cheap metadata operation unlike a per-document delete_many
     if candidates:
-        db.path_candidates.delete_many({})
-        db.path_candidates.insert_many(candidates)
+        db.path_candidates.drop()
+        db.path_candidates.insert_many(candidates, ordered=False)
     
     return candidates
 
@@ -1228,10 +2447,12 @@ __all__ = [
     
     # Data structures
     "TimingVector",
+    "TimingVectorBatch",
     "TrafficSession",
     "RelayActivityWindow",
     "ExitObservation",
     "EvidenceItem",
+    "EvidenceArray",
     "CorrelationHypothesis",
     
     # Analyzers
@@ -1242,7 +2463,10 @@ __all__ = [
     "UncertaintyCalculator",
     
     # Main engine
+    "GuardIndex",
     "ForensicCorrelationEngine",
+    "PAIR_SCORE_COMPONENTS",
+    "score_session_pairs",
     
     # High-level API
     "correlate_exit_traffic",
@@ -1251,6 +2475,7 @@ __all__ = [
     
     # Helper functions
     "build_guard_activity_window_from_relay",
+    "build_guard_windows_bulk",
     "build_exit_observation_from_pcap_session",
     
     # Legacy compatibility
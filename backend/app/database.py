@@ -9,6 +9,14 @@ from typing import Optional
 from pymongo import MongoClient
 from pymongo.errors import ServerSelectionTimeoutError, OperationFailure
 
+# Optional Motor import - async driver used by the FastAPI request handlers
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    MOTOR_AVAILABLE = True
+except ImportError:
+    MOTOR_AVAILABLE = False
+    AsyncIOMotorClient = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,6 +31,8 @@ class MongoDBManager:
     _instance: Optional['MongoDBManager'] = None
     _client: Optional[MongoClient] = None
     _db = None
+    _async_client = None
+    _async_db = None
     
     def __new__(cls):
         """Implement singleton pattern"""
@@ -135,6 +145,82 @@ class MongoDBManager:
         logger.error(error_msg)
         raise MongoConnectionError(error_msg)
     
+    async def connect_async(self):
+        """
+        Establish async (Motor) MongoDB connection with fallback logic
+        
+        Returns:
+            AsyncIOMotorClient instance
+            
+        Raises:
+            ImportError: If motor is not installed
+            MongoConnectionError: If all connection attempts fail
+        """
+        if self._async_client is not None:
+            return self._async_client
+        
+        if not MOTOR_AVAILABLE:
+            raise ImportError(
+                "motor is required for async MongoDB access. "
+                "Install with: pip install motor"
+            )
+        
+        urls = self.get_mongo_urls()
+        last_error = None
+        
+        for url in urls:
+            client = None
+            try:
+                logger.info(f"Attempting async MongoDB connection to: {url}")
+                
+                client = AsyncIOMotorClient(
+                    url,
+                    serverSelectionTimeoutMS=5000,
+                    connectTimeoutMS=5000,
+                    retryWrites=True,
+                    # Keep the pool pre-filled so bursts don't wait on new sockets
+                    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+                    minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", 20)),
+                )
+                
+                # Test the connection
+                await client.admin.command('ping')
+                logger.info(f"✅ Successfully connected to MongoDB (async): {url}")
+                self._async_client = client
+                return client
+                
+            except Exception as e:
+                last_error = e
+                logger.debug(f"❌ Failed to connect to {url}: {type(e).__name__}: {e}")
+                if client is not None:
+                    client.close()
+                continue
+        
+        # All attempts failed
+        error_msg = (
+            f"Cannot connect to MongoDB (async). Tried {len(urls)} URL(s): "
+            f"{', '.join(urls)}. Last error: {last_error}"
+        )
+        logger.error(error_msg)
+        raise MongoConnectionError(error_msg)
+    
+    async def get_async_db(self):
+        """
+        Get async (Motor) MongoDB database instance
+        
+        Returns:
+            AsyncIOMotorDatabase object
+            
+        Raises:
+            MongoConnectionError: If connection fails
+        """
+        if self._async_db is None:
+            client = await self.connect_async()
+            self._async_db = client["torunveil"]
+            logger.info("✅ Async database 'torunveil' ready")
+        
+        return self._async_db
+    
     def get_db(self):
         """
         Get MongoDB database instance
@@ -178,6 +264,16 @@ class MongoDBManager:
             finally:
                 self._client = None
                 self._db = None
+        
+        if self._async_client is not None:
+            try:
+                self._async_client.close()
+                logger.info("Async MongoDB connection closed")
+            except Exception as e:
+                logger.error(f"Error closing async MongoDB connection: {e}")
+            finally:
+                self._async_client = None
+                self._async_db = None
     
     def __del__(self):
         """Cleanup on deletion"""
@@ -201,6 +297,19 @@ def get_db():
     return _db_manager.get_db()
 
 
+async def get_async_db():
+    """
+    Get async (Motor) MongoDB database instance for use in async handlers
+    
+    Returns:
+        AsyncIOMotorDatabase object
+        
+    Raises:
+        MongoConnectionError: If connection fails
+    """
+    return await _db_manager.get_async_db()
+
+
 def get_client() -> MongoClient:
     """
     Get MongoDB client instance
@@ -215,5 +324,5 @@ def get_client() -> MongoClient:
 
 
 def close_connection():
-    """Close database connection"""
+    """Close database connections (sync and async)"""
     _db_manager.close()
@@ -4,6 +4,7 @@ Extracts packet metadata and correlates with TOR paths
 """
 
 import struct
+import heapq
 import logging
 from typing import List, Dict, Any, Tuple, Optional
 import datetime
@@ -499,13 +500,12 @@ class PCAPAnalyzer:
             if 'dst_port' in packet:
                 flows[flow_key]['ports'].add(packet['dst_port'])
         
-        # Convert to list and format
-        result = []
-        for flow_key, flow_data in flows.items():
+        # Keep the 100 busiest flows and format only those
+        result = heapq.nlargest(100, flows.values(), key=lambda x: x['packet_count'])
+        for flow_data in result:
             flow_data['ports'] = list(flow_data['ports'])
-            result.append(flow_data)
         
-        return sorted(result, key=lambda x: x['packet_count'], reverse=True)[:100]
+        return result
     
     def _get_time_range(self) -> Dict[str, Any]:
         """Get timestamp range of packets"""
@@ -26,11 +26,12 @@ from __future__ import annotations
 
 import uuid
 import math
+import heapq
 import logging
 from datetime import datetime, timedelta
 from typing import (
     List, Dict, Any, Optional, Tuple,
-    Set, DefaultDict, NamedTuple
+    Set, FrozenSet, DefaultDict, NamedTuple
 )
 from dataclasses import dataclass, field, asdict
 from collections import defaultdict
@@ -156,10 +157,45 @@ class GuardHypothesis:
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
     
+    # Incremental index behind exit_nodes_seen (the indexed list is
+    # treated as append-only; reassigning exit_observations is fine)
+    _exit_nodes_seen: Set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+    _exit_nodes_indexed: int = field(default=0, init=False, repr=False, compare=False)
+    _exit_nodes_source: Optional[List[ExitObservation]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    
+    def _indexed_exit_nodes(self) -> Set[str]:
+        """
+        Internal set of unique exit fingerprints, brought up to date.
+        
+        Only observations appended since the last call are scanned, so the
+        per-update likelihood check no longer rescans the full history.
+        """
+        observations = self.exit_observations
+        if observations is not self._exit_nodes_source or len(observations) < self._exit_nodes_indexed:
+            # History was replaced or trimmed; rebuild from scratch
+            self._exit_nodes_seen = set()
+            self._exit_nodes_indexed = 0
+            self._exit_nodes_source = observations
+        for obs in observations[self._exit_nodes_indexed:]:
+            self._exit_nodes_seen.add(obs.exit_fingerprint)
+        self._exit_nodes_indexed = len(observations)
+        return self._exit_nodes_seen
+    
     @property
-    def exit_nodes_seen(self) -> Set[str]:
-        """Unique exit nodes observed with this guard hypothesis."""
-        return {obs.exit_fingerprint for obs in self.exit_observations}
+    def exit_nodes_seen(self) -> FrozenSet[str]:
+        """Unique exit nodes observed with this guard hypothesis (a snapshot)."""
+        return frozenset(self._indexed_exit_nodes())
+    
+    @property
+    def exit_node_count(self) -> int:
+        """Number of unique exit nodes observed with this guard hypothesis."""
+        return len(self._indexed_exit_nodes())
+    
+    def has_seen_exit(self, exit_fingerprint: str) -> bool:
+        """Whether this exit has been observed with this guard hypothesis."""
+        return exit_fingerprint in self._indexed_exit_nodes()
     
     @property
     def observation_span_hours(self) -> float:
@@ -424,11 +460,10 @@ class BayesianHypothesisEngine:
         # TOR clients use different exit nodes, so seeing different exits
         # with the same guard is expected
         exit_diversity_factor = 1.0
-        seen_exits = hypothesis.exit_nodes_seen
-        if observation.exit_fingerprint in seen_exits:
+        if hypothesis.has_seen_exit(observation.exit_fingerprint):
             # Same exit seen again - slightly less informative
             exit_diversity_factor = 0.9
-        elif len(seen_exits) > 0:
+        elif hypothesis.exit_node_count > 0:
             # New exit with same guard - expected behavior
             exit_diversity_factor = 1.1
         
@@ -585,13 +620,13 @@ class BayesianHypothesisEngine:
         # Limit total hypotheses
         if len(self.hypotheses) > self.config.MAX_ACTIVE_HYPOTHESES:
             # Keep top hypotheses by posterior probability
-            sorted_fps = sorted(
+            keep = set(heapq.nlargest(
+                self.config.MAX_ACTIVE_HYPOTHESES,
                 self.hypotheses.keys(),
-                key=lambda fp: self.hypotheses[fp].posterior_probability,
-                reverse=True
-            )
+                key=lambda fp: self.hypotheses[fp].posterior_probability
+            ))
             
-            for fp in sorted_fps[self.config.MAX_ACTIVE_HYPOTHESES:]:
+            for fp in [fp for fp in self.hypotheses if fp not in keep]:
                 del self.hypotheses[fp]
     
     def _update_priors_from_posteriors(self, learning_rate: float = 0.1) -> None:
@@ -664,12 +699,12 @@ class BayesianHypothesisEngine:
         Returns:
             List of RankedHypothesis objects
         """
-        # Sort by posterior probability
-        sorted_hypotheses = sorted(
+        # Select the top_k by posterior probability (ties keep insertion order)
+        sorted_hypotheses = heapq.nlargest(
+            top_k,
             self.hypotheses.values(),
-            key=lambda h: h.posterior_probability,
-            reverse=True
-        )[:top_k]
+            key=lambda h: h.posterior_probability
+        )
         
         ranked = []
         for i, hypothesis in enumerate(sorted_hypotheses):
@@ -705,7 +740,7 @@ class BayesianHypothesisEngine:
             weakening.append("Limited evidence available")
         
         # Exit node diversity
-        n_exits = len(hypothesis.exit_nodes_seen)
+        n_exits = hypothesis.exit_node_count
         if n_exits > 5:
             supporting.append(f"Observed with {n_exits} different exit nodes (consistent with TOR behavior)")
         elif n_exits == 1:
@@ -2,6 +2,7 @@
 # FEATURE 11: TOR DATA COLLECTION ENHANCEMENT - RISK SCORING IMPROVEMENTS
 
 from typing import Dict, Any, Iterable
+from bisect import bisect_right
 import logging
 
 logger = logging.getLogger("torunveil.risk_engine")
@@ -29,6 +30,17 @@ BW_THRESHOLD_MEDIUM = 10_000_000   # 10 Mbps = "medium"
 BW_THRESHOLD_LOW = 1_000_000       # 1 Mbps = "low"
 
 
+# Piecewise-linear bandwidth score as (lower bound, base points, width, span)
+# per tier; _BW_BREAKS are the tier boundaries for bisect
+_BW_BREAKS = (BW_THRESHOLD_LOW, BW_THRESHOLD_MEDIUM, BW_THRESHOLD_HIGH)
+_BW_TIERS = (
+    (0, 0.0, BW_THRESHOLD_LOW, 15.0),
+    (BW_THRESHOLD_LOW, 15.0, BW_THRESHOLD_MEDIUM - BW_THRESHOLD_LOW, 10.0),
+    (BW_THRESHOLD_MEDIUM, 25.0, BW_THRESHOLD_HIGH - BW_THRESHOLD_MEDIUM, 10.0),
+    (BW_THRESHOLD_HIGH, 35.0, BW_THRESHOLD_HIGH, 5.0),
+)
+
+
 def _score_bandwidth(bw: int | float | None) -> float:
     """
     FEATURE 11: ENHANCED BANDWIDTH SCORING
@@ -39,69 +51,79 @@ def _score_bandwidth(bw: int | float | None) -> float:
     - 1-10 Mbps: 10-20 points
     - 10-50 Mbps: 20-35 points
     - 50+ Mbps: 35-40 points (increasing risk)
+    
+    The tier is found with one binary search over _BW_BREAKS instead of
+    an if/elif chain; bandwidth is capped at 100 Mbps, where the top
+    tier reaches 40 points.
     """
     if not bw or bw <= 0:
         return 0.0
 
-    # Threshold-based scoring for better granularity
-    if bw < BW_THRESHOLD_LOW:
-        # Very low: 1-1000k
-        return (bw / BW_THRESHOLD_LOW) * 15.0
-    elif bw < BW_THRESHOLD_MEDIUM:
-        # Low-medium: 1-10 Mbps
-        ratio = (bw - BW_THRESHOLD_LOW) / (BW_THRESHOLD_MEDIUM - BW_THRESHOLD_LOW)
-        return 15.0 + (ratio * 10.0)
-    elif bw < BW_THRESHOLD_HIGH:
-        # Medium-high: 10-50 Mbps
-        ratio = (bw - BW_THRESHOLD_MEDIUM) / (BW_THRESHOLD_HIGH - BW_THRESHOLD_MEDIUM)
-        return 25.0 + (ratio * 10.0)
-    else:
-        # High: 50+ Mbps
-        capped_ratio = min((bw - BW_THRESHOLD_HIGH) / BW_THRESHOLD_HIGH, 1.0)
-        return 35.0 + (capped_ratio * 5.0)
+    bw = min(bw, 2 * BW_THRESHOLD_HIGH)
+    lower, base, width, span = _BW_TIERS[bisect_right(_BW_BREAKS, bw)]
+    return base + ((bw - lower) / width) * span
 
 
-def _score_flags(flags: Iterable[str]) -> float:
-    """
-    FEATURE 11: ENHANCED FLAG SCORING
-    
-    Refined contribution based on relay capabilities:
-    - Exit relays: highest risk (can see outgoing traffic)
-    - Guard relays: high risk (can see incoming connections)
-    - Stable: increases reliability and observation duration
-    - Running: basic requirement
-    
-    Max ~50 points (increased from 45 for better granularity).
-    """
-    if not flags:
-        return 0.0
+# Bits for the relay flags that contribute to the role score
+_FLAG_BITS = {"Exit": 1, "Guard": 2, "Stable": 4, "Running": 8, "Valid": 16}
+
 
-    flags = set(flags)
+def _flag_score_from_mask(mask: int) -> float:
+    """Role score for a combination of _FLAG_BITS."""
+    is_exit = bool(mask & _FLAG_BITS["Exit"])
+    is_guard = bool(mask & _FLAG_BITS["Guard"])
     score = 0.0
 
     # Exit is most dangerous (can intercept traffic leaving Tor)
-    if "Exit" in flags:
+    if is_exit:
         score += 28.0
     
     # Guard is next most dangerous (can see entry connections)
-    if "Guard" in flags:
+    if is_guard:
         score += 18.0
     
     # Stability increases observation window
-    if "Stable" in flags:
+    if mask & _FLAG_BITS["Stable"]:
         score += 3.0
     
     # Running + Valid indicates active participation
-    if "Running" in flags and "Valid" in flags:
+    if mask & _FLAG_BITS["Running"] and mask & _FLAG_BITS["Valid"]:
         score += 2.0
     
     # Combination penalty: both exit and guard (rare but dangerous)
-    if "Exit" in flags and "Guard" in flags:
+    if is_exit and is_guard:
         score += 3.0  # Increased from 5.0 to avoid double-counting
 
     return min(score, 50.0)  # Cap at 50
 
 
+# Every possible flag combination, indexed by mask
+_FLAG_SCORES = tuple(_flag_score_from_mask(mask) for mask in range(1 << len(_FLAG_BITS)))
+
+
+def _score_flags(flags: Iterable[str]) -> float:
+    """
+    FEATURE 11: ENHANCED FLAG SCORING
+    
+    Refined contribution based on relay capabilities:
+    - Exit relays: highest risk (can see outgoing traffic)
+    - Guard relays: high risk (can see incoming connections)
+    - Stable: increases reliability and observation duration
+    - Running: basic requirement
+    
+    Max ~50 points (increased from 45 for better granularity).
+    
+    Flags are folded into a bitmask and looked up in _FLAG_SCORES.
+    """
+    if not flags:
+        return 0.0
+
+    mask = 0
+    for flag in flags:
+        mask |= _FLAG_BITS.get(flag, 0)
+    return _FLAG_SCORES[mask]
+
+
 def _score_asn(as_name: str | None) -> float:
     """
     FEATURE 11: ENHANCED ASN SCORING
@@ -18,12 +18,20 @@ Purpose: Forensic correlation for law enforcement (metadata only, no deanonymiza
 """
 
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Sequence
 from dataclasses import dataclass, field, asdict
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import statistics
 import math
+import heapq
+import threading
 from enum import Enum
+from functools import lru_cache
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pymongo import UpdateOne
 
 try:
     from .database import get_db
@@ -31,8 +39,143 @@ except (ImportError, ModuleNotFoundError):
     # For testing purposes when module is imported directly
     get_db = lambda: None
 
+# Optional Numba import - JIT-compiles the batch factor kernels below
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_epoch_us(dt: datetime) -> int:
+    """Exact epoch microseconds, treating naive datetimes as UTC"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+@lru_cache(maxsize=32768)
+def _parse_timestamp(value: str) -> datetime:
+    """
+    ISO-8601 via datetime.fromisoformat, dateutil for anything else.
+    
+    Memoized: relay first/last-seen strings recur across ranking calls
+    and only change when the relay list is refetched.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        from dateutil import parser as date_parser
+        return date_parser.parse(value)
+
+
+# Relay fields read when scoring a guard against an exit
+_GUARD_PROJECTION = {
+    "_id": 0,
+    "fingerprint": 1,
+    "nickname": 1,
+    "country": 1,
+    "city": 1,
+    "asn": 1,
+    "bandwidth_mbps": 1,
+    "first_seen": 1,
+    "last_seen": 1,
+}
+
+
+# Shared pool for guard scoring, created on first use so every ranking
+# call reuses the same worker threads
+_SCORING_POOL: Optional[ThreadPoolExecutor] = None
+_SCORING_POOL_LOCK = threading.Lock()
+
+
+def _scoring_pool() -> ThreadPoolExecutor:
+    global _SCORING_POOL
+    with _SCORING_POOL_LOCK:
+        if _SCORING_POOL is None:
+            _SCORING_POOL = ThreadPoolExecutor(thread_name_prefix="guard-scoring")
+        return _SCORING_POOL
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float))
+
+
+# ============================================================================
+# BATCH FACTOR KERNELS
+# ============================================================================
+
+def _time_overlap_kernel(first_us, last_us, exit_start_us, exit_end_us, exit_duration):
+    """(overlap_seconds, overlap_ratio, guard_existed, score) per guard."""
+    n = first_us.shape[0]
+    seconds = np.zeros(n)
+    ratio = np.empty(n)
+    existed = np.empty(n, dtype=np.bool_)
+    score = np.empty(n)
+    for i in range(n):
+        overlap_us = min(last_us[i], exit_end_us) - max(first_us[i], exit_start_us)
+        if overlap_us > 0:
+            seconds[i] = overlap_us / 1e6
+        ratio[i] = min(1.0, seconds[i] / exit_duration)
+        existed[i] = first_us[i] <= exit_end_us and last_us[i] >= exit_start_us
+        bonus = 0.2 if existed[i] else -0.2
+        score[i] = max(0.0, min(1.0, ratio[i] + bonus))
+    return seconds, ratio, existed, score
+
+
+def _time_overlap_kernel_numpy(first_us, last_us, exit_start_us, exit_end_us, exit_duration):
+    """Broadcast form of _time_overlap_kernel."""
+    overlap_us = np.minimum(last_us, exit_end_us) - np.maximum(first_us, exit_start_us)
+    seconds = np.where(overlap_us > 0, overlap_us / 1e6, 0.0)
+    ratio = np.minimum(1.0, seconds / exit_duration)
+    existed = (first_us <= exit_end_us) & (last_us >= exit_start_us)
+    score = np.clip(ratio + np.where(existed, 0.2, -0.2), 0.0, 1.0)
+    return seconds, ratio, existed, score
+
+
+def _bandwidth_similarity_kernel(guard_bw, exit_bw, exit_advertised):
+    """(valid, ratio, similarity, score) per guard; invalid rows are zero."""
+    n = guard_bw.shape[0]
+    valid = np.zeros(n, dtype=np.bool_)
+    ratio = np.zeros(n)
+    similarity = np.zeros(n)
+    score = np.zeros(n)
+    for i in range(n):
+        bw = guard_bw[i]
+        if bw <= 0 or exit_bw <= 0:
+            continue
+        valid[i] = True
+        ratio[i] = min(exit_bw, bw) / max(exit_bw, bw)
+        similarity[i] = math.sqrt(ratio[i])
+        bonus = 0.1 if abs(exit_advertised - bw) < bw * 0.3 else 0.0
+        score[i] = min(1.0, similarity[i] + bonus)
+    return valid, ratio, similarity, score
+
+
+def _bandwidth_similarity_kernel_numpy(guard_bw, exit_bw, exit_advertised):
+    """Broadcast form of _bandwidth_similarity_kernel."""
+    valid = (guard_bw > 0) & (exit_bw > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.minimum(exit_bw, guard_bw) / np.maximum(exit_bw, guard_bw)
+        similarity = np.sqrt(ratio)
+    bonus = np.where(np.abs(exit_advertised - guard_bw) < guard_bw * 0.3, 0.1, 0.0)
+    score = np.minimum(1.0, similarity + bonus)
+    return valid, ratio, similarity, score
+
+
+if NUMBA_AVAILABLE:
+    # No fastmath: batch scores must match the pairwise calculators exactly
+    _time_overlap_kernel = njit(cache=True)(_time_overlap_kernel)
+    _bandwidth_similarity_kernel = njit(cache=True)(_bandwidth_similarity_kernel)
+else:
+    _time_overlap_kernel = _time_overlap_kernel_numpy
+    _bandwidth_similarity_kernel = _bandwidth_similarity_kernel_numpy
+
 
 # ============================================================================
 # DATA MODELS
@@ -256,6 +399,71 @@ class TimeOverlapFactor:
             }
         )
 
+    @staticmethod
+    def calculate_batch(
+        exit_activity_window: Tuple[datetime, datetime],
+        guard_first_seen_us: np.ndarray,
+        guard_last_seen_us: np.ndarray
+    ) -> List[FactorScore]:
+        """
+        Vectorized calculate() for one exit window against many guards.
+
+        Each guard contributes the single uptime window spanning its first
+        and last sighting, as in the engine's pairwise path.
+
+        Args:
+            exit_activity_window: (start, end) of observed exit activity
+            guard_first_seen_us: Guard first-seen times, epoch microseconds
+            guard_last_seen_us: Guard last-seen times, epoch microseconds
+
+        Returns:
+            One FactorScore per guard, identical to calculate()
+        """
+        exit_start, exit_end = (_to_epoch_us(t) for t in exit_activity_window)
+        exit_duration = (exit_end - exit_start) / 1e6
+        n = len(guard_first_seen_us)
+
+        if exit_duration <= 0:
+            return [
+                FactorScore(
+                    name="Time Overlap",
+                    value=0.0,
+                    weight=0.25,
+                    reasoning="Invalid exit activity window",
+                    data_points={}
+                )
+                for _ in range(n)
+            ]
+
+        overlap_seconds, overlap_ratio, guard_existed, final_score = _time_overlap_kernel(
+            np.ascontiguousarray(guard_first_seen_us, dtype=np.int64),
+            np.ascontiguousarray(guard_last_seen_us, dtype=np.int64),
+            exit_start,
+            exit_end,
+            exit_duration
+        )
+
+        return [
+            FactorScore(
+                name="Time Overlap",
+                value=score,
+                weight=0.25,
+                reasoning=f"Exit window overlap: {ratio:.1%}, guard existed during: {existed}",
+                data_points={
+                    "exit_duration_sec": exit_duration,
+                    "overlap_seconds": seconds,
+                    "overlap_ratio": ratio,
+                    "guard_existed_during_exit": existed
+                }
+            )
+            for score, ratio, seconds, existed in zip(
+                final_score.tolist(),
+                overlap_ratio.tolist(),
+                overlap_seconds.tolist(),
+                guard_existed.tolist()
+            )
+        ]
+
 
 class BandwidthSimilarityFactor:
     """
@@ -320,6 +528,60 @@ class BandwidthSimilarityFactor:
             }
         )
 
+    @staticmethod
+    def calculate_batch(
+        exit_bandwidth_mbps: float,
+        guard_bandwidth_mbps: Sequence[float],
+        exit_advertised_bandwidth: float
+    ) -> List[FactorScore]:
+        """
+        Vectorized calculate() for one exit against many guards.
+
+        Args:
+            exit_bandwidth_mbps: Observed exit node bandwidth
+            guard_bandwidth_mbps: Guard bandwidths from TOR directory
+            exit_advertised_bandwidth: Exit's advertised bandwidth
+
+        Returns:
+            One FactorScore per guard, identical to calculate()
+        """
+        valid, ratio, similarity_score, final_score = _bandwidth_similarity_kernel(
+            np.ascontiguousarray(guard_bandwidth_mbps, dtype=np.float64),
+            float(exit_bandwidth_mbps),
+            float(exit_advertised_bandwidth)
+        )
+
+        scores = []
+        for bw, ok, r, sim, score in zip(
+            guard_bandwidth_mbps,
+            valid.tolist(),
+            ratio.tolist(),
+            similarity_score.tolist(),
+            final_score.tolist()
+        ):
+            if not ok:
+                scores.append(FactorScore(
+                    name="Bandwidth Similarity",
+                    value=0.5,
+                    weight=0.20,
+                    reasoning="Missing or invalid bandwidth data",
+                    data_points={}
+                ))
+                continue
+            scores.append(FactorScore(
+                name="Bandwidth Similarity",
+                value=score,
+                weight=0.20,
+                reasoning=f"Exit {exit_bandwidth_mbps}Mbps vs Guard {bw}Mbps (ratio: {r:.2f})",
+                data_points={
+                    "exit_bandwidth_mbps": exit_bandwidth_mbps,
+                    "guard_bandwidth_mbps": bw,
+                    "ratio": r,
+                    "similarity_score": sim
+                }
+            ))
+        return scores
+
 
 class HistoricalRecurrenceFactor:
     """
@@ -627,18 +889,42 @@ class UnifiedProbabilisticConfidenceEngine:
         Returns:
             GuardNodeCandidate with full confidence breakdown
         """
-        # Extract data from relay dictionaries
+        time_overlap = self._calculate_time_overlap(exit_node, guard_node)
+        bandwidth_sim = self._calculate_bandwidth_similarity(exit_node, guard_node)
+        
+        composite_score, factors = self._score_pair(
+            exit_node,
+            guard_node,
+            investigation_id,
+            time_overlap,
+            bandwidth_sim,
+            pcap_timing_data
+        )
+        
+        return self._build_candidate(guard_node, composite_score, factors)
+    
+    def _score_pair(
+        self,
+        exit_node: Dict,
+        guard_node: Dict,
+        investigation_id: str,
+        time_overlap: FactorScore,
+        bandwidth_sim: FactorScore,
+        pcap_timing_data: Optional[Dict] = None,
+        exit_history: Optional[Tuple[Optional[int], int]] = None,
+        evolution_updates: Optional[List[UpdateOne]] = None
+    ) -> Tuple[float, List[FactorScore]]:
+        """
+        Score the remaining factors for a pair and record its composite score.
+        
+        With evolution_updates, the history write is queued there for a
+        single bulk_write instead of being sent immediately.
+        """
         exit_fingerprint = exit_node.get("fingerprint", "unknown")
         guard_fingerprint = guard_node.get("fingerprint", "unknown")
-        guard_nickname = guard_node.get("nickname", "unknown")
-        guard_country = guard_node.get("country", "unknown")
-        guard_bandwidth_mbps = guard_node.get("bandwidth_mbps", 0.0)
         
-        # Calculate each factor
-        time_overlap = self._calculate_time_overlap(exit_node, guard_node)
-        bandwidth_sim = self._calculate_bandwidth_similarity(exit_node, guard_node)
         historical_recurrence = self._calculate_historical_recurrence(
-            exit_fingerprint, guard_fingerprint, investigation_id
+            exit_fingerprint, guard_fingerprint, investigation_id, exit_history
         )
         geo_asn = self._calculate_geo_asn(exit_node, guard_node)
         pcap_timing = self._calculate_pcap_timing(pcap_timing_data)
@@ -654,16 +940,44 @@ class UnifiedProbabilisticConfidenceEngine:
         
         # Aggregate to composite score
         composite_score, aggregation_reasoning = ConfidenceAggregator.aggregate_factors(factors)
-        confidence_level = ConfidenceAggregator.compute_confidence_level(composite_score)
-        
-        # Create candidate object
-        candidate = GuardNodeCandidate(
-            guard_fingerprint=guard_fingerprint,
-            guard_nickname=guard_nickname,
-            guard_country=guard_country,
-            guard_bandwidth_mbps=guard_bandwidth_mbps,
+        
+        # Store in time-series history
+        if evolution_updates is None:
+            self._store_confidence_evolution(
+                guard_fingerprint,
+                exit_fingerprint,
+                investigation_id,
+                composite_score,
+                factors
+            )
+        else:
+            query, update = self._confidence_evolution_update(
+                guard_fingerprint,
+                exit_fingerprint,
+                investigation_id,
+                composite_score,
+                factors
+            )
+            evolution_updates.append(UpdateOne(query, update, upsert=True))
+        
+        return composite_score, factors
+    
+    def _build_candidate(
+        self,
+        guard_node: Dict,
+        composite_score: float,
+        factors: List[FactorScore]
+    ) -> GuardNodeCandidate:
+        """Materialize a scored guard as a GuardNodeCandidate"""
+        time_overlap, bandwidth_sim, historical_recurrence, geo_asn, pcap_timing = factors
+        
+        return GuardNodeCandidate(
+            guard_fingerprint=guard_node.get("fingerprint", "unknown"),
+            guard_nickname=guard_node.get("nickname", "unknown"),
+            guard_country=guard_node.get("country", "unknown"),
+            guard_bandwidth_mbps=guard_node.get("bandwidth_mbps", 0.0),
             composite_score=composite_score,
-            confidence_level=confidence_level,
+            confidence_level=ConfidenceAggregator.compute_confidence_level(composite_score),
             factors=factors,
             last_updated=datetime.utcnow(),
             observation_count=1,
@@ -673,38 +987,37 @@ class UnifiedProbabilisticConfidenceEngine:
             geo_asn_score=geo_asn.value,
             pcap_timing_score=pcap_timing.value
         )
-        
-        # Store in time-series history
-        self._store_confidence_evolution(
-            guard_fingerprint,
-            exit_fingerprint,
-            investigation_id,
-            composite_score,
-            factors
-        )
-        
-        return candidate
     
     def rank_guard_candidates(
         self,
         exit_node: Dict,
         investigation_id: str,
-        top_k: int = 5
+        top_k: int = 5,
+        parallel: bool = True,
+        max_workers: Optional[int] = None
     ) -> List[GuardNodeCandidate]:
         """
         Rank all possible guard nodes for a given exit observation.
         
+        Per-guard scoring is dominated by the historical recurrence
+        queries, so with parallel=True guards are scored on a thread pool
+        to overlap those round trips. The module-level pool is shared by
+        every call; passing max_workers uses a dedicated pool of that size
+        instead. The array kernels run beforehand on the calling thread.
+        
         Args:
             exit_node: Observed exit node
             investigation_id: Investigation case ID
             top_k: Return top K candidates
+            parallel: Score guards concurrently
+            max_workers: Dedicated pool size (shared pool if None)
         
         Returns:
             Sorted list of GuardNodeCandidate objects (highest confidence first)
         """
         # Get all known guard nodes from database
         try:
-            all_guards = list(self.db.relays.find({"is_guard": True}))
+            all_guards = list(self.db.relays.find({"is_guard": True}, _GUARD_PROJECTION))
         except Exception as e:
             self.logger.error(f"Failed to fetch guard nodes: {e}")
             return []
@@ -713,38 +1026,129 @@ class UnifiedProbabilisticConfidenceEngine:
             self.logger.warning("No guard nodes found in database")
             return []
         
-        # Correlate exit with each guard
-        candidates = []
-        for guard_node in all_guards:
+        # Time overlap and bandwidth similarity for every guard at once
+        time_overlaps, bandwidth_sims = self._calculate_numeric_factors_batch(exit_node, all_guards)
+        
+        # Exit-side history is the same for every pair, so query it once
+        exit_history = self._exit_history(exit_node.get("fingerprint", "unknown"))
+        
+        def score_one(
+            guard_node: Dict,
+            time_overlap: Optional[FactorScore],
+            bandwidth_sim: Optional[FactorScore]
+        ) -> Optional[Tuple[float, Dict, List[FactorScore], List[UpdateOne]]]:
             try:
-                candidate = self.correlate_guard_exit_pair(
+                if time_overlap is None:
+                    time_overlap = self._calculate_time_overlap(exit_node, guard_node)
+                    bandwidth_sim = self._calculate_bandwidth_similarity(exit_node, guard_node)
+                updates = []
+                composite_score, factors = self._score_pair(
                     exit_node,
                     guard_node,
-                    investigation_id
+                    investigation_id,
+                    time_overlap,
+                    bandwidth_sim,
+                    exit_history=exit_history,
+                    evolution_updates=updates
                 )
-                candidates.append(candidate)
+                return composite_score, guard_node, factors, updates
             except Exception as e:
                 self.logger.warning(f"Failed to correlate guard {guard_node.get('nickname')}: {e}")
+                return None
+        
+        # Score exit against each guard; every pair is recorded in the
+        # confidence history, but only the top_k become candidate objects
+        if parallel and len(all_guards) > 1:
+            if max_workers is None:
+                results = list(_scoring_pool().map(score_one, all_guards, time_overlaps, bandwidth_sims))
+            else:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(score_one, all_guards, time_overlaps, bandwidth_sims))
+        else:
+            results = list(map(score_one, all_guards, time_overlaps, bandwidth_sims))
+        
+        scored = []
+        evolution_updates = []
+        for result in results:
+            if result is None:
                 continue
+            composite_score, guard_node, factors, updates = result
+            scored.append((composite_score, guard_node, factors))
+            evolution_updates.extend(updates)
+        
+        # One round trip for the whole ranking's confidence history
+        if evolution_updates:
+            try:
+                self.db.confidence_evolution.bulk_write(evolution_updates, ordered=False)
+            except Exception as e:
+                self.logger.warning(f"Failed to store confidence evolution: {e}")
         
-        # Sort by composite score (descending)
-        candidates.sort(key=lambda c: c.composite_score, reverse=True)
+        # Highest composite scores first; ties keep database order
+        top = heapq.nlargest(top_k, scored, key=itemgetter(0))
         
-        return candidates[:top_k]
+        return [
+            self._build_candidate(guard_node, composite_score, factors)
+            for composite_score, guard_node, factors in top
+        ]
     
-    def _calculate_time_overlap(self, exit_node: Dict, guard_node: Dict) -> FactorScore:
-        """Helper to calculate time overlap factor"""
+    def _calculate_numeric_factors_batch(
+        self,
+        exit_node: Dict,
+        guard_nodes: List[Dict]
+    ) -> Tuple[List[Optional[FactorScore]], List[Optional[FactorScore]]]:
+        """
+        Time overlap and bandwidth similarity for many guards in one pass.
+        
+        Guard timestamps and bandwidths are packed into arrays once and scored
+        with NumPy instead of per-pair datetime arithmetic. Guards whose
+        bandwidth is not numeric get None and go through the pairwise path.
+        """
+        n = len(guard_nodes)
+        exit_bw = exit_node.get("bandwidth_mbps", 1.0)
+        exit_advertised = exit_node.get("advertised_bandwidth_mbps", exit_bw)
+        if not (_is_number(exit_bw) and _is_number(exit_advertised)):
+            return [None] * n, [None] * n
+        
+        guard_bw = [g.get("bandwidth_mbps", 1.0) for g in guard_nodes]
+        numeric = [i for i, bw in enumerate(guard_bw) if _is_number(bw)]
+        
+        now = datetime.utcnow()
+        first_us = np.empty(len(numeric), dtype=np.int64)
+        last_us = np.empty(len(numeric), dtype=np.int64)
+        for j, i in enumerate(numeric):
+            guard = guard_nodes[i]
+            first_us[j] = _to_epoch_us(self._parse_datetime(guard.get("first_seen"), now))
+            last_us[j] = _to_epoch_us(self._parse_datetime(guard.get("last_seen"), now))
+        
+        time_scores = TimeOverlapFactor.calculate_batch(
+            self._exit_activity_window(exit_node, now), first_us, last_us
+        )
+        bandwidth_scores = BandwidthSimilarityFactor.calculate_batch(
+            exit_bw, [guard_bw[i] for i in numeric], exit_advertised
+        )
+        
+        time_overlaps = [None] * n
+        bandwidth_sims = [None] * n
+        for j, i in enumerate(numeric):
+            time_overlaps[i] = time_scores[j]
+            bandwidth_sims[i] = bandwidth_scores[j]
+        return time_overlaps, bandwidth_sims
+    
+    def _exit_activity_window(self, exit_node: Dict, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+        """Exit activity window, or the last hour when the exit has no history"""
         exit_first = exit_node.get("first_seen")
         exit_last = exit_node.get("last_seen")
         
         if exit_first and exit_last:
-            exit_first = self._parse_datetime(exit_first)
-            exit_last = self._parse_datetime(exit_last)
-            exit_window = (exit_first, exit_last)
-        else:
-            # Use current time window
-            now = datetime.utcnow()
-            exit_window = (now - timedelta(hours=1), now)
+            return (self._parse_datetime(exit_first, now), self._parse_datetime(exit_last, now))
+        
+        # Use current time window
+        now = now or datetime.utcnow()
+        return (now - timedelta(hours=1), now)
+    
+    def _calculate_time_overlap(self, exit_node: Dict, guard_node: Dict) -> FactorScore:
+        """Helper to calculate time overlap factor"""
+        exit_window = self._exit_activity_window(exit_node)
         
         guard_first = self._parse_datetime(guard_node.get("first_seen"))
         guard_last = self._parse_datetime(guard_node.get("last_seen"))
@@ -769,28 +1173,20 @@ class UnifiedProbabilisticConfidenceEngine:
             exit_advertised
         )
     
-    def _calculate_historical_recurrence(
-        self,
-        exit_fingerprint: str,
-        guard_fingerprint: str,
-        investigation_id: str
-    ) -> FactorScore:
-        """Helper to calculate historical recurrence factor"""
-        # Query database for historical data
+    def _exit_history(self, exit_fingerprint: str) -> Tuple[Optional[int], int]:
+        """
+        Exit-side inputs to historical recurrence.
+        
+        Returns (exit path count, days of tracking); the count is None if
+        the path query failed.
+        """
         try:
-            co_occur = self.db.path_candidates.count_documents({
-                "entry.fingerprint": guard_fingerprint,
-                "exit.fingerprint": exit_fingerprint
-            })
-            guard_total = self.db.path_candidates.count_documents({
-                "entry.fingerprint": guard_fingerprint
-            })
             exit_total = self.db.path_candidates.count_documents({
                 "exit.fingerprint": exit_fingerprint
             })
         except Exception as e:
             self.logger.warning(f"Failed to fetch historical data: {e}")
-            co_occur = guard_total = exit_total = 0
+            exit_total = None
         
         # Estimate days of tracking (query database creation time)
         days = 30  # Default to 30 days
@@ -805,6 +1201,36 @@ class UnifiedProbabilisticConfidenceEngine:
         except:
             pass
         
+        return exit_total, days
+    
+    def _calculate_historical_recurrence(
+        self,
+        exit_fingerprint: str,
+        guard_fingerprint: str,
+        investigation_id: str,
+        exit_history: Optional[Tuple[Optional[int], int]] = None
+    ) -> FactorScore:
+        """Helper to calculate historical recurrence factor"""
+        if exit_history is None:
+            exit_history = self._exit_history(exit_fingerprint)
+        exit_total, days = exit_history
+        
+        # Query database for historical data
+        if exit_total is None:
+            co_occur = guard_total = exit_total = 0
+        else:
+            try:
+                co_occur = self.db.path_candidates.count_documents({
+                    "entry.fingerprint": guard_fingerprint,
+                    "exit.fingerprint": exit_fingerprint
+                })
+                guard_total = self.db.path_candidates.count_documents({
+                    "entry.fingerprint": guard_fingerprint
+                })
+            except Exception as e:
+                self.logger.warning(f"Failed to fetch historical data: {e}")
+                co_occur = guard_total = exit_total = 0
+        
         return HistoricalRecurrenceFactor.calculate(
             co_occur,
             max(1, guard_total),
@@ -834,61 +1260,56 @@ class UnifiedProbabilisticConfidenceEngine:
             pcap_data.get("packet_size_correlation")
         )
     
-    def _store_confidence_evolution(
+    def _confidence_evolution_update(
         self,
         guard_fingerprint: str,
         exit_fingerprint: str,
         investigation_id: str,
         score: float,
         factors: List[FactorScore]
-    ):
-        """Store confidence score in time-series database"""
-        try:
-            # Query or create confidence evolution record
-            evolution_key = f"{guard_fingerprint}:{exit_fingerprint}:{investigation_id}"
-            
-            evolution_doc = self.db.confidence_evolution.find_one({
+    ) -> Tuple[Dict, Dict]:
+        """
+        (filter, update) appending one observation to a pair's history.
+        
+        Applied with upsert=True, so the first observation creates the
+        record and later ones extend it without a prior find_one.
+        """
+        now = datetime.utcnow()
+        return (
+            {
                 "guard_fingerprint": guard_fingerprint,
                 "exit_fingerprint": exit_fingerprint,
                 "investigation_id": investigation_id
-            })
-            
-            if evolution_doc:
-                # Update existing
-                self.db.confidence_evolution.update_one(
-                    {"_id": evolution_doc["_id"]},
-                    {
-                        "$push": {
-                            "observation_timestamps": datetime.utcnow(),
-                            "confidence_scores": score,
-                            "observations": {
-                                "timestamp": datetime.utcnow().isoformat(),
-                                "score": score,
-                                "factors": [asdict(f) for f in factors]
-                            }
-                        },
-                        "$set": {
-                            "last_updated": datetime.utcnow(),
-                            "observation_count": evolution_doc.get("observation_count", 0) + 1
-                        }
-                    }
-                )
-            else:
-                # Create new
-                self.db.confidence_evolution.insert_one({
-                    "guard_fingerprint": guard_fingerprint,
-                    "exit_fingerprint": exit_fingerprint,
-                    "investigation_id": investigation_id,
-                    "observation_timestamps": [datetime.utcnow()],
-                    "confidence_scores": [score],
-                    "observation_count": 1,
-                    "last_updated": datetime.utcnow(),
-                    "observations": [{
-                        "timestamp": datetime.utcnow().isoformat(),
+            },
+            {
+                "$push": {
+                    "observation_timestamps": now,
+                    "confidence_scores": score,
+                    "observations": {
+                        "timestamp": now.isoformat(),
                         "score": score,
                         "factors": [asdict(f) for f in factors]
-                    }]
-                })
+                    }
+                },
+                "$set": {"last_updated": now},
+                "$inc": {"observation_count": 1}
+            }
+        )
+    
+    def _store_confidence_evolution(
+        self,
+        guard_fingerprint: str,
+        exit_fingerprint: str,
+        investigation_id: str,
+        score: float,
+        factors: List[FactorScore]
+    ):
+        """Store confidence score in time-series database"""
+        try:
+            query, update = self._confidence_evolution_update(
+                guard_fingerprint, exit_fingerprint, investigation_id, score, factors
+            )
+            self.db.confidence_evolution.update_one(query, update, upsert=True)
         except Exception as e:
             self.logger.warning(f"Failed to store confidence evolution: {e}")
     
@@ -922,19 +1343,18 @@ class UnifiedProbabilisticConfidenceEngine:
             self.logger.error(f"Failed to retrieve confidence history: {e}")
             return None
     
-    def _parse_datetime(self, dt_input) -> datetime:
-        """Parse datetime from various formats"""
+    def _parse_datetime(self, dt_input, default: Optional[datetime] = None) -> datetime:
+        """Parse datetime from various formats, falling back to default (or now)"""
         if isinstance(dt_input, datetime):
             return dt_input
         
         if isinstance(dt_input, str):
             try:
-                from dateutil import parser as date_parser
-                return date_parser.parse(dt_input)
+                return _parse_timestamp(dt_input)
             except:
-                return datetime.utcnow()
+                return default or datetime.utcnow()
         
-        return datetime.utcnow()
+        return default or datetime.utcnow()
 
 
 # ============================================================================
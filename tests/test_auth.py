@@ -0,0 +1,454 @@
+"""
+Tests for the OTP authentication module
+=======================================
+
+Tests for:
+- OTP collection index migration
+- Auth configuration
+- Paced SMS worker
+- OTP attempt claiming, consumption and verification
+- JWT signing
+- Per-IP rate limiting
+"""
+
+import asyncio
+import dataclasses
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+import sys
+import os
+
+# Add the backend directory to the path so we can import from app package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+# The auth router needs the web stack; skip these tests without it
+try:
+    from app import auth
+    import jwt
+    from cachetools import TTLCache
+    AUTH_AVAILABLE = True
+except ImportError:
+    AUTH_AVAILABLE = False
+
+
+class _AsyncCursor:
+    """Async-iterable stand-in for a Motor aggregation cursor"""
+
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return self._docs.pop(0)
+
+
+def _index_collection(index_info, duplicate_groups=()):
+    """Mock OTP collection with the given index_information() result"""
+    collection = MagicMock()
+    collection.index_information = AsyncMock(return_value=index_info)
+    collection.drop_index = AsyncMock()
+    collection.create_index = AsyncMock()
+    collection.aggregate = MagicMock(return_value=_AsyncCursor(duplicate_groups))
+    collection.delete_many = AsyncMock(
+        return_value=MagicMock(deleted_count=sum(len(g["ids"]) - 1 for g in duplicate_groups))
+    )
+    return collection
+
+
+@pytest.mark.skipif(not AUTH_AVAILABLE, reason="auth dependencies not installed")
+class TestCreateOTPIndexes:
+    """Tests for the startup index migration"""
+
+    def test_replaces_non_unique_lookup_index(self):
+        """The old non-unique index is dropped before the unique one is built"""
+        collection = _index_collection({
+            "_id_": {"key": [("_id", 1)]},
+            "login_id_1_mobile_number_1": {"key": auth.OTP_LOOKUP_INDEX},
+        })
+
+        asyncio.run(auth.create_otp_indexes(collection))
+
+        collection.drop_index.assert_any_await(auth.OTP_LOOKUP_INDEX_NAME)
+        collection.create_index.assert_any_await(auth.OTP_LOOKUP_INDEX, unique=True)
+
+    def test_deletes_older_duplicates_before_unique_build(self):
+        """Only the newest record of each duplicated pair survives"""
+        collection = _index_collection(
+            {"login_id_1_mobile_number_1": {"key": auth.OTP_LOOKUP_INDEX}},
+            duplicate_groups=[{"_id": {}, "ids": ["new", "old1", "old2"], "count": 3}],
+        )
+
+        asyncio.run(auth.create_otp_indexes(collection))
+
+        collection.delete_many.assert_awaited_once_with({"_id": {"$in": ["old1", "old2"]}})
+        # Newest first, so ids[0] is the record that is kept
+        pipeline = collection.aggregate.call_args[0][0]
+        assert pipeline[0] == {"$sort": {"created_at": -1}}
+
+    def test_unique_index_left_in_place(self):
+        """An already-unique index is neither dropped nor deduplicated"""
+        collection = _index_collection({
+            "login_id_1_mobile_number_1": {"key": auth.OTP_LOOKUP_INDEX, "unique": True},
+            "expires_at_1": {"key": [("expires_at", 1)], "partialFilterExpression": {"verified": False}},
+        })
+
+        asyncio.run(auth.create_otp_indexes(collection))
+
+        collection.drop_index.assert_not_awaited()
+        collection.aggregate.assert_not_called()
+        collection.create_index.assert_any_await(auth.OTP_LOOKUP_INDEX, unique=True)
+
+
+@pytest.mark.skipif(not AUTH_AVAILABLE, reason="auth dependencies not installed")
+class TestAuthConfig:
+    """Tests for AuthConfig.from_env"""
+
+    def test_sms_rate_from_env(self, monkeypatch):
+        monkeypatch.setenv("SMS_PER_SEC", "2.5")
+        assert auth.AuthConfig.from_env().sms_per_second == 2.5
+
+    @pytest.mark.parametrize("rate", ["0", "-1"])
+    def test_non_positive_sms_rate_rejected(self, monkeypatch, rate):
+        """A zero or negative rate fails at startup, not in the worker"""
+        monkeypatch.setenv("SMS_PER_SEC", rate)
+        with pytest.raises(ValueError, match="SMS_PER_SEC"):
+            auth.AuthConfig.from_env()
+
+
+@pytest.mark.skipif(not AUTH_AVAILABLE, reason="auth dependencies not installed")
+class TestSMSWorker:
+    """Tests for the paced SMS queue"""
+
+    @pytest.fixture
+    def sent(self, monkeypatch):
+        """Record (time, mobile, otp) for each SMS instead of sending it"""
+        calls = []
+
+        def fake_send(mobile_number, otp_code):
+            calls.append((time.monotonic(), mobile_number, otp_code))
+            return {"status": "success"}
+
+        monkeypatch.setattr(auth, "send_sms_otp", fake_send)
+        monkeypatch.setattr(auth, "CFG", dataclasses.replace(auth.CFG, sms_per_second=20.0))
+        return calls
+
+    @staticmethod
+    def _expiry(seconds=120):
+        return datetime.utcnow() + timedelta(seconds=seconds)
+
+    def test_worker_paces_sends(self, sent):
+        """Consecutive sends are at least 1/sms_per_second apart"""
+        async def run():
+            queue = asyncio.Queue()
+            worker = asyncio.create_task(auth.sms_worker(queue))
+            for i in range(3):
+                queue.put_nowait(("9876543210", f"00000{i}", self._expiry()))
+            await asyncio.wait_for(queue.join(), timeout=5)
+            worker.cancel()
+
+        asyncio.run(run())
+
+        assert [otp for _, _, otp in sent] == ["000000", "000001", "000002"]
+        gaps = [b[0] - a[0] for a, b in zip(sent, sent[1:])]
+        assert all(gap >= 0.045 for gap in gaps)
+
+    def test_worker_drops_expired_without_pacing(self, sent, monkeypatch):
+        """Expired OTPs are skipped and don't use up a send slot"""
+        monkeypatch.setattr(auth, "CFG", dataclasses.replace(auth.CFG, sms_per_second=1.0))
+
+        async def run():
+            queue = asyncio.Queue()
+            worker = asyncio.create_task(auth.sms_worker(queue))
+            for i in range(5):
+                queue.put_nowait(("9876543210", f"00000{i}", self._expiry(-1)))
+            queue.put_nowait(("9876543210", "123456", self._expiry()))
+            started = time.monotonic()
+            await asyncio.wait_for(queue.join(), timeout=5)
+            worker.cancel()
+            return time.monotonic() - started
+
+        elapsed = asyncio.run(run())
+
+        assert [otp for _, _, otp in sent] == ["123456"]
+        # Only the live send reached the pacing sleep, which is still pending
+        assert elapsed < 0.5
+
+    def test_queue_bounded_by_otp_lifetime(self, sent):
+        assert auth.sms_queue_size() == int(auth.CFG.otp_expiry_seconds * 20.0)
+
+        async def run():
+            await auth.start_sms_worker()
+            try:
+                return auth.sms_queue.maxsize
+            finally:
+                await auth.stop_sms_worker()
+
+        assert asyncio.run(run()) == auth.sms_queue_size()
+
+    def test_enqueue_raises_when_full(self, sent, monkeypatch):
+        monkeypatch.setattr(auth, "sms_queue", asyncio.Queue(maxsize=1))
+        asyncio.run(auth.enqueue_sms_otp("9876543210", "000000", self._expiry()))
+        with pytest.raises(asyncio.QueueFull):
+            asyncio.run(auth.enqueue_sms_otp("9876543210", "000001", self._expiry()))
+
+    def test_send_otp_returns_503_when_queue_full(self, sent, monkeypatch):
+        """A full backlog is reported as unavailable, not as 'OTP sent'"""
+        queue = asyncio.Queue(maxsize=1)
+        queue.put_nowait(("9876543210", "000000", self._expiry()))
+        monkeypatch.setattr(auth, "sms_queue", queue)
+        store = AsyncMock(return_value=True)
+        monkeypatch.setattr(auth, "store_otp", store)
+        monkeypatch.setattr(auth, "check_rate_limit", lambda ip: True)
+        request = auth.SendOTPRequest(loginId="officer1", mobileNumber="9876543210")
+        client_request = MagicMock()
+        client_request.client.host = "10.0.0.1"
+
+        with pytest.raises(auth.HTTPException) as excinfo:
+            asyncio.run(auth.send_otp(request, client_request))
+
+        assert excinfo.value.status_code == 503
+        # The officer's current OTP is not replaced by one that can't be delivered
+        store.assert_not_awaited()
+
+    def test_stop_drains_queue(self, sent):
+        """Shutdown delivers every queued SMS before stopping the worker"""
+        async def run():
+            await auth.start_sms_worker()
+            for i in range(4):
+                result = await auth.enqueue_sms_otp("9876543210", f"00000{i}", self._expiry())
+                assert result["status"] == "success"
+            task = auth._sms_worker_task
+            await auth.stop_sms_worker()
+            return task
+
+        task = asyncio.run(run())
+
+        assert len(sent) == 4
+        assert task.done()
+        assert auth.sms_queue is None and auth._sms_worker_task is None
+
+    def test_enqueue_sends_inline_without_worker(self, sent):
+        assert auth.sms_queue is None
+        result = asyncio.run(auth.enqueue_sms_otp("9876543210", "123456", self._expiry()))
+        assert result == {"status": "success"}
+        assert len(sent) == 1
+
+
+def _otp_collection(claimed=None, pending=None, deleted_count=1):
+    """
+    Mock async OTP collection. claimed is what find_one_and_update returns,
+    pending what find_one returns, deleted_count what delete_one reports.
+    """
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=claimed)
+    collection.find_one = AsyncMock(return_value=pending)
+    collection.delete_one = AsyncMock(return_value=MagicMock(deleted_count=deleted_count))
+    return collection
+
+
+@pytest.mark.skipif(not AUTH_AVAILABLE, reason="auth dependencies not installed")
+class TestOTPAttempts:
+    """Tests for claim_attempt and consume_otp"""
+
+    def test_claim_increments_within_attempt_limit(self, monkeypatch):
+        """The claim only matches unexpired, unlocked OTPs and returns the pre-increment record"""
+        collection = _otp_collection(claimed={"otp_code": "123456", "attempts": 0})
+        monkeypatch.setattr(auth, "_otp_collection", collection)
+        now = datetime(2024, 1, 1, 12, 0, 0)
+
+        record = asyncio.run(auth.claim_attempt("officer1", "9876543210", 3, now))
+
+        assert record == {"otp_code": "123456", "attempts": 0}
+        query, update = collection.find_one_and_update.call_args[0]
+        assert query == {
+            "login_id": "officer1",
+            "mobile_number": "9876543210",
+            "expires_at": {"$gt": now},
+            "attempts": {"$lt": 3},
+        }
+        assert update == {"$inc": {"attempts": 1}}
+        kwargs = collection.find_one_and_update.call_args[1]
+        assert kwargs["return_document"] == auth.ReturnDocument.BEFORE
+
+    def test_claim_returns_none_when_locked(self, monkeypatch):
+        monkeypatch.setattr(auth, "_otp_collection", _otp_collection(claimed=None))
+        assert asyncio.run(auth.claim_attempt("officer1", "9876543210", 3)) is None
+
+    def test_claim_returns_none_on_database_error(self, monkeypatch):
+        collection = _otp_collection()
+        collection.find_one_and_update.side_effect = RuntimeError("connection lost")
+        monkeypatch.setattr(auth, "_otp_collection", collection)
+        assert asyncio.run(auth.claim_attempt("officer1", "9876543210", 3)) is None
+
+    def test_consume_deletes_matching_code_once(self, monkeypatch):
+        """The delete is filtered on the code, so a replaced OTP is not consumed"""
+        collection = _otp_collection(deleted_count=1)
+        monkeypatch.setattr(auth, "_otp_collection", collection)
+
+        assert asyncio.run(auth.consume_otp("officer1", "9876543210", "123456"))
+        collection.delete_one.assert_awaited_once_with({
+            "login_id": "officer1",
+            "mobile_number": "9876543210",
+            "otp_code": "123456",
+        })
+
+    def test_consume_fails_when_already_consumed(self, monkeypatch):
+        monkeypatch.setattr(auth, "_otp_collection", _otp_collection(deleted_count=0))
+        assert not asyncio.run(auth.consume_otp("officer1", "9876543210", "123456"))
+
+
+@pytest.mark.skipif(not AUTH_AVAILABLE, reason="auth dependencies not installed")
+class TestVerifyOTP:
+    """Tests for each branch of the verify-otp endpoint"""
+
+    @staticmethod
+    def _verify(otp="123456"):
+        request = auth.VerifyOTPRequest(loginId="officer1", mobileNumber="9876543210", otp=otp)
+        return asyncio.run(auth.verify_otp(request))
+
+    def test_valid_code_logs_in(self, monkeypatch):
+        collection = _otp_collection(claimed={"otp_code": "123456", "attempts": 0})
+        monkeypatch.setattr(auth, "_otp_collection", collection)
+
+        response = self._verify()
+
+        assert response["status"] == "success"
+        assert response["user"]["loginId"] == "officer1"
+        assert response["token"].count(".") == 2
+        collection.delete_one.assert_awaited_once()
+
+    def test_wrong_code_keeps_otp(self, monkeypatch):
+        """A wrong code is a 401 and leaves the OTP (and its attempt count) in place"""
+        collection = _otp_collection(claimed={"otp_code": "123456", "attempts": 1})
+        monkeypatch.setattr(auth, "_otp_collection", collection)
+
+        with pytest.raises(auth.HTTPException) as excinfo:
+            self._verify(otp="654321")
+
+        assert excinfo.value.status_code == 401
+        assert "Invalid OTP" in excinfo.value.detail
+        collection.delete_one.assert_not_awaited()
+
+    def test_attempt_limit_returns_429(self, monkeypatch):
+        """A locked but unexpired OTP is deleted and reported as too many attempts"""
+        collection = _otp_collection(claimed=None, pending={"otp_code": "123456", "attempts": 3})
+        monkeypatch.setattr(auth, "_otp_collection", collection)
+
+        with pytest.raises(auth.HTTPException) as excinfo:
+            self._verify()
+
+        assert excinfo.value.status_code == 429
+        collection.delete_one.assert_awaited_once_with({
+            "login_id": "officer1",
+            "mobile_number": "9876543210",
+        })
+
+    def test_missing_or_expired_returns_401(self, monkeypatch):
+        collection = _otp_collection(claimed=None, pending=None)
+        monkeypatch.setattr(auth, "_otp_collection", collection)
+
+        with pytest.raises(auth.HTTPException) as excinfo:
+            self._verify()
+
+        assert excinfo.value.status_code == 401
+        assert "expired or not found" in excinfo.value.detail
+        collection.delete_one.assert_not_awaited()
+
+    def test_code_is_single_use(self, monkeypatch):
+        """If a parallel request consumed the OTP first, this one is rejected"""
+        collection = _otp_collection(claimed={"otp_code": "123456", "attempts": 0}, deleted_count=0)
+        monkeypatch.setattr(auth, "_otp_collection", collection)
+
+        with pytest.raises(auth.HTTPException) as excinfo:
+            self._verify()
+
+        assert excinfo.value.status_code == 401
+        assert "expired or not found" in excinfo.value.detail
+
+
+@pytest.mark.skipif(not AUTH_AVAILABLE, reason="auth dependencies not installed")
+class TestSignJWT:
+    """sign_jwt must stay byte-for-byte compatible with PyJWT"""
+
+    @staticmethod
+    def _payload(login_id="officer1"):
+        now = datetime.utcnow().replace(microsecond=654321)
+        return {
+            "loginId": login_id,
+            "mobileNumber": "9876543210",
+            "iat": now,
+            "exp": now + timedelta(hours=auth.CFG.jwt_expire_hours),
+        }
+
+    @pytest.mark.parametrize("login_id", ["officer1", "அதிகாரி"])
+    def test_matches_pyjwt(self, login_id):
+        payload = self._payload(login_id)
+        expected = jwt.encode(payload, auth.CFG.jwt_secret_key, algorithm=auth.CFG.jwt_algorithm)
+        assert auth.sign_jwt(payload) == expected
+
+    def test_round_trips_through_pyjwt(self):
+        payload = self._payload()
+        decoded = jwt.decode(
+            auth.sign_jwt(payload),
+            auth.CFG.jwt_secret_key,
+            algorithms=[auth.CFG.jwt_algorithm],
+        )
+        assert decoded["loginId"] == "officer1"
+        assert decoded["mobileNumber"] == "9876543210"
+        # datetime claims become whole-second UTC epoch values
+        assert decoded["exp"] - decoded["iat"] == auth.CFG.jwt_expire_hours * 3600
+        assert jwt.get_unverified_header(auth.sign_jwt(payload)) == {
+            "alg": auth.CFG.jwt_algorithm,
+            "typ": "JWT",
+        }
+
+    def test_rejected_with_wrong_key(self):
+        with pytest.raises(jwt.InvalidSignatureError):
+            jwt.decode(auth.sign_jwt(self._payload()), "wrong-key", algorithms=[auth.CFG.jwt_algorithm])
+
+
+@pytest.mark.skipif(not AUTH_AVAILABLE, reason="auth dependencies not installed")
+class TestRateLimit:
+    """Tests for the in-process OTP request limiter"""
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        """Fresh limiter cache driven by a manual clock"""
+        now = [0.0]
+        cache = TTLCache(maxsize=100, ttl=auth.RATE_LIMIT_WINDOW_SECONDS, timer=lambda: now[0])
+        monkeypatch.setattr(auth, "rate_limit_cache", cache)
+        return now
+
+    def test_allows_up_to_limit(self, clock):
+        limit = auth.CFG.otp_rate_limit_count
+        assert all(auth.check_rate_limit("10.0.0.1") for _ in range(limit))
+        assert not auth.check_rate_limit("10.0.0.1")
+
+    def test_window_resets(self, clock):
+        """The window is fixed from the first request; later requests don't extend it"""
+        limit = auth.CFG.otp_rate_limit_count
+        for _ in range(limit):
+            auth.check_rate_limit("10.0.0.1")
+            clock[0] += 1
+        assert not auth.check_rate_limit("10.0.0.1")
+
+        clock[0] = auth.RATE_LIMIT_WINDOW_SECONDS
+        assert auth.check_rate_limit("10.0.0.1")
+
+    def test_counters_are_per_ip(self, clock):
+        limit = auth.CFG.otp_rate_limit_count
+        for _ in range(limit):
+            auth.check_rate_limit("10.0.0.1")
+        assert not auth.check_rate_limit("10.0.0.1")
+        assert auth.check_rate_limit("10.0.0.2")
+        assert auth.rate_limit_cache["10.0.0.2"] == [1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,424 @@
+# tests/test_behavior_signatures.py
+"""
+Tests for TOR Behavior Signature Library
+
+Tests cover:
+1. Timing statistics
+2. Traffic metrics aggregation
+3. Session classification
+4. Storage (without a database and with a mocked MongoDB)
+"""
+
+import pytest
+import statistics
+import numpy as np
+from datetime import timedelta
+from unittest.mock import MagicMock
+from pymongo import ReplaceOne
+
+import sys
+sys.path.insert(0, "/home/subha/Downloads/tor-unveil")
+
+from backend.app.behavior_signatures import (
+    BehaviorType,
+    PacketPattern,
+    TimingMetrics,
+    TrafficMetrics,
+    _timing_stats,
+    _timing_stats_numpy,
+    ipt_histogram,
+    BehaviorSignature,
+    BehaviorSignatureLibrary,
+    _SCORED_BEHAVIORS,
+)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def library():
+    """Library without a database"""
+    return BehaviorSignatureLibrary()
+
+
+@pytest.fixture
+def mock_collection():
+    """Mock MongoDB collection"""
+    collection = MagicMock()
+    collection.create_index = MagicMock()
+    return collection
+
+
+@pytest.fixture
+def mock_db(mock_collection):
+    """Mock MongoDB database"""
+    db = MagicMock()
+    db.__getitem__ = MagicMock(return_value=mock_collection)
+    return db
+
+
+@pytest.fixture
+def bot_packets():
+    """Regular 1ms packets, all uplink - automated traffic"""
+    return [
+        {"timestamp": i * 0.001, "size": 100, "direction": "up"}
+        for i in range(2000)
+    ]
+
+
+@pytest.fixture
+def mixed_packets():
+    """Irregular packets in both directions"""
+    gaps = [0.5, 0.01, 2.0, 0.02, 0.0, 3.5, 0.05, 1.0]
+    packets = []
+    ts = 100.0
+    for i, gap in enumerate(gaps):
+        ts += gap
+        packets.append({
+            "timestamp": ts,
+            "size": 500 + i * 10,
+            "direction": "UP" if i % 2 else "down",
+        })
+    return packets
+
+
+# ============================================================================
+# TIMING METRICS
+# ============================================================================
+
+class TestTimingMetrics:
+    """Test timing statistics"""
+
+    def test_matches_statistics_module(self):
+        """Mean, sample std dev, min and max match the statistics module"""
+        values = [12.0, 3.5, 40.25, 7.0, 7.0, 100.0]
+        timing = TimingMetrics(inter_packet_times=values)
+        timing.calculate()
+
+        assert timing.mean_iat == pytest.approx(statistics.mean(values))
+        assert timing.std_dev_iat == pytest.approx(statistics.stdev(values))
+        assert timing.min_iat == 3.5
+        assert timing.max_iat == 100.0
+        assert timing.coefficient_variation == pytest.approx(
+            statistics.stdev(values) / statistics.mean(values)
+        )
+
+    def test_kernel_matches_numpy_fallback(self):
+        """The JIT kernel (when numba is installed) agrees with the fallback"""
+        times = np.random.default_rng(7).exponential(40.0, size=5000)
+
+        assert _timing_stats(times) == pytest.approx(_timing_stats_numpy(times))
+
+    def test_list_input_converted(self):
+        """Lists passed by callers are stored as float64 arrays"""
+        timing = TimingMetrics(inter_packet_times=[1, 2, 3])
+
+        assert isinstance(timing.inter_packet_times, np.ndarray)
+        assert timing.inter_packet_times.dtype == np.float64
+
+    def test_ipt_histogram(self):
+        """Gaps are binned in 250ms bands, overflow goes to the last band"""
+        hist = ipt_histogram(np.array([0.0, 10.0, 249.9, 250.0, 4999.0, 9000.0]))
+
+        assert hist.shape == (20,)
+        assert hist[0] == 3
+        assert hist[1] == 1
+        assert hist[19] == 2
+        assert hist.sum() == 6
+
+    def test_histogram_follows_gaps(self):
+        """The IPT histogram is binned from the current gaps on access"""
+        timing = TimingMetrics(inter_packet_times=[100.0, 300.0, 300.0])
+
+        assert timing.ipt_histogram[0] == 1
+        assert timing.ipt_histogram[1] == 2
+
+        timing.inter_packet_times = np.array([600.0])
+        assert timing.ipt_histogram[2] == 1
+        assert timing.ipt_histogram.sum() == 1
+
+    def test_too_few_samples(self):
+        """Fewer than two gaps leaves statistics at zero"""
+        timing = TimingMetrics(inter_packet_times=[5.0])
+        timing.calculate()
+
+        assert timing.mean_iat == 0.0
+        assert timing.std_dev_iat == 0.0
+
+
+# ============================================================================
+# TRAFFIC METRICS
+# ============================================================================
+
+class TestTrafficMetrics:
+    """Test traffic aggregation in classify_session"""
+
+    def test_direction_totals(self, library, mixed_packets):
+        """Uplink/downlink counts and bytes are split by direction"""
+        sig = library.classify_session("s1", "c1", mixed_packets)
+        traffic = sig.traffic_metrics
+
+        up = [p for p in mixed_packets if p["direction"].lower() == "up"]
+        down = [p for p in mixed_packets if p["direction"].lower() != "up"]
+
+        assert traffic.total_packets == len(mixed_packets)
+        assert traffic.total_bytes == sum(p["size"] for p in mixed_packets)
+        assert traffic.uplink_packets == len(up)
+        assert traffic.downlink_packets == len(down)
+        assert traffic.uplink_bytes == sum(p["size"] for p in up)
+        assert traffic.downlink_bytes == sum(p["size"] for p in down)
+
+    def test_gaps_skip_non_increasing_timestamps(self, library, mixed_packets):
+        """Zero gaps are not counted as inter-packet times"""
+        sig = library.classify_session("s1", "c1", mixed_packets)
+
+        assert len(sig.timing_metrics.inter_packet_times) == len(mixed_packets) - 2
+        assert sig.duration_ms == pytest.approx(
+            (mixed_packets[-1]["timestamp"] - mixed_packets[0]["timestamp"]) * 1000
+        )
+
+    def test_metrics_use_slots(self, library, mixed_packets):
+        """Signatures and their metrics carry no per-instance __dict__"""
+        sig = library.classify_session("s1", "c1", mixed_packets)
+
+        for obj in (sig, sig.timing_metrics, sig.traffic_metrics):
+            assert not hasattr(obj, "__dict__")
+
+    def test_symmetry_ratio(self):
+        """Symmetry is min/max of directional bytes"""
+        traffic = TrafficMetrics(total_bytes=300, uplink_bytes=100, downlink_bytes=200)
+        assert traffic.get_symmetry_ratio() == pytest.approx(0.5)
+
+
+# ============================================================================
+# CLASSIFICATION
+# ============================================================================
+
+class TestClassifySession:
+    """Test session classification"""
+
+    def test_no_packets(self, library):
+        """Empty sessions are unclassified"""
+        sig = library.classify_session("s1", "c1", [])
+
+        assert sig.behavior_type == BehaviorType.UNKNOWN
+        assert sig.reason == "No packet data available"
+
+    def test_detected_at_is_utc_aware(self, library):
+        """Detection time is a timezone-aware UTC datetime"""
+        sig = library.classify_session("s1", "c1", [])
+
+        assert sig.detected_at.utcoffset() == timedelta(0)
+
+    def test_bot_traffic(self, library, bot_packets):
+        """Constant, high-rate, one-way traffic classifies as automated"""
+        sig = library.classify_session("s1", "c1", bot_packets)
+
+        assert sig.packet_pattern == PacketPattern.CONSTANT
+        assert sig.behavior_type == BehaviorType.AUTOMATED_BOT
+        assert sig.confidence > 0.4
+        assert set(sig.indicators) == {
+            "constant_pattern", "high_timing_regularity",
+            "high_packet_rate", "unidirectional_traffic",
+        }
+
+    def test_detector_rows_match_classification(self, library, bot_packets):
+        """Each detector row of the fused scoring agrees with the classification"""
+        sig = library.classify_session("s1", "c1", bot_packets)
+        indicators = dict(sig.indicators)
+
+        contributions = library._score_signature(sig, *library._session_features(sig))
+        bot_row = _SCORED_BEHAVIORS.index(BehaviorType.AUTOMATED_BOT)
+        email_row = _SCORED_BEHAVIORS.index(BehaviorType.EMAIL)
+
+        assert library._apply_detector(sig, contributions, email_row) < sig.confidence
+        assert library._apply_detector(sig, contributions, bot_row) == pytest.approx(sig.confidence)
+        assert sig.indicators == indicators
+
+
+    def test_dominant_protocol_is_most_frequent(self, library, mixed_packets):
+        """Dominant protocol is the most frequent, not the largest string"""
+        sig = library.classify_session(
+            "s1", "c1", mixed_packets, ["https", "tls", "https", "dns"]
+        )
+
+        assert sig.dominant_protocol == "https"
+        assert sig.protocols == ["https", "tls", "https", "dns"]
+
+    def test_dominant_protocol_from_counts(self, library, mixed_packets):
+        """Protocol counts from upstream are accepted"""
+        sig = library.classify_session(
+            "s1", "c1", mixed_packets, {"dns": 3, "smtp": 40, "tls": 12}
+        )
+
+        assert sig.dominant_protocol == "smtp"
+        assert sig.protocols == ["dns", "smtp", "tls"]
+
+
+class TestClassifySessionsBatch:
+    """Test batch classification"""
+
+    def test_matches_single_session(self, library, bot_packets, mixed_packets):
+        """Batch results equal per-session classify_session results"""
+        sessions = [
+            {"session_id": "bot", "case_id": "c1", "packets": bot_packets},
+            {"session_id": "empty", "case_id": "c1", "packets": []},
+            {"session_id": "mixed", "case_id": "c1", "packets": mixed_packets,
+             "protocols": ["https"]},
+            {"session_id": "single", "case_id": "c1", "packets": mixed_packets[:1]},
+        ]
+
+        batch = library.classify_sessions_batch(sessions)
+
+        assert [sig.session_id for sig in batch] == ["bot", "empty", "mixed", "single"]
+        for session, sig in zip(sessions, batch):
+            expected = library.classify_session(
+                session["session_id"], session["case_id"],
+                session["packets"], session.get("protocols")
+            )
+            assert sig.behavior_type == expected.behavior_type
+            assert sig.confidence == pytest.approx(expected.confidence)
+            assert sig.reason == expected.reason
+            assert sig.packet_pattern == expected.packet_pattern
+            assert sig.duration_ms == pytest.approx(expected.duration_ms)
+            assert sig.traffic_metrics.uplink_bytes == expected.traffic_metrics.uplink_bytes
+            assert np.allclose(
+                sig.timing_metrics.inter_packet_times,
+                expected.timing_metrics.inter_packet_times
+            )
+            assert np.array_equal(
+                sig.timing_metrics.ipt_histogram,
+                expected.timing_metrics.ipt_histogram
+            )
+
+    def test_empty_batch(self, library):
+        """No sessions, no signatures"""
+        assert library.classify_sessions_batch([]) == []
+
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+class TestStorage:
+    """Test persistence without a database"""
+
+    def test_no_db(self, library):
+        """Storage calls are no-ops without a database"""
+        sig = BehaviorSignature(
+            session_id="s1",
+            case_id="c1",
+            behavior_type=BehaviorType.UNKNOWN,
+            confidence=0.0,
+        )
+
+        assert library.store_signature(sig) is False
+        assert library.get_signature("s1") is None
+        assert library.get_case_behaviors("c1") == []
+
+
+class TestMongoStorage:
+    """Test persistence against a mocked MongoDB"""
+
+    def test_init_creates_indexes(self, mock_db, mock_collection):
+        """Indexes are created when a database is given"""
+        BehaviorSignatureLibrary(mock_db)
+
+        names = [c.kwargs["name"] for c in mock_collection.create_index.call_args_list]
+        assert names == ["idx_session_id", "idx_case_id", "idx_detected_at"]
+        assert mock_collection.create_index.call_args_list[0].kwargs["unique"] is True
+
+    def test_index_failure_does_not_block_others(self, mock_db, mock_collection):
+        """A failing index (e.g. duplicate sessions) is logged and skipped"""
+        mock_collection.create_index.side_effect = [Exception("duplicate key"), None, None]
+
+        BehaviorSignatureLibrary(mock_db)
+
+        assert mock_collection.create_index.call_count == 3
+
+    def test_store_signature_upserts_by_session(self, mock_db, mock_collection, bot_packets):
+        """Storing a session again replaces its signature instead of failing"""
+        library = BehaviorSignatureLibrary(mock_db)
+        sig = library.classify_session("s1", "c1", bot_packets)
+
+        assert library.store_signature(sig) is True
+        assert library.store_signature(sig) is True
+
+        assert mock_collection.replace_one.call_count == 2
+        query, doc = mock_collection.replace_one.call_args.args
+        assert query == {"session_id": "s1"}
+        assert doc["behavior_type"] == "automated"
+        assert mock_collection.replace_one.call_args.kwargs["upsert"] is True
+        mock_collection.insert_one.assert_not_called()
+
+    def test_store_signatures_batches(self, mock_db, mock_collection, bot_packets):
+        """Many signatures are upserted with one unordered bulk_write"""
+        library = BehaviorSignatureLibrary(mock_db)
+        sigs = [library.classify_session(f"s{i}", "c1", bot_packets) for i in range(3)]
+        mock_collection.bulk_write.return_value = MagicMock(matched_count=1, upserted_count=2)
+
+        assert library.store_signatures(sigs) == 3
+
+        ops = mock_collection.bulk_write.call_args.args[0]
+        assert all(isinstance(op, ReplaceOne) for op in ops)
+        assert [op._filter for op in ops] == [{"session_id": f"s{i}"} for i in range(3)]
+        assert ops[0]._doc["behavior_type"] == "automated"
+        assert all(op._upsert for op in ops)
+        assert mock_collection.bulk_write.call_args.kwargs["ordered"] is False
+
+    def test_store_signatures_partial_failure(self, mock_db, mock_collection, bot_packets):
+        """Unordered writes that partly fail report what was stored"""
+        library = BehaviorSignatureLibrary(mock_db)
+        sigs = [library.classify_session(f"s{i}", "c1", bot_packets) for i in range(3)]
+        error = Exception("write error")
+        error.details = {"nMatched": 1, "nUpserted": 1}
+        mock_collection.bulk_write.side_effect = error
+
+        assert library.store_signatures(sigs) == 2
+
+    def test_store_signatures_empty(self, mock_db, mock_collection):
+        """Nothing to store, no round trip"""
+        library = BehaviorSignatureLibrary(mock_db)
+
+        assert library.store_signatures([]) == 0
+        mock_collection.bulk_write.assert_not_called()
+
+    def test_get_case_behaviors(self, mock_db, mock_collection):
+        """Case behaviors are rebuilt from projected documents"""
+        mock_collection.find.return_value.batch_size.return_value = [
+            {
+                "session_id": "s1",
+                "case_id": "c1",
+                "behavior_type": "email",
+                "confidence": 0.8,
+                "timing_metrics": {"mean_iat": 12.5, "std_dev_iat": 3.0},
+                "reason": "Matched email",
+            }
+        ]
+        library = BehaviorSignatureLibrary(mock_db)
+
+        sigs = library.get_case_behaviors("c1")
+
+        assert len(sigs) == 1
+        assert sigs[0].behavior_type == BehaviorType.EMAIL
+        assert sigs[0].case_id == "c1"
+        assert sigs[0].timing_metrics.mean_iat == 12.5
+        assert "projection" in mock_collection.find.call_args.kwargs
+
+    def test_mongo_round_trip(self, library, bot_packets):
+        """to_mongo/from_mongo preserve the stored fields"""
+        sig = library.classify_session("s1", "c1", bot_packets, ["tls"])
+
+        restored = BehaviorSignature.from_mongo(sig.to_mongo())
+
+        assert restored.session_id == "s1"
+        assert restored.case_id == "c1"
+        assert restored.behavior_type == sig.behavior_type
+        assert restored.packet_pattern == sig.packet_pattern
+        assert restored.confidence == sig.confidence
+        assert restored.timing_metrics.mean_iat == sig.timing_metrics.mean_iat
+        assert restored.traffic_metrics.total_bytes == sig.traffic_metrics.total_bytes
+        assert restored.indicators == sig.indicators
+        assert restored.detected_at == sig.detected_at
@@ -0,0 +1,1534 @@
+# tests/test_correlator.py
+"""
+Tests for the forensic correlation engine
+
+Tests cover:
+1. Timing vector construction and histograms
+"""
+
+import pytest
+import statistics
+import numpy as np
+from datetime import datetime, timedelta, timezone
+
+import sys
+sys.path.insert(0, "/home/subha/Downloads/tor-unveil")
+
+from backend.app.correlator import (
+    CorrelationConfig,
+    UncertaintyLevel,
+    EvidenceType,
+    EvidenceItem,
+    EvidenceArray,
+    UncertaintyCalculator,
+    TimingVector,
+    TimingVectorBatch,
+    TimingSimilarityAnalyzer,
+    TrafficSession,
+    RelayActivityWindow,
+    SessionOverlapAnalyzer,
+    BandwidthFeasibilityAnalyzer,
+    CorrelationHypothesis,
+    ExitObservation,
+    ForensicCorrelationEngine,
+    GuardIndex,
+    CircuitLifetimeAnalyzer,
+    score_session_pairs,
+    _pack_session_arrays,
+    _score_all_pairs,
+    _score_all_pairs_numpy,
+    _timing_similarity_kernel,
+    _timing_similarity_numpy,
+    _statistical_distance_kernel,
+    _statistical_distance_batch,
+    _statistical_distance_batch_numpy,
+    _DigestCache,
+)
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture
+def timestamps():
+    """Unsorted packet timestamps (seconds) with irregular gaps."""
+    rng = np.random.default_rng(7)
+    ts = np.cumsum(rng.exponential(0.05, size=200)) + 1_700_000_000.0
+    rng.shuffle(ts)
+    return ts.tolist()
+
+
+BASE_TIME = datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def make_session():
+    """Factory for traffic sessions offset (in seconds) from a fixed base time."""
+    def _make(start, end, session_id="s", **kwargs):
+        kwargs.setdefault("packet_count", 100)
+        kwargs.setdefault("total_bytes", 50_000)
+        kwargs.setdefault("avg_packet_size", 500.0)
+        return TrafficSession(
+            session_id=session_id,
+            start_time=BASE_TIME + timedelta(seconds=start),
+            end_time=BASE_TIME + timedelta(seconds=end),
+            **kwargs,
+        )
+    return _make
+
+
+@pytest.fixture
+def make_window():
+    """Factory for guard activity windows with observed sessions."""
+    def _make(start, end, sessions=(), **kwargs):
+        kwargs.setdefault("flags", ["Guard", "Running"])
+        return RelayActivityWindow(
+            relay_fingerprint=kwargs.pop("fingerprint", "GUARD1"),
+            relay_nickname=kwargs.pop("nickname", "guard1"),
+            window_start=BASE_TIME + timedelta(seconds=start),
+            window_end=BASE_TIME + timedelta(seconds=end),
+            observed_sessions=list(sessions),
+            **kwargs,
+        )
+    return _make
+
+
+@pytest.fixture
+def make_evidence():
+    """Factory for evidence items of a given type, weight and direction."""
+    def _make(evidence_type, weight, supports=True):
+        return EvidenceItem(
+            evidence_type=evidence_type,
+            description="test evidence",
+            measured_value=weight,
+            reference_range=(0.0, 1.0),
+            weight=weight,
+            supports_hypothesis=supports,
+        )
+    return _make
+
+
+@pytest.fixture
+def make_hypothesis():
+    """Factory for hypotheses over a given evidence summary."""
+    def _make(evidence, **kwargs):
+        kwargs.setdefault("uncertainty_level", UncertaintyLevel.MODERATE)
+        return CorrelationHypothesis(
+            hypothesis_id=kwargs.pop("hypothesis_id", "h"),
+            guard_node_fingerprint="GUARD1",
+            guard_node_nickname="guard1",
+            exit_node_fingerprint="EXIT1",
+            exit_node_nickname="exit1",
+            timing_similarity_score=kwargs.pop("timing_similarity_score", 0.5),
+            session_overlap_score=kwargs.pop("session_overlap_score", 0.5),
+            evidence_summary=list(evidence),
+            **kwargs,
+        )
+    return _make
+
+
+@pytest.fixture
+def ipt_list():
+    """Pre-computed inter-packet times in milliseconds."""
+    rng = np.random.default_rng(11)
+    return rng.uniform(0.5, 6000.0, size=150).tolist()
+
+
+# =============================================================================
+# TIMING VECTOR
+# =============================================================================
+
+class TestTimingVector:
+    """Test TimingVector construction"""
+
+    def test_from_timestamps_matches_statistics(self, timestamps):
+        """NumPy statistics agree with the statistics module"""
+        tv = TimingVector.from_timestamps(timestamps)
+        ordered = sorted(timestamps)
+        ipt = [(b - a) * 1000.0 for a, b in zip(ordered, ordered[1:])]
+
+        assert tv.packet_count == len(timestamps)
+        assert isinstance(tv.inter_packet_times_ms, np.ndarray)
+        assert tv.inter_packet_times_ms.dtype == np.float32
+        np.testing.assert_allclose(tv.inter_packet_times_ms, ipt, rtol=1e-6)
+        assert tv.mean_ipt_ms == pytest.approx(statistics.mean(ipt))
+        assert tv.std_ipt_ms == pytest.approx(statistics.stdev(ipt))
+        assert tv.median_ipt_ms == pytest.approx(statistics.median(ipt))
+        assert tv.min_ipt_ms == pytest.approx(min(ipt))
+        assert tv.max_ipt_ms == pytest.approx(max(ipt))
+
+    def test_from_timestamps_sorted_input(self, timestamps):
+        """Pre-sorted and shuffled captures give the same vector"""
+        shuffled = TimingVector.from_timestamps(timestamps)
+        ordered = TimingVector.from_timestamps(sorted(timestamps))
+
+        np.testing.assert_array_equal(ordered.inter_packet_times_ms, shuffled.inter_packet_times_ms)
+        assert ordered.mean_ipt_ms == shuffled.mean_ipt_ms
+        assert ordered.median_ipt_ms == shuffled.median_ipt_ms
+        assert (ordered.inter_packet_times_ms >= 0).all()
+
+    def test_from_timestamps_too_few_packets(self):
+        """Sessions below the timing threshold yield no vector"""
+        count = CorrelationConfig.MIN_PACKETS_FOR_TIMING_ANALYSIS - 1
+        assert TimingVector.from_timestamps([float(i) for i in range(count)]) is None
+
+    def test_from_ipt_list(self, ipt_list):
+        """Pre-computed IPTs are stored as float32 and summarised at full precision"""
+        tv = TimingVector.from_ipt_list(ipt_list)
+
+        assert tv.packet_count == len(ipt_list) + 1
+        np.testing.assert_array_equal(tv.inter_packet_times_ms, np.float32(ipt_list))
+        assert tv.mean_ipt_ms == pytest.approx(statistics.mean(ipt_list))
+        assert tv.std_ipt_ms == pytest.approx(statistics.stdev(ipt_list))
+        assert tv.median_ipt_ms == pytest.approx(statistics.median(ipt_list))
+
+    def test_from_ipt_list_too_short(self):
+        """Too few IPTs yield no vector"""
+        assert TimingVector.from_ipt_list([1.0, 2.0]) is None
+
+    def test_content_equality_and_hash(self, ipt_list):
+        """Vectors compare and hash by their IPT contents"""
+        a = TimingVector.from_ipt_list(ipt_list)
+        b = TimingVector.from_ipt_list(list(ipt_list))
+        # Same 128-IPT prefix, different tail
+        c = TimingVector.from_ipt_list(ipt_list[:-1] + [ipt_list[-1] + 1.0])
+
+        assert a == b and hash(a) == hash(b)
+        assert a != c and hash(a) == hash(c)
+        assert len({a, b, c}) == 2
+
+    def test_ipt_array_is_read_only(self, ipt_list):
+        """The frozen vector does not expose a mutable IPT buffer"""
+        tv = TimingVector.from_ipt_list(ipt_list)
+        with pytest.raises(ValueError):
+            tv.inter_packet_times_ms[0] = 0.0
+
+    def test_to_numpy_is_zero_copy(self, ipt_list):
+        """to_numpy exposes the stored float32 buffer itself"""
+        tv = TimingVector.from_ipt_list(ipt_list)
+        buf = tv.to_numpy()
+
+        assert buf is tv.inter_packet_times_ms
+        assert buf.dtype == np.float32 and buf.flags.c_contiguous
+
+
+class TestTimingHistogram:
+    """Test TimingVector.to_histogram binning"""
+
+    @staticmethod
+    def _reference_histogram(ipts, bins):
+        bin_width = CorrelationConfig.IPT_MAX_DELAY_MS / bins
+        histogram = [0.0] * bins
+        for ipt in ipts:
+            histogram[min(int(ipt / bin_width), bins - 1)] += 1
+        total = sum(histogram)
+        return [h / total for h in histogram]
+
+    def test_matches_reference_binning(self, ipt_list):
+        """bincount histogram matches per-element binning"""
+        tv = TimingVector.from_ipt_list(ipt_list)
+        hist = tv.to_histogram()
+
+        assert len(hist) == CorrelationConfig.IPT_SIMILARITY_BANDS
+        np.testing.assert_allclose(
+            hist, self._reference_histogram(ipt_list, CorrelationConfig.IPT_SIMILARITY_BANDS)
+        )
+        assert hist.sum() == pytest.approx(1.0)
+
+    def test_custom_bin_count(self, ipt_list):
+        """Explicit bin counts are honoured"""
+        tv = TimingVector.from_ipt_list(ipt_list)
+        np.testing.assert_allclose(tv.to_histogram(7), self._reference_histogram(ipt_list, 7))
+
+    def test_overflow_and_bin_edges(self):
+        """Delays at or past the max delay land in the last bin"""
+        max_delay = CorrelationConfig.IPT_MAX_DELAY_MS
+        bins = CorrelationConfig.IPT_SIMILARITY_BANDS
+        bin_width = max_delay / bins
+        ipts = [0.0, bin_width, max_delay, max_delay * 10] + [1.0] * 6
+        hist = TimingVector.from_ipt_list(ipts).to_histogram()
+
+        assert hist[0] == pytest.approx(7 / 10)
+        assert hist[1] == pytest.approx(1 / 10)
+        assert hist[-1] == pytest.approx(2 / 10)
+
+    def test_default_bin_edges(self):
+        """Each default bin's lower edge lands in that bin"""
+        bins = CorrelationConfig.IPT_SIMILARITY_BANDS
+        bin_width = CorrelationConfig.IPT_MAX_DELAY_MS / bins
+        hist = TimingVector.from_ipt_list([k * bin_width for k in range(bins)]).to_histogram()
+        np.testing.assert_allclose(hist, np.full(bins, 1.0 / bins))
+
+    def test_histogram_is_cached_per_bin_count(self, ipt_list):
+        """Repeated calls reuse the same read-only array"""
+        tv = TimingVector.from_ipt_list(ipt_list)
+        default = tv.to_histogram()
+
+        assert tv.to_histogram() is default
+        assert tv.to_histogram(CorrelationConfig.IPT_SIMILARITY_BANDS) is default
+        assert tv.to_histogram(7) is not default
+        assert len(tv.to_histogram(7)) == 7
+        with pytest.raises(ValueError):
+            default[0] = 1.0
+
+
+class TestTimingVectorBatch:
+    """Test the structure-of-arrays timing container"""
+
+    def test_from_vectors_packs_fields(self, ipt_list, timestamps):
+        """Per-vector statistics land in parallel arrays"""
+        vectors = [
+            TimingVector.from_ipt_list(ipt_list),
+            TimingVector.from_timestamps(timestamps),
+        ]
+        batch = TimingVectorBatch.from_vectors(vectors)
+
+        assert len(batch) == 2
+        np.testing.assert_array_equal(batch.means, [tv.mean_ipt_ms for tv in vectors])
+        np.testing.assert_array_equal(batch.stds, [tv.std_ipt_ms for tv in vectors])
+        np.testing.assert_array_equal(batch.medians, [tv.median_ipt_ms for tv in vectors])
+        np.testing.assert_array_equal(batch.packet_counts, [tv.packet_count for tv in vectors])
+        assert batch.packet_counts.dtype == np.int64
+        assert batch.histograms.shape == (2, CorrelationConfig.IPT_SIMILARITY_BANDS)
+        assert batch.histograms.dtype == np.float32
+        np.testing.assert_array_equal(batch.histograms[1], vectors[1].to_histogram())
+
+    def test_sqrt_histograms_have_unit_norm(self, ipt_list, timestamps):
+        """Rooted histogram rows are unit vectors for the GEMM path"""
+        batch = TimingVectorBatch.from_vectors([
+            TimingVector.from_ipt_list(ipt_list),
+            TimingVector.from_timestamps(timestamps),
+        ])
+        np.testing.assert_allclose(batch.sqrt_histograms, np.sqrt(batch.histograms))
+        np.testing.assert_allclose(np.linalg.norm(batch.sqrt_histograms, axis=1), 1.0, rtol=1e-6)
+
+    def test_from_vectors_empty(self):
+        """An empty batch keeps the histogram width"""
+        batch = TimingVectorBatch.from_vectors([])
+        assert len(batch) == 0
+        assert batch.histograms.shape == (0, CorrelationConfig.IPT_SIMILARITY_BANDS)
+        assert batch.histograms.dtype == np.float32
+
+
+# =============================================================================
+# TIMING SIMILARITY
+# =============================================================================
+
+class TestTimingSimilarity:
+    """Test TimingSimilarityAnalyzer metrics"""
+
+    def test_histogram_distance_identical(self, ipt_list):
+        """Identical histograms have zero distance"""
+        hist = TimingVector.from_ipt_list(ipt_list).to_histogram()
+        # float32 histograms are normalized to within single-precision rounding
+        assert TimingSimilarityAnalyzer.histogram_distance(hist, hist) == pytest.approx(0.0, abs=1e-6)
+
+    def test_histogram_distance_disjoint(self):
+        """Histograms with no shared mass are maximally distant"""
+        assert TimingSimilarityAnalyzer.histogram_distance([1.0, 0.0], [0.0, 1.0]) == pytest.approx(1.0)
+
+    def test_histogram_distance_matches_bhattacharyya(self):
+        """Distance equals one minus the Bhattacharyya coefficient"""
+        h1 = np.array([0.1, 0.2, 0.3, 0.4])
+        h2 = np.array([0.25, 0.25, 0.25, 0.25])
+        expected = 1.0 - sum(np.sqrt(a * b) for a, b in zip(h1, h2))
+        assert TimingSimilarityAnalyzer.histogram_distance(h1, h2) == pytest.approx(expected)
+
+    def test_histogram_distance_shape_mismatch(self):
+        """Histograms of different lengths are rejected"""
+        with pytest.raises(ValueError):
+            TimingSimilarityAnalyzer.histogram_distance(np.zeros(3), np.zeros(4))
+
+    def test_batch_histogram_similarity(self, ipt_list):
+        """GEMM form agrees with pairwise histogram_distance"""
+        rng = np.random.default_rng(5)
+        exits = rng.dirichlet(np.ones(20), size=3)
+        guards = rng.dirichlet(np.ones(20), size=4)
+        sim = TimingSimilarityAnalyzer.batch_histogram_similarity(exits, guards)
+
+        assert sim.shape == (3, 4)
+        for i, e in enumerate(exits):
+            for j, g in enumerate(guards):
+                expected = 1.0 - TimingSimilarityAnalyzer.histogram_distance(e, g)
+                assert sim[i, j] == pytest.approx(expected)
+
+    def test_batch_similarity_matches_pairwise(self):
+        """Batch scores agree with calculate_similarity for every pair"""
+        rng = np.random.default_rng(9)
+        vectors = [
+            TimingVector.from_ipt_list(rng.exponential(scale, size=size).tolist())
+            for scale, size in ((5, 40), (50, 300), (800, 25), (50, 12), (2000, 90))
+        ]
+        exits, guards = vectors[:2], vectors[2:] + vectors[:1]
+        scores = TimingSimilarityAnalyzer.batch_similarity(
+            TimingVectorBatch.from_vectors(exits), TimingVectorBatch.from_vectors(guards)
+        )
+
+        assert scores.shape == (2, 4)
+        for i, e in enumerate(exits):
+            for j, g in enumerate(guards):
+                expected, _ = TimingSimilarityAnalyzer.calculate_similarity(e, g)
+                assert round(float(scores[i, j]), 4) == pytest.approx(expected, abs=1e-4)
+
+    def test_similarity_is_memoized_by_content(self, ipt_list):
+        """Equal-content vectors share a cached result; callers get copies"""
+        TimingSimilarityAnalyzer.clear_cache()
+        exit_tv = TimingVector.from_ipt_list(ipt_list)
+        guard_tv = TimingVector.from_ipt_list(ipt_list[::-1])
+
+        first = TimingSimilarityAnalyzer.calculate_similarity(exit_tv, guard_tv)
+        first[1]["histogram_similarity"] = -1.0
+        again = TimingSimilarityAnalyzer.calculate_similarity(
+            TimingVector.from_ipt_list(ipt_list), TimingVector.from_ipt_list(ipt_list[::-1])
+        )
+
+        cache = TimingSimilarityAnalyzer._similarity_cache
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert again[0] == first[0]
+        assert again[1]["histogram_similarity"] != -1.0
+
+        TimingSimilarityAnalyzer.clear_cache()
+        assert len(TimingSimilarityAnalyzer._similarity_cache) == 0
+
+    def test_similarity_cache_holds_no_vectors(self, ipt_list):
+        """Cache keys are content digests, so cached entries don't pin vectors"""
+        TimingSimilarityAnalyzer.clear_cache()
+        exit_tv = TimingVector.from_ipt_list(ipt_list)
+        guards = TimingVectorBatch.from_vectors([TimingVector.from_ipt_list(ipt_list[::-1])])
+        TimingSimilarityAnalyzer.calculate_similarity(exit_tv, exit_tv, 0.5)
+        TimingSimilarityAnalyzer.similarity_row(exit_tv, guards)
+
+        for cache in (TimingSimilarityAnalyzer._similarity_cache, TimingSimilarityAnalyzer._row_cache):
+            (key,) = list(cache._entries)
+            assert all(isinstance(part, (bytes, float)) for part in key)
+        assert exit_tv.digest == TimingVector.from_ipt_list(ipt_list).digest
+        assert exit_tv.digest != TimingVector.from_ipt_list(ipt_list[::-1]).digest
+
+    def test_similarity_cache_is_bounded(self):
+        cache = _DigestCache(maxsize=2)
+        for key in ("a", "b", "c"):
+            cache.put((key,), key)
+        assert cache.get(("a",)) is None
+        assert cache.get(("c",)) == "c"
+        assert len(cache) == 2
+
+    def test_new_engine_keeps_shared_cache(self, ipt_list):
+        """Constructing an engine must not wipe results cached by others"""
+        TimingSimilarityAnalyzer.clear_cache()
+        tv = TimingVector.from_ipt_list(ipt_list)
+        TimingSimilarityAnalyzer.calculate_similarity(tv, tv)
+        ForensicCorrelationEngine()
+        assert len(TimingSimilarityAnalyzer._similarity_cache) == 1
+
+    def test_similarity_row_matches_batch(self, ipt_list):
+        """The memoized row equals batch_similarity and is read-only"""
+        exit_tv = TimingVector.from_ipt_list(ipt_list)
+        guards = TimingVectorBatch.from_vectors(
+            [TimingVector.from_ipt_list(ipt_list[k:]) for k in (0, 20, 60)]
+        )
+        row = TimingSimilarityAnalyzer.similarity_row(exit_tv, guards)
+
+        np.testing.assert_array_equal(
+            row, TimingSimilarityAnalyzer.batch_similarity(TimingVectorBatch.from_vectors([exit_tv]), guards)[0]
+        )
+        assert TimingSimilarityAnalyzer.similarity_row(exit_tv, guards) is row
+        with pytest.raises(ValueError):
+            row[0] = 0.0
+
+    def test_rate_mismatch_short_circuit(self, ipt_list):
+        """A strict cutoff skips pairs whose packet rates cannot reach it"""
+        exit_tv = TimingVector.from_ipt_list(ipt_list)
+        guard_tv = TimingVector.from_ipt_list(ipt_list * 4)
+
+        score, parts = TimingSimilarityAnalyzer.calculate_similarity(exit_tv, guard_tv, min_score=0.9)
+        assert score == 0.0
+        assert parts["short_circuit"] == "rate_mismatch"
+
+        # Without a cutoff, or with a reachable one, the full score is computed
+        full, _ = TimingSimilarityAnalyzer.calculate_similarity(exit_tv, guard_tv)
+        assert full > 0.0
+        assert TimingSimilarityAnalyzer.calculate_similarity(exit_tv, guard_tv, min_score=0.5)[0] == full
+        assert TimingSimilarityAnalyzer.calculate_similarity(exit_tv, exit_tv, min_score=0.9)[0] > 0.9
+
+    def test_timing_kernel_matches_reference(self, ipt_list):
+        """The JIT kernel reproduces the NumPy metric definitions"""
+        exit_tv = TimingVector.from_ipt_list(ipt_list)
+        guard_tv = TimingVector.from_ipt_list(ipt_list[10:] + [30.0] * 40)
+        args = (
+            exit_tv.to_histogram(), exit_tv.mean_ipt_ms, exit_tv.std_ipt_ms,
+            exit_tv.median_ipt_ms, exit_tv.packet_count,
+            guard_tv.to_histogram(), guard_tv.mean_ipt_ms, guard_tv.std_ipt_ms,
+            guard_tv.median_ipt_ms, guard_tv.packet_count,
+        )
+        combined, hist_sim, stat_sim, rate_sim = _timing_similarity_kernel(*args)
+
+        assert hist_sim == pytest.approx(
+            1.0 - TimingSimilarityAnalyzer.histogram_distance(exit_tv.to_histogram(), guard_tv.to_histogram())
+        )
+        assert stat_sim == pytest.approx(1.0 - TimingSimilarityAnalyzer.statistical_distance(exit_tv, guard_tv))
+        assert combined == pytest.approx(0.5 * hist_sim + 0.35 * stat_sim + 0.15 * rate_sim)
+        np.testing.assert_allclose(_timing_similarity_numpy(*args), (combined, hist_sim, stat_sim, rate_sim))
+
+    def test_statistical_distance_kernel(self):
+        """Moment distance is weighted, scale-normalized and capped at 1"""
+        assert _statistical_distance_kernel(10.0, 2.0, 9.0, 10.0, 2.0, 9.0) == 0.0
+        # Only the mean differs: 0.5 * |10 - 20| / 20
+        assert _statistical_distance_kernel(10.0, 2.0, 9.0, 20.0, 2.0, 9.0) == pytest.approx(0.25)
+        # Sub-millisecond values are normalized by 1.0, not by themselves
+        assert _statistical_distance_kernel(0.2, 0.0, 0.0, 0.4, 0.0, 0.0) == pytest.approx(0.1)
+        assert _statistical_distance_kernel(1.0, 1.0, 1.0, 1e6, 1e6, 1e6) == pytest.approx(1.0)
+
+    def test_statistical_distance_batch(self):
+        """Batch kernels agree with the scalar kernel for every pair"""
+        rng = np.random.default_rng(13)
+        exit_moments = [rng.uniform(0.1, 900.0, size=5) for _ in range(3)]
+        guard_moments = [rng.uniform(0.1, 900.0, size=7) for _ in range(3)]
+        expected = np.array([
+            [
+                _statistical_distance_kernel(
+                    *(float(a[i]) for a in exit_moments), *(float(b[j]) for b in guard_moments)
+                )
+                for j in range(7)
+            ]
+            for i in range(5)
+        ])
+
+        np.testing.assert_allclose(_statistical_distance_batch(*exit_moments, *guard_moments), expected)
+        np.testing.assert_allclose(
+            _statistical_distance_batch_numpy(*exit_moments, *guard_moments), expected
+        )
+
+
+# =============================================================================
+# UNCERTAINTY
+# =============================================================================
+
+class TestUncertaintyCalculator:
+    """Test UncertaintyCalculator.calculate"""
+
+    def test_no_evidence(self):
+        """No evidence is maximally uncertain"""
+        assert UncertaintyCalculator.calculate([]) == UncertaintyLevel.VERY_HIGH
+
+    def test_single_evidence_type(self, make_evidence):
+        """One evidence type is never enough"""
+        items = [make_evidence(EvidenceType.TIMING_SIMILARITY, 0.9)] * 3
+        assert UncertaintyCalculator.calculate(items) == UncertaintyLevel.VERY_HIGH
+
+    def test_contradiction_dominates(self, make_evidence):
+        """Contradicting weight well above support is very uncertain"""
+        items = [
+            make_evidence(EvidenceType.TIMING_SIMILARITY, 0.2),
+            make_evidence(EvidenceType.SESSION_OVERLAP, 0.8, supports=False),
+        ]
+        assert UncertaintyCalculator.calculate(items) == UncertaintyLevel.VERY_HIGH
+
+    def test_high_weight_variance(self, make_evidence):
+        """Evidence pulling in opposite directions stays high uncertainty"""
+        items = [
+            make_evidence(EvidenceType.TIMING_SIMILARITY, 0.9),
+            make_evidence(EvidenceType.SESSION_OVERLAP, 0.8),
+            make_evidence(EvidenceType.BANDWIDTH_FEASIBILITY, 0.7),
+            make_evidence(EvidenceType.BEHAVIORAL_CONSISTENCY, 0.6, supports=False),
+        ]
+        # Signed weights 0.9, 0.8, 0.7, -0.6 have sample variance ~0.50
+        assert UncertaintyCalculator.calculate(items) == UncertaintyLevel.HIGH
+
+    def test_consistent_strong_support(self, make_evidence):
+        """Consistent support across four types lowers uncertainty"""
+        items = [
+            make_evidence(EvidenceType.TIMING_SIMILARITY, 0.9),
+            make_evidence(EvidenceType.SESSION_OVERLAP, 0.8),
+            make_evidence(EvidenceType.BANDWIDTH_FEASIBILITY, 0.5),
+            make_evidence(EvidenceType.BEHAVIORAL_CONSISTENCY, 0.4),
+        ]
+        assert UncertaintyCalculator.calculate(items) == UncertaintyLevel.LOW
+
+    def test_weak_support(self, make_evidence):
+        """Consistent but weak support is moderate"""
+        items = [
+            make_evidence(EvidenceType.TIMING_SIMILARITY, 0.5),
+            make_evidence(EvidenceType.SESSION_OVERLAP, 0.4),
+            make_evidence(EvidenceType.BANDWIDTH_FEASIBILITY, 0.3),
+        ]
+        assert UncertaintyCalculator.calculate(items) == UncertaintyLevel.MODERATE
+
+    def test_array_matches_items(self, make_evidence):
+        """calculate_array agrees with calculate on random evidence sets"""
+        rng = np.random.default_rng(3)
+        types = list(EvidenceType)
+        for _ in range(200):
+            items = [
+                make_evidence(types[rng.integers(len(types))], float(rng.uniform(0, 1)), bool(rng.random() < 0.8))
+                for _ in range(rng.integers(0, 7))
+            ]
+            assert UncertaintyCalculator.calculate_array(
+                EvidenceArray.from_items(items)
+            ) == UncertaintyCalculator.calculate(items)
+
+
+class TestCorrelationHypothesis:
+    """Test CorrelationHypothesis.combined_evidence_weight"""
+
+    def test_no_evidence(self, make_hypothesis):
+        """Empty evidence carries no weight"""
+        assert make_hypothesis([]).combined_evidence_weight == 0.0
+
+    def test_evidence_is_packed(self, make_evidence, make_hypothesis):
+        """Evidence is kept as a tuple alongside its packed arrays"""
+        items = [
+            make_evidence(EvidenceType.SESSION_OVERLAP, 0.7),
+            make_evidence(EvidenceType.BANDWIDTH_FEASIBILITY, 0.2, supports=False),
+        ]
+        hypothesis = make_hypothesis(items)
+        evidence = hypothesis.evidence_array
+
+        assert hypothesis.evidence_summary == tuple(items)
+        np.testing.assert_array_equal(evidence.weights, [0.7, 0.2])
+        np.testing.assert_array_equal(evidence.supports, [True, False])
+        assert evidence.types.tolist() == [
+            EvidenceType.SESSION_OVERLAP.index, EvidenceType.BANDWIDTH_FEASIBILITY.index
+        ]
+        assert evidence.descriptions == ("test evidence", "test evidence")
+
+    def test_net_support_ratio(self, make_evidence, make_hypothesis):
+        """Weight is net support over total weight"""
+        hypothesis = make_hypothesis([
+            make_evidence(EvidenceType.TIMING_SIMILARITY, 0.9),
+            make_evidence(EvidenceType.SESSION_OVERLAP, 0.6),
+            make_evidence(EvidenceType.BANDWIDTH_FEASIBILITY, 0.5, supports=False),
+        ])
+        assert hypothesis.combined_evidence_weight == pytest.approx((1.5 - 0.5) / 2.0)
+
+    def test_zero_total_weight(self, make_evidence, make_hypothesis):
+        """Zero-weight evidence does not divide by zero"""
+        hypothesis = make_hypothesis([make_evidence(EvidenceType.TIMING_SIMILARITY, 0.0)])
+        assert hypothesis.combined_evidence_weight == 0.0
+
+    def test_to_dict_rounds_by_default(self, make_evidence, make_hypothesis):
+        """API serialization rounds scores for display"""
+        hypothesis = make_hypothesis(
+            [make_evidence(EvidenceType.TIMING_SIMILARITY, 0.123456789)],
+            timing_similarity_score=0.987654321,
+            circuit_lifetime_estimate_sec=123.456789,
+        )
+        data = hypothesis.to_dict()
+
+        assert data["timing_similarity_score"] == 0.9877
+        assert data["circuit_lifetime_estimate_sec"] == 123.46
+        assert data["evidence_summary"][0]["weight"] == 0.1235
+
+    def test_to_dict_unrounded(self, make_evidence, make_hypothesis):
+        """rounded=False keeps full precision throughout"""
+        hypothesis = make_hypothesis(
+            [make_evidence(EvidenceType.TIMING_SIMILARITY, 0.123456789)],
+            timing_similarity_score=0.987654321,
+            circuit_lifetime_estimate_sec=123.456789,
+        )
+        data = hypothesis.to_dict(rounded=False)
+
+        assert data["timing_similarity_score"] == 0.987654321
+        assert data["circuit_lifetime_estimate_sec"] == 123.456789
+        assert data["evidence_summary"][0]["weight"] == 0.123456789
+        assert data["evidence_summary"][0]["measured_value"] == 0.123456789
+
+
+# =============================================================================
+# SESSION OVERLAP
+# =============================================================================
+
+class TestSessionOverlap:
+    """Test session overlap ratios"""
+
+    def test_rates_use_cached_duration(self, make_session):
+        """Duration and rates come from the bounds captured at construction"""
+        session = make_session(10, 60, packet_count=200, total_bytes=100_000)
+
+        assert session.duration_seconds == 50.0
+        assert session.packets_per_second == pytest.approx(4.0)
+        assert session.bytes_per_second == pytest.approx(2000.0)
+        assert make_session(10, 10).bytes_per_second == 0.0
+
+    def test_data_structures_use_slots(self, make_session, make_window, make_hypothesis, ipt_list):
+        """Per-pair data structures carry no per-instance __dict__"""
+        session = make_session(0, 10, timing_vector=TimingVector.from_ipt_list(ipt_list))
+        for obj in (session, session.timing_vector, make_window(0, 10, [session]), make_hypothesis([])):
+            assert not hasattr(obj, "__dict__")
+
+    def test_overlap_ratio(self, make_session):
+        """Overlap is normalized by the shorter session"""
+        a = make_session(0, 100)
+        b = make_session(50, 250)
+
+        assert a.overlaps_with(b)
+        assert a.overlap_ratio(b) == pytest.approx(0.5)
+        assert b.overlap_ratio(a) == pytest.approx(0.5)
+        assert a.overlap_ratio(make_session(10, 20)) == pytest.approx(1.0)
+
+    def test_disjoint_and_touching(self, make_session):
+        """Disjoint or merely touching sessions have no overlap ratio"""
+        a = make_session(0, 100)
+
+        assert not a.overlaps_with(make_session(101, 200))
+        assert a.overlap_ratio(make_session(101, 200)) == 0.0
+        assert a.overlaps_with(make_session(100, 200))
+        assert a.overlap_ratio(make_session(100, 200)) == 0.0
+
+    def test_zero_length_session(self, make_session):
+        """Instantaneous sessions cannot be normalized"""
+        assert make_session(0, 100).overlap_ratio(make_session(50, 50)) == 0.0
+
+    def test_aware_and_naive_timestamps_agree(self, make_session):
+        """Naive datetimes are treated as UTC"""
+        naive = make_session(0, 100)
+        aware = TrafficSession(
+            session_id="aware",
+            start_time=(BASE_TIME + timedelta(seconds=50)).replace(tzinfo=timezone.utc),
+            end_time=(BASE_TIME + timedelta(seconds=150)).replace(tzinfo=timezone.utc),
+            packet_count=1,
+            total_bytes=1,
+            avg_packet_size=1.0,
+        )
+        assert naive.overlap_ratio(aware) == pytest.approx(0.5)
+
+    def test_epoch_microseconds_are_exact(self, make_session, make_window):
+        """Integer bounds keep microsecond precision for naive and aware times"""
+        session = make_session(0, 0.000001)
+        assert session._end_us - session._start_us == 1
+        assert session._start_us == int(BASE_TIME.replace(tzinfo=timezone.utc).timestamp()) * 1_000_000
+
+        aware = TrafficSession(
+            session_id="aware",
+            start_time=BASE_TIME.replace(tzinfo=timezone.utc),
+            end_time=BASE_TIME.replace(tzinfo=timezone.utc),
+            packet_count=1, total_bytes=1, avg_packet_size=1.0,
+        )
+        assert aware._start_us == session._start_us
+        assert make_window(0, 1.5)._end_us - make_window(0, 1.5)._start_us == 1_500_000
+
+    def test_overlap_matrix_matches_pairwise(self, make_session):
+        """Vectorized overlap agrees with overlap_ratio for every pair"""
+        left = [make_session(0, 100), make_session(40, 40), make_session(300, 900)]
+        right = [make_session(50, 250), make_session(100, 200), make_session(-50, 2000), make_session(901, 950)]
+        matrix = SessionOverlapAnalyzer.overlap_matrix(
+            [s._start_ts for s in left], [s._end_ts for s in left],
+            [s._start_ts for s in right], [s._end_ts for s in right],
+        )
+
+        assert matrix.shape == (3, 4)
+        for i, a in enumerate(left):
+            for j, b in enumerate(right):
+                assert matrix[i, j] == pytest.approx(a.overlap_ratio(b))
+
+
+class TestSessionOverlapAnalyzer:
+    """Test SessionOverlapAnalyzer.calculate_overlap_score"""
+
+    def test_window_packs_session_bounds(self, make_session, make_window):
+        """Session bounds are packed into arrays at construction"""
+        sessions = [make_session(0, 10, "a"), make_session(20, 40, "b")]
+        window = make_window(0, 100, sessions)
+
+        np.testing.assert_array_equal(window._session_starts, [s._start_ts for s in sessions])
+        np.testing.assert_array_equal(window._session_ends, [s._end_ts for s in sessions])
+        assert list(window._session_ids) == ["a", "b"]
+
+    def test_window_packs_positive_packet_sizes(self, make_session, make_window):
+        """Sessions without a packet size are left out of the size array"""
+        window = make_window(0, 100, [
+            make_session(0, 10, "a", avg_packet_size=512.0),
+            make_session(0, 10, "b", avg_packet_size=0.0),
+            make_session(0, 10, "c", avg_packet_size=1200.0),
+        ])
+        np.testing.assert_array_equal(window._packet_sizes, [512.0, 1200.0])
+
+    def test_best_matching_session(self, make_session, make_window):
+        """The best overlapping guard session drives the combined score"""
+        exit_session = make_session(100, 200)
+        window = make_window(0, 1000, [
+            make_session(0, 50, "none"),
+            make_session(150, 400, "half"),
+            make_session(90, 210, "full"),
+            make_session(120, 220, "also_partial"),
+        ])
+        score, details = SessionOverlapAnalyzer.calculate_overlap_score(exit_session, window)
+
+        assert details["best_matching_session_id"] == "full"
+        assert details["session_match_score"] == pytest.approx(1.0)
+        assert score == pytest.approx(0.4 * 1.0 + 0.6 * 1.0)
+
+    def test_first_of_equal_matches_wins(self, make_session, make_window):
+        """Ties keep the earliest observed session"""
+        exit_session = make_session(100, 200)
+        window = make_window(0, 1000, [make_session(150, 300, "first"), make_session(50, 150, "second")])
+        _, details = SessionOverlapAnalyzer.calculate_overlap_score(exit_session, window)
+
+        assert details["best_matching_session_id"] == "first"
+        assert details["session_match_score"] == pytest.approx(0.5)
+
+    def test_no_overlapping_sessions(self, make_session, make_window):
+        """Window-level overlap is discounted without session matches"""
+        exit_session = make_session(100, 200)
+        window = make_window(0, 1000, [make_session(500, 600, "late")])
+        score, details = SessionOverlapAnalyzer.calculate_overlap_score(exit_session, window)
+
+        assert details["best_matching_session_id"] is None
+        assert details["session_match_score"] == 0.0
+        assert score == pytest.approx(0.7)
+
+    def test_insufficient_window_overlap(self, make_session, make_window):
+        """Exit sessions outside the window are rejected early"""
+        score, details = SessionOverlapAnalyzer.calculate_overlap_score(
+            make_session(2000, 2100), make_window(0, 1000)
+        )
+        assert score == 0.0
+        assert details["reason"] == "insufficient_temporal_overlap"
+
+
+class TestBandwidthFeasibility:
+    """Test BandwidthFeasibilityAnalyzer scalar and batch paths"""
+
+    def test_batch_matches_scalar(self, make_session):
+        """Every utilization band agrees with assess_feasibility"""
+        session = make_session(0, 100, total_bytes=100_000)  # 1000 B/s
+        guard_bps = [None, 0.0, 500.0, 1150.0, 5_000.0, 100_000.0, 5_000_000.0]
+        feasible, score, codes = BandwidthFeasibilityAnalyzer.batch_assess_feasibility(
+            session.bytes_per_second,
+            np.array([np.nan if b is None else b for b in guard_bps])
+        )
+
+        for i, bps in enumerate(guard_bps):
+            expected = BandwidthFeasibilityAnalyzer.assess_feasibility(session, bps)
+            assert feasible[i] == expected[0]
+            assert score[i] == pytest.approx(expected[1], abs=1e-4)
+            assert BandwidthFeasibilityAnalyzer.EXPLANATIONS[codes[i]] == expected[2]
+
+    def test_batch_codes_dtype(self):
+        """Explanation codes are compact integers"""
+        _, _, codes = BandwidthFeasibilityAnalyzer.batch_assess_feasibility(
+            1000.0, np.array([1e6, 1e3])
+        )
+        assert codes.dtype == np.int8
+        assert codes.tolist() == [3, 1]
+
+
+class TestEvidenceType:
+    """Test EvidenceType member bits"""
+
+    def test_bits_are_distinct_powers_of_two(self):
+        """Each evidence type owns one bit of the diversity mask"""
+        bits = [t.bit for t in EvidenceType]
+        assert bits == [1 << i for i in range(len(EvidenceType))]
+
+    def test_values_unchanged(self):
+        """Serialized values stay the string names"""
+        assert EvidenceType("session_overlap") is EvidenceType.SESSION_OVERLAP
+        assert EvidenceType.TIMING_SIMILARITY.value == "timing_similarity"
+
+
+class TestPairwiseScoring:
+    """Test score_session_pairs against the per-pair analyzers"""
+
+    @pytest.fixture
+    def sessions(self, make_session):
+        rng = np.random.default_rng(5)
+
+        def _build(prefix, count):
+            out = []
+            for i in range(count):
+                start = float(rng.uniform(0, 600))
+                timing = TimingVector.from_ipt_list(rng.exponential(40.0, size=50 + 10 * i).tolist())
+                out.append(make_session(
+                    start, start + float(rng.uniform(5, 900)), f"{prefix}{i}",
+                    total_bytes=int(rng.integers(1_000, 10_000_000)),
+                    timing_vector=timing if i != 1 else None,
+                ))
+            return out
+        return _build("e", 3), _build("g", 4)
+
+    def test_matches_scalar_analyzers(self, sessions):
+        """Each component equals the corresponding analyzer output"""
+        exits, guards = sessions
+        bandwidths = [None, 5e4, 2e6, 1e9]
+        scores = score_session_pairs(exits, guards, bandwidths)
+
+        assert scores.shape == (3, 4, 6)
+        for i, e in enumerate(exits):
+            for j, g in enumerate(guards):
+                if e.timing_vector and g.timing_vector:
+                    _, parts = TimingSimilarityAnalyzer.calculate_similarity(e.timing_vector, g.timing_vector)
+                    assert scores[i, j, 0] == pytest.approx(parts["histogram_similarity"], abs=1e-4)
+                    assert scores[i, j, 1] == pytest.approx(parts["statistical_similarity"], abs=1e-4)
+                    assert scores[i, j, 2] == pytest.approx(parts["packet_rate_similarity"], abs=1e-4)
+                else:
+                    assert np.isnan(scores[i, j, :3]).all()
+
+                assert scores[i, j, 3] == pytest.approx(e.overlap_ratio(g))
+                _, bw_score, _ = BandwidthFeasibilityAnalyzer.assess_feasibility(e, bandwidths[j])
+                assert scores[i, j, 4] == pytest.approx(bw_score, abs=1e-4)
+                lifetime, feasibility = CircuitLifetimeAnalyzer.estimate_circuit_lifetime(e, g)
+                assert scores[i, j, 5] == pytest.approx(
+                    CircuitLifetimeAnalyzer.lifetime_plausibility_weight(lifetime, feasibility)
+                )
+
+    def test_kernel_matches_numpy_fallback(self, sessions):
+        """The JIT kernel and the broadcast fallback agree"""
+        exits, guards = sessions
+        bins = CorrelationConfig.IPT_SIMILARITY_BANDS
+        exit_arrays = _pack_session_arrays(exits, bins)[1:]
+        guard_arrays = _pack_session_arrays(guards, bins)[1:]
+        bps_e = np.array([e.bytes_per_second for e in exits])
+        bw_g = np.array([0.0, 5e4, 2e6, 1e9])
+
+        np.testing.assert_allclose(
+            _score_all_pairs(*exit_arrays, bps_e, *guard_arrays, bw_g),
+            _score_all_pairs_numpy(*exit_arrays, bps_e, *guard_arrays, bw_g),
+            atol=1e-12
+        )
+
+    def test_empty_inputs(self, sessions):
+        """No sessions on either side yields an empty score tensor"""
+        exits, _ = sessions
+        assert score_session_pairs(exits, []).shape == (3, 0, 6)
+        assert score_session_pairs([], exits).shape == (0, 3, 6)
+
+
+class TestCircuitLifetime:
+    """Test CircuitLifetimeAnalyzer plausibility weights"""
+
+    def test_plausibility_bands(self):
+        """Short lifetimes are rejected and typical ones get full weight"""
+        weight = CircuitLifetimeAnalyzer.lifetime_plausibility_weight
+        assert weight(5.0, "implausible_too_short") == 0.0
+        assert weight(120.0, "plausible_typical") == 1.0
+        assert weight(390.0, "plausible_extended") == pytest.approx(0.75)
+
+    def test_long_lifetime_decay(self):
+        """Long lifetimes decay as 0.3 * exp(-excess / 600), without a floor"""
+        max_sec = CorrelationConfig.MAX_CIRCUIT_LIFETIME_SEC
+        for excess in [0.0, 1.0, 1.7, 600.0, 3600.0, 3601.0, 7200.0]:
+            weight = CircuitLifetimeAnalyzer.lifetime_plausibility_weight(
+                max_sec + excess, "implausible_too_long"
+            )
+            assert weight == pytest.approx(0.3 * np.exp(-excess / 600.0), rel=1e-12)
+
+        weight = CircuitLifetimeAnalyzer.lifetime_plausibility_weight
+        assert weight(max_sec + 7200.0, "implausible_too_long") < weight(max_sec + 3600.0, "implausible_too_long")
+        assert weight(max_sec + 1.0, "implausible_too_long") < weight(max_sec + 0.5, "implausible_too_long")
+
+
+# =============================================================================
+# CORRELATION ENGINE
+# =============================================================================
+
+class TestForensicCorrelationEngine:
+    """Test ForensicCorrelationEngine.correlate"""
+
+    @pytest.fixture
+    def observation(self, make_session, ipt_list):
+        session = make_session(100, 200, "exit", timing_vector=TimingVector.from_ipt_list(ipt_list))
+        return ExitObservation(
+            observation_id="obs1",
+            exit_fingerprint="EXIT1",
+            exit_nickname="exit1",
+            observed_session=session,
+        )
+
+    @pytest.fixture
+    def windows(self, make_session, make_window, ipt_list):
+        timing = TimingVector.from_ipt_list(ipt_list)
+        return [
+            make_window(0, 1000, [make_session(90, 210, "g0", timing_vector=timing)],
+                        fingerprint="MATCH", bandwidth_bytes_per_sec=1e6),
+            make_window(0, 1000, fingerprint="NOT_GUARD", flags=["Running"]),
+            make_window(5000, 6000, fingerprint="DISJOINT"),
+            make_window(195, 2000, fingerprint="SLIVER"),
+            make_window(150, 400, fingerprint="PARTIAL"),
+        ]
+
+    def test_prefilter_drops_ineligible_windows(self, observation, windows):
+        """Non-guards, disjoint and barely overlapping windows are skipped"""
+        hypotheses = ForensicCorrelationEngine().correlate(observation, windows)
+
+        assert {h.guard_node_fingerprint for h in hypotheses} == {"MATCH", "PARTIAL"}
+        assert hypotheses[0].guard_node_fingerprint == "MATCH"
+        assert hypotheses[0].timing_similarity_score > 0.9
+
+    def test_behavioral_consistency_uses_best_size_ratio(self, observation, make_session, make_window):
+        """The closest guard packet size drives the behavioral evidence"""
+        window = make_window(0, 1000, [
+            make_session(100, 200, "far", avg_packet_size=100.0),
+            make_session(100, 200, "close", avg_packet_size=400.0),
+            make_session(100, 200, "none", avg_packet_size=0.0),
+        ])
+        (hypothesis,) = ForensicCorrelationEngine().correlate(observation, [window])
+        behavioral = [
+            e for e in hypothesis.evidence_summary
+            if e.evidence_type is EvidenceType.BEHAVIORAL_CONSISTENCY
+        ]
+        # Exit sessions average 500-byte packets
+        assert behavioral[0].measured_value == pytest.approx(400.0 / 500.0)
+
+    def test_guard_index_reused_for_same_windows(self, observation, windows):
+        """The guard index is built once per sequence of windows"""
+        engine = ForensicCorrelationEngine()
+        engine.correlate(observation, windows)
+        index = engine._guard_index(windows)
+
+        engine.correlate(observation, windows)
+        assert engine._guard_index(windows) is index
+        assert engine._guard_index(list(windows)) is index
+        assert engine._guard_index(windows[::-1]) is not index
+
+    def test_guard_index_rebuilt_after_element_replaced(self, windows, make_window):
+        """Replacing a window in place must not serve a stale index"""
+        engine = ForensicCorrelationEngine()
+        windows = list(windows)
+        index = engine._guard_index(windows)
+
+        replacement = make_window(0, 10, fingerprint="REPLACED")
+        windows[0] = replacement
+        rebuilt = engine._guard_index(windows)
+
+        assert rebuilt is not index
+        assert rebuilt.windows[0] is replacement
+
+    def test_window_sessions_are_frozen(self, make_window, make_session):
+        """Observed sessions are snapshotted, matching the packed arrays"""
+        sessions = [make_session(0, 5)]
+        window = make_window(0, 10, sessions)
+        sessions.append(make_session(5, 9))
+
+        assert isinstance(window.observed_sessions, tuple)
+        assert len(window.observed_sessions) == len(window._session_starts) == 1
+
+    def test_guard_index_layout(self, windows):
+        """Windows pack into per-window arrays and a sliced timing batch"""
+        index = GuardIndex.build(windows)
+
+        assert len(index) == 5
+        np.testing.assert_array_equal(index.end_us - index.start_us, [w._end_us - w._start_us for w in windows])
+        assert index.start_us.dtype == np.int64
+        np.testing.assert_array_equal(index.is_guard, [True, False, True, True, True])
+        assert index.bandwidths[0] == 1e6
+        assert np.isnan(index.bandwidths[1:]).all()
+        assert len(index.timing) == 1
+        np.testing.assert_array_equal(index.timing_offsets, [0, 1, 1, 1, 1, 1])
+
+    def test_weak_guards_pruned_without_changing_top_k(self, observation, make_session, make_window):
+        """Guards that cannot reach the top-K skip the remaining evidence"""
+        rng = np.random.default_rng(3)
+        windows = []
+        for k in range(40):
+            start = float(rng.uniform(0, 120))
+            sessions = [make_session(start, start + float(rng.uniform(20, 200)), f"s{k}",
+                                     avg_packet_size=float(rng.uniform(50, 1500)))]
+            windows.append(make_window(0, 1000, sessions, fingerprint=f"G{k}",
+                                       bandwidth_bytes_per_sec=float(rng.choice([1.0, 1e6]))))
+
+        engine = ForensicCorrelationEngine()
+        everything = engine.correlate(observation, windows, max_hypotheses=len(windows))
+
+        calls = []
+        estimate = engine.lifetime_analyzer.estimate_circuit_lifetime
+        engine.lifetime_analyzer.estimate_circuit_lifetime = lambda *a: calls.append(a) or estimate(*a)
+        top = engine.correlate(observation, windows, max_hypotheses=3)
+
+        assert len(everything) == len(windows)
+        assert len(calls) < len(windows)
+        assert [h.guard_node_fingerprint for h in top] == [h.guard_node_fingerprint for h in everything[:3]]
+        assert [h.combined_evidence_weight for h in top] == [h.combined_evidence_weight for h in everything[:3]]
+
+    def test_hypotheses_share_generation_time(self, observation, windows):
+        """One correlate call stamps all its hypotheses with the same time"""
+        hypotheses = ForensicCorrelationEngine().correlate(observation, windows)
+
+        assert len(hypotheses) > 1
+        assert len({h.generated_at for h in hypotheses}) == 1
+
+    def test_correlate_prebuilt_matches_correlate(self, observation, windows):
+        """Prebuilt and on-the-fly indexes give the same hypotheses"""
+        engine = ForensicCorrelationEngine()
+        direct = engine.correlate(observation, windows)
+        prebuilt = engine.correlate_prebuilt(observation, GuardIndex.build(windows))
+
+        assert [h.guard_node_fingerprint for h in prebuilt] == [h.guard_node_fingerprint for h in direct]
+        assert [h.combined_evidence_weight for h in prebuilt] == [h.combined_evidence_weight for h in direct]
+
+    def test_correlate_batch_parallel_matches_serial(self, observation, windows, make_session):
+        """Thread-pooled batches return the same hypotheses, in order"""
+        observations = [observation] + [
+            ExitObservation(
+                observation_id=f"obs{k}",
+                exit_fingerprint="EXIT1",
+                exit_nickname="exit1",
+                observed_session=make_session(100 + 40 * k, 250 + 40 * k, f"exit{k}"),
+            )
+            for k in range(2, 8)
+        ]
+        engine = ForensicCorrelationEngine()
+        serial = engine.correlate_batch(observations, windows, parallel=False)
+        threaded = engine.correlate_batch(observations, windows, parallel=True, max_workers=4)
+
+        assert list(threaded) == list(serial) == [o.observation_id for o in observations]
+        for obs_id, hypotheses in serial.items():
+            assert [h.guard_node_fingerprint for h in threaded[obs_id]] == [
+                h.guard_node_fingerprint for h in hypotheses
+            ]
+            assert [h.combined_evidence_weight for h in threaded[obs_id]] == [
+                h.combined_evidence_weight for h in hypotheses
+            ]
+
+    def test_correlate_batch_serial_by_default(self, observation, windows, monkeypatch):
+        """No thread pool unless parallel=True is requested"""
+        from backend.app import correlator
+
+        def no_pool(*args, **kwargs):
+            raise AssertionError("thread pool created")
+
+        monkeypatch.setattr(correlator, "ThreadPoolExecutor", no_pool)
+        second = ExitObservation(
+            observation_id="obs2",
+            exit_fingerprint="EXIT1",
+            exit_nickname="exit1",
+            observed_session=observation.observed_session,
+        )
+
+        results = ForensicCorrelationEngine().correlate_batch([observation, second], windows)
+
+        assert list(results) == [observation.observation_id, "obs2"]
+
+    def test_correlate_returns_top_k_by_weight(self, observation, make_session, make_window):
+        """Only the strongest max_hypotheses survive, strongest first"""
+        windows = [
+            make_window(0, 1000, [make_session(100 - k, 200 + k, f"s{k}", avg_packet_size=100.0 * k)],
+                        fingerprint=f"G{k}")
+            for k in range(1, 9)
+        ]
+        engine = ForensicCorrelationEngine()
+        everything = engine.correlate(observation, windows, max_hypotheses=len(windows))
+        top = engine.correlate(observation, windows, max_hypotheses=3)
+
+        weights = [h.combined_evidence_weight for h in everything]
+        assert weights == sorted(weights, reverse=True)
+        assert [h.guard_node_fingerprint for h in top] == [
+            h.guard_node_fingerprint for h in everything[:3]
+        ]
+
+
+class TestCorrelateExitTraffic:
+    """Test the high-level correlate_exit_traffic API"""
+
+    def test_top_results_ranked_by_net_weight(self, monkeypatch, ipt_list):
+        from backend.app import correlator
+        monkeypatch.setattr(correlator, "get_database", lambda: None)
+
+        base = datetime(2024, 1, 1)
+        sessions = [
+            {
+                "session_id": f"s{k}",
+                "start_time": (base + timedelta(seconds=100 + 30 * k)).isoformat(),
+                "end_time": (base + timedelta(seconds=300 + 30 * k)).isoformat(),
+                "packet_count": 50,
+                "total_bytes": 25_000,
+                "avg_packet_size": 500.0,
+                "inter_packet_times_ms": ipt_list,
+            }
+            for k in range(3)
+        ]
+        guards = [
+            {
+                "fingerprint": f"G{k}",
+                "nickname": f"g{k}",
+                "first_seen": base.isoformat(),
+                "last_seen": (base + timedelta(seconds=1000 + 100 * k)).isoformat(),
+                "advertised_bandwidth": 1e6,
+                "flags": ["Guard", "Running"],
+            }
+            for k in range(4)
+        ]
+
+        results = correlator.correlate_exit_traffic(sessions, {"fingerprint": "EXIT"}, guards, max_hypotheses=5)
+
+        assert len(results) == 5
+        assert all("_combined_w" not in d for d in results)
+        net = [
+            sum(e["weight"] * (1 if e["supports_hypothesis"] else -1) for e in d["evidence_summary"])
+            for d in results
+        ]
+        assert net == sorted(net, reverse=True)
+
+        everything = correlator.correlate_exit_traffic(sessions, {"fingerprint": "EXIT"}, guards, max_hypotheses=100)
+        assert [d["guard_node_fingerprint"] for d in results] == [
+            d["guard_node_fingerprint"] for d in everything[:5]
+        ]
+        assert correlator.correlate_exit_traffic(sessions, {"fingerprint": "EXIT"}, guards, max_hypotheses=0) == []
+
+    def test_engine_is_shared_unless_given(self, monkeypatch):
+        from backend.app import correlator
+        monkeypatch.setattr(correlator, "get_database", lambda: None)
+        monkeypatch.setattr(correlator, "_DEFAULT_ENGINE", None)
+
+        calls = []
+
+        class RecordingEngine(ForensicCorrelationEngine):
+            def correlate(self, *args, **kwargs):
+                calls.append(self)
+                return super().correlate(*args, **kwargs)
+
+        session = {"start_time": "2024-01-01T00:01:00", "end_time": "2024-01-01T00:02:00"}
+        guard = {"fingerprint": "G", "first_seen": "2024-01-01T00:00:00",
+                 "last_seen": "2024-01-01T01:00:00", "flags": ["Guard"]}
+        own = RecordingEngine()
+        correlator.correlate_exit_traffic([session], {}, [guard], engine=own)
+        assert calls == [own]
+
+        assert correlator._get_engine() is correlator._get_engine()
+        assert correlator._DEFAULT_ENGINE is not own
+
+    def test_guard_query_projects_window_fields(self, monkeypatch):
+        from backend.app import correlator
+
+        relays = _FakeCollection([{"fingerprint": "G", "is_guard": True, "running": True}])
+        monkeypatch.setattr(correlator, "get_database", lambda: _FakeDB(relays=relays))
+
+        correlator.correlate_exit_traffic([], {"fingerprint": "EXIT"})
+
+        ((_, query, projection),) = relays.finds()
+        assert query == {"is_guard": True, "running": True}
+        assert projection["_id"] == 0
+        assert {"fingerprint", "first_seen", "last_seen", "advertised_bandwidth", "flags"} <= set(projection)
+
+
+class TestBulkParsing:
+    """Test batched datetime parsing for relay documents"""
+
+    def test_batch_parse_matches_parse_datetime(self):
+        from backend.app.correlator import _batch_parse_dt, parse_datetime
+
+        values = ["2024-01-01 12:00:00", "2024-01-01T12:00:00.250000", None, "garbage",
+                  datetime(2024, 3, 1, 8, 30)]
+        parsed = _batch_parse_dt(values).astype(object)
+
+        assert parsed[0] == parse_datetime(values[0])
+        assert parsed[1] == parse_datetime(values[1])
+        assert parsed[2] is None and parsed[3] is None
+        assert parsed[4] == values[4]
+
+    def test_batch_parse_normalises_offsets_to_utc(self):
+        from backend.app.correlator import _batch_parse_dt
+
+        parsed = _batch_parse_dt(["2024-01-01T12:00:00+02:00", "Jan 2 2024 10:00"]).astype(object)
+
+        assert parsed[0] == datetime(2024, 1, 1, 10, 0)
+        assert parsed[1] == datetime(2024, 1, 2, 10, 0)
+
+    @pytest.mark.parametrize("value", ["now", "today", "2024", "2024-01", "2024-01-01T12:00:00Z"])
+    def test_batch_parse_only_sends_strict_iso_to_numpy(self, value):
+        from backend.app.correlator import _batch_parse_dt, _naive_utc, parse_datetime
+
+        (parsed,) = _batch_parse_dt([value]).astype(object)
+
+        assert parsed == _naive_utc(parse_datetime(value))
+
+    def test_batch_parse_rejects_relative_words(self):
+        from backend.app.correlator import _batch_parse_dt
+
+        parsed = _batch_parse_dt(["now", "today", "2024-01-01"]).astype(object)
+
+        assert parsed[0] is None and parsed[1] is None
+        assert parsed[2] == datetime(2024, 1, 1)
+
+    def test_builders_agree_on_offset_timestamps(self):
+        from backend.app.correlator import build_guard_activity_window_from_relay, build_guard_windows_bulk
+
+        relay = {"fingerprint": "A", "first_seen": "2024-01-01T12:00:00+02:00",
+                 "last_seen": datetime(2024, 1, 2, 12, 0, tzinfo=timezone.utc)}
+        (bulk,) = build_guard_windows_bulk([relay])
+        single = build_guard_activity_window_from_relay(relay)
+
+        for window in (bulk, single):
+            assert window.window_start == datetime(2024, 1, 1, 10, 0)
+            assert window.window_end == datetime(2024, 1, 2, 12, 0)
+            assert window.window_start.tzinfo is None and window.window_end.tzinfo is None
+
+    def test_bulk_windows_match_single_builder(self):
+        from backend.app.correlator import build_guard_activity_window_from_relay, build_guard_windows_bulk
+
+        relays = [
+            {"fingerprint": "A", "first_seen": "2024-01-01 00:00:00", "last_seen": "2024-01-05 06:00:00",
+             "advertised_bandwidth": 1e6, "flags": ["Guard"]},
+            {"fingerprint": "B", "first_seen": "2023-12-31 23:00:00", "last_seen": "2024-01-02 00:00:00"},
+        ]
+        bulk = build_guard_windows_bulk(relays)
+
+        for relay, window in zip(relays, bulk):
+            single = build_guard_activity_window_from_relay(relay)
+            assert window.relay_fingerprint == single.relay_fingerprint
+            assert window.window_start == single.window_start
+            assert window.window_end == single.window_end
+            assert window.bandwidth_bytes_per_sec == single.bandwidth_bytes_per_sec
+            assert window.flags == single.flags
+
+    def test_builders_use_given_now(self):
+        from backend.app.correlator import (
+            build_exit_observation_from_pcap_session,
+            build_guard_activity_window_from_relay,
+            build_guard_windows_bulk,
+        )
+
+        now = datetime(2024, 6, 1, 12, 0)
+        (bulk,) = build_guard_windows_bulk([{"fingerprint": "A"}], now)
+        single = build_guard_activity_window_from_relay({"fingerprint": "A"}, now=now)
+        observation = build_exit_observation_from_pcap_session({}, {"fingerprint": "X"}, now)
+
+        for window in (bulk, single):
+            assert (window.window_start, window.window_end) == (now - timedelta(days=1), now)
+        assert observation.timestamp == now
+        assert observation.observed_session.start_time == observation.observed_session.end_time == now
+
+    def test_bulk_windows_default_missing_bounds(self):
+        from backend.app.correlator import build_guard_windows_bulk
+
+        (window,) = build_guard_windows_bulk([{"fingerprint": "A"}])
+
+        assert window.window_end - window.window_start == timedelta(days=1)
+
+
+class TestEngineCircuitLifetime:
+    """Test the circuit lifetime step of ForensicCorrelationEngine.correlate"""
+
+    @pytest.fixture
+    def observation(self, make_session):
+        return ExitObservation(
+            observation_id="obs1",
+            exit_fingerprint="EXIT1",
+            exit_nickname="exit1",
+            observed_session=make_session(100, 200, "exit"),
+        )
+
+    def test_uses_first_overlapping_session(self, observation, make_session, make_window):
+        """The first guard session touching the exit session is used"""
+        sessions = [make_session(0, 50, "before"), make_session(200, 300, "touching"),
+                    make_session(150, 250, "inside")]
+        (hypothesis,) = ForensicCorrelationEngine().correlate(observation, [make_window(0, 1000, sessions)])
+
+        expected, _ = CircuitLifetimeAnalyzer.estimate_circuit_lifetime(observation.observed_session, sessions[1])
+        assert hypothesis.circuit_lifetime_estimate_sec == expected
+
+    def test_no_overlapping_session(self, observation, make_session, make_window):
+        """Without an overlapping guard session no lifetime is estimated"""
+        window = make_window(0, 1000, [make_session(0, 50, "before"), make_session(500, 600, "after")])
+        (hypothesis,) = ForensicCorrelationEngine().correlate(observation, [window])
+
+        assert hypothesis.circuit_lifetime_estimate_sec is None
+        assert EvidenceType.CIRCUIT_LIFETIME_PLAUSIBILITY not in {
+            e.evidence_type for e in hypothesis.evidence_summary
+        }
+
+
+class _FakeCursor(list):
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        return _FakeCursor(self[:n])
+
+
+class _FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.calls = []
+
+    def find(self, query=None, projection=None, **kwargs):
+        self.calls.append(("find", query, projection or kwargs.get("projection")))
+        return _FakeCursor(
+            d for d in self.docs
+            if all(d.get(k) == v for k, v in (query or {}).items())
+        )
+
+    def finds(self):
+        return [call for call in self.calls if call[0] == "find"]
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return record
+
+
+class _FakeDB:
+    def __init__(self, **collections):
+        self.__dict__.update(collections)
+
+    def __getattr__(self, name):
+        collection = _FakeCollection()
+        setattr(self, name, collection)
+        return collection
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+class TestGenerateCandidatePaths:
+    """Test the legacy generate_candidate_paths helper"""
+
+    @staticmethod
+    def _relays():
+        docs = []
+        for k in range(40):
+            docs.append({"fingerprint": f"R{k}", "nickname": f"r{k}", "running": True,
+                         "is_guard": k < 35, "is_exit": k >= 15})
+        # Middles share fingerprints with guards/exits to exercise the filter
+        for k in range(35):
+            docs.append({"fingerprint": f"R{k}", "nickname": f"m{k}", "running": True,
+                         "is_guard": False, "is_exit": False})
+        return docs
+
+    @staticmethod
+    def _reference(guards, middles, exits):
+        paths = []
+        for g in guards[:30]:
+            for m in middles[:30]:
+                if g["fingerprint"] == m["fingerprint"]:
+                    continue
+                for x in exits[:20]:
+                    if x["fingerprint"] in {g["fingerprint"], m["fingerprint"]}:
+                        continue
+                    paths.append((g["fingerprint"], m["fingerprint"], x["fingerprint"]))
+        return paths[:500]
+
+    def test_matches_nested_loop_order(self, monkeypatch):
+        from backend.app import correlator
+
+        relays = _FakeCollection(self._relays())
+        db = _FakeDB(relays=relays)
+        monkeypatch.setattr(correlator, "get_database", lambda: db)
+
+        candidates = correlator.generate_candidate_paths()
+
+        guards = [d for d in relays.docs if d["is_guard"]]
+        middles = [d for d in relays.docs if not d["is_guard"] and not d["is_exit"]]
+        exits = [d for d in relays.docs if d["is_exit"]]
+        assert [(c["entry"], c["middle"], c["exit"]) for c in candidates] == self._reference(guards, middles, exits)
+        assert len(candidates) == 500
+        assert len({c["id"] for c in candidates}) == 500
+
+    def test_ids_are_deterministic(self, monkeypatch):
+        from backend.app import correlator
+
+        monkeypatch.setattr(correlator, "get_database", lambda: _FakeDB(relays=_FakeCollection(self._relays())))
+        first = [c["id"] for c in correlator.generate_candidate_paths()]
+        second = [c["id"] for c in correlator.generate_candidate_paths()]
+
+        assert first == second
+        assert first[0] == correlator._path_id("R0", "R1", "R15")
+
+    def test_replaces_stored_candidates(self, monkeypatch):
+        from backend.app import correlator
+
+        stored = _FakeCollection()
+        db = _FakeDB(relays=_FakeCollection(self._relays()), path_candidates=stored)
+        monkeypatch.setattr(correlator, "get_database", lambda: db)
+
+        candidates = correlator.generate_candidate_paths()
+
+        assert [name for name, *_ in stored.calls] == ["drop", "insert_many"]
+        _, args, kwargs = stored.calls[1]
+        assert args == (candidates,)
+        assert kwargs == {"ordered": False}
+
+    def test_relay_queries_project_path_fields(self, monkeypatch):
+        from backend.app import correlator
+
+        relays = _FakeCollection(self._relays())
+        db = _FakeDB(relays=relays)
+        monkeypatch.setattr(correlator, "get_database", lambda: db)
+
+        correlator.generate_candidate_paths()
+
+        assert len(relays.finds()) == 3
+        assert all(projection == {"fingerprint": 1, "nickname": 1, "_id": 0} for *_, projection in relays.finds())
+
+
+class TestCorrelatorIndexes:
+    """Test the relay/result index bootstrap"""
+
+    def test_indexes_created_once(self, monkeypatch):
+        from backend.app import correlator
+        monkeypatch.setattr(correlator, "_INDEXES_ENSURED", False)
+
+        db = _FakeDB()
+        correlator._ensure_indexes(db)
+        correlator._ensure_indexes(db)
+
+        relay_keys = [args[0] for name, args, _ in db.relays.calls if name == "create_index"]
+        assert relay_keys == [
+            [("is_guard", 1), ("running", 1), ("advertised_bandwidth", -1)],
+            [("is_exit", 1), ("running", 1), ("advertised_bandwidth", -1)],
+        ]
+        ((name, args, kwargs),) = db.correlation_results.calls
+        assert args == ([("investigation_id", 1)],) and kwargs["unique"]
+
+    def test_index_errors_are_logged(self, monkeypatch, caplog):
+        from backend.app import correlator
+        monkeypatch.setattr(correlator, "_INDEXES_ENSURED", False)
+
+        class FailingCollection(_FakeCollection):
+            def create_index(self, *args, **kwargs):
+                raise RuntimeError("duplicate key")
+
+        db = _FakeDB(correlation_results=FailingCollection())
+        correlator._ensure_indexes(db)
+
+        assert len([c for c in db.relays.calls if c[0] == "create_index"]) == 2
+        assert "idx_investigation_id" in caplog.text
+
+    def test_failed_indexes_are_retried(self, monkeypatch):
+        from backend.app import correlator
+        monkeypatch.setattr(correlator, "_INDEXES_ENSURED", False)
+
+        class FailingCollection(_FakeCollection):
+            def create_index(self, *args, **kwargs):
+                raise RuntimeError("no server")
+
+        correlator._ensure_indexes(_FakeDB(correlation_results=FailingCollection()))
+        assert not correlator._INDEXES_ENSURED
+
+        db = _FakeDB()
+        correlator._ensure_indexes(db)
+        assert correlator._INDEXES_ENSURED
+        assert [name for name, *_ in db.correlation_results.calls] == ["create_index"]
+
+
+class TestStoreCorrelationResults:
+    """Test persisting correlation results"""
+
+    def test_repeated_id_upserts(self, monkeypatch):
+        """A caller-supplied id that already exists replaces its record"""
+        from backend.app import correlator
+        monkeypatch.setattr(correlator, "_INDEXES_ENSURED", True)
+        db = _FakeDB()
+        monkeypatch.setattr(correlator, "get_database", lambda: db)
+
+        assert correlator.store_correlation_results([{"rank": 1}], "INV-1") == "INV-1"
+        assert correlator.store_correlation_results([], "INV-1") == "INV-1"
+
+        calls = db.correlation_results.calls
+        assert [name for name, *_ in calls] == ["replace_one", "replace_one"]
+        _, (query, record), kwargs = calls[1]
+        assert query == {"investigation_id": "INV-1"}
+        assert record["hypothesis_count"] == 0
+        assert kwargs == {"upsert": True}
+
+    def test_generates_id_when_missing(self, monkeypatch):
+        from backend.app import correlator
+        monkeypatch.setattr(correlator, "_INDEXES_ENSURED", True)
+        db = _FakeDB()
+        monkeypatch.setattr(correlator, "get_database", lambda: db)
+
+        investigation_id = correlator.store_correlation_results([])
+
+        _, (query, record), _ = db.correlation_results.calls[0]
+        assert query == {"investigation_id": investigation_id}
+        assert record["investigation_id"] == investigation_id
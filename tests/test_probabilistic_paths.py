@@ -217,6 +217,73 @@ class TestGuardHypothesis:
         assert "EXIT1" in hyp.exit_nodes_seen
         assert "EXIT2" in hyp.exit_nodes_seen
     
+    def test_exit_nodes_seen_tracks_appends(self):
+        """Exit set stays current as observations are appended between reads"""
+        hyp = GuardHypothesis(
+            hypothesis_id="hyp-001",
+            guard_fingerprint="GUARD123",
+            guard_nickname="TestGuard",
+            prior_probability=0.1,
+            likelihood=1.0,
+            posterior_probability=0.1,
+        )
+        
+        def observe(exit_fp):
+            hyp.exit_observations.append(ExitObservation(
+                observation_id=f"obs-{exit_fp}",
+                exit_fingerprint=exit_fp,
+                exit_nickname=exit_fp,
+                timestamp=datetime.utcnow(),
+            ))
+        
+        assert hyp.exit_nodes_seen == set()
+        observe("EXIT1")
+        assert hyp.exit_nodes_seen == {"EXIT1"}
+        observe("EXIT2")
+        observe("EXIT1")
+        assert hyp.exit_nodes_seen == {"EXIT1", "EXIT2"}
+        
+        # Replacing the history rebuilds the index
+        hyp.exit_observations = hyp.exit_observations[:1]
+        assert hyp.exit_nodes_seen == {"EXIT1"}
+        
+        # ...even when the new list is no shorter than the indexed one
+        hyp.exit_observations = []
+        observe("EXIT3")
+        assert hyp.exit_nodes_seen == {"EXIT3"}
+        hyp.exit_observations = [
+            ExitObservation(observation_id=f"obs-{fp}", exit_fingerprint=fp,
+                            exit_nickname=fp, timestamp=datetime.utcnow())
+            for fp in ("EXIT4", "EXIT5")
+        ]
+        assert hyp.exit_nodes_seen == {"EXIT4", "EXIT5"}
+    
+    def test_exit_nodes_seen_is_a_snapshot(self):
+        """Callers cannot corrupt the cached exit index through the property"""
+        hyp = GuardHypothesis(
+            hypothesis_id="hyp-001",
+            guard_fingerprint="GUARD123",
+            guard_nickname="TestGuard",
+            prior_probability=0.1,
+            likelihood=1.0,
+            posterior_probability=0.1,
+        )
+        hyp.exit_observations.append(ExitObservation(
+            observation_id="obs-1",
+            exit_fingerprint="EXIT1",
+            exit_nickname="exit1",
+            timestamp=datetime.utcnow(),
+        ))
+        
+        seen = hyp.exit_nodes_seen
+        assert isinstance(seen, frozenset)
+        with pytest.raises(AttributeError):
+            seen.add("EXIT2")
+        
+        assert hyp.has_seen_exit("EXIT1")
+        assert not hyp.has_seen_exit("EXIT2")
+        assert hyp.exit_node_count == 1
+    
     def test_observation_span(self):
         """Test observation time span calculation"""
         hyp = GuardHypothesis(
@@ -439,6 +506,22 @@ class TestBayesianHypothesisEngine:
         for i in range(len(ranked) - 1):
             assert ranked[i].hypothesis.posterior_probability >= ranked[i+1].hypothesis.posterior_probability
     
+    def test_prune_and_rank_keep_top_by_posterior(self, config):
+        """Capped pruning and ranking pick the same guards a stable sort would"""
+        config.MAX_ACTIVE_HYPOTHESES = 4
+        engine = BayesianHypothesisEngine(config)
+        posteriors = [0.05, 0.2, 0.1, 0.2, 0.02, 0.1, 0.3, 0.03]
+        for i, p in enumerate(posteriors):
+            engine.get_or_create_hypothesis(f"G{i}").posterior_probability = p
+        
+        expected = sorted(engine.hypotheses, key=lambda fp: engine.hypotheses[fp].posterior_probability, reverse=True)
+        engine._prune_hypotheses()
+        
+        assert set(engine.hypotheses) == set(expected[:4])
+        ranked = engine.get_ranked_hypotheses(top_k=3, include_explanations=False)
+        assert [r.hypothesis.guard_fingerprint for r in ranked] == expected[:3]
+        assert [r.rank for r in ranked] == [1, 2, 3]
+    
     def test_state_export_import(self, sample_guards, config):
         """Test state persistence"""
         engine = BayesianHypothesisEngine(config)
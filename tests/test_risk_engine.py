@@ -0,0 +1,152 @@
+# tests/test_risk_engine.py
+"""
+Regression tests for the relay risk scoring components.
+
+The table-driven scorers must give exactly the scores of the original
+threshold chains, which are kept here as reference implementations.
+"""
+
+import itertools
+
+import pytest
+
+from backend.app.risk_engine import (
+    BW_THRESHOLD_HIGH,
+    BW_THRESHOLD_LOW,
+    BW_THRESHOLD_MEDIUM,
+    _FLAG_BITS,
+    _FLAG_SCORES,
+    _score_bandwidth,
+    _score_flags,
+)
+
+SCORED_FLAGS = ("Exit", "Guard", "Stable", "Running", "Valid")
+
+
+# =============================================================================
+# REFERENCE IMPLEMENTATIONS
+# =============================================================================
+
+def _reference_bandwidth_score(bw):
+    """The original if/elif bandwidth tiers."""
+    if not bw or bw <= 0:
+        return 0.0
+    if bw < BW_THRESHOLD_LOW:
+        return (bw / BW_THRESHOLD_LOW) * 15.0
+    elif bw < BW_THRESHOLD_MEDIUM:
+        ratio = (bw - BW_THRESHOLD_LOW) / (BW_THRESHOLD_MEDIUM - BW_THRESHOLD_LOW)
+        return 15.0 + (ratio * 10.0)
+    elif bw < BW_THRESHOLD_HIGH:
+        ratio = (bw - BW_THRESHOLD_MEDIUM) / (BW_THRESHOLD_HIGH - BW_THRESHOLD_MEDIUM)
+        return 25.0 + (ratio * 10.0)
+    else:
+        capped_ratio = min((bw - BW_THRESHOLD_HIGH) / BW_THRESHOLD_HIGH, 1.0)
+        return 35.0 + (capped_ratio * 5.0)
+
+
+def _reference_flag_score(flags):
+    """The original set-membership flag scoring."""
+    if not flags:
+        return 0.0
+    flags = set(flags)
+    score = 0.0
+    if "Exit" in flags:
+        score += 28.0
+    if "Guard" in flags:
+        score += 18.0
+    if "Stable" in flags:
+        score += 3.0
+    if "Running" in flags and "Valid" in flags:
+        score += 2.0
+    if "Exit" in flags and "Guard" in flags:
+        score += 3.0
+    return min(score, 50.0)
+
+
+def _flag_subsets():
+    """Every subset of the scored flags."""
+    return [
+        combo
+        for n in range(len(SCORED_FLAGS) + 1)
+        for combo in itertools.combinations(SCORED_FLAGS, n)
+    ]
+
+
+# =============================================================================
+# BANDWIDTH
+# =============================================================================
+
+class TestScoreBandwidth:
+    """Test the binary-search bandwidth tiers"""
+
+    @pytest.mark.parametrize("bw, expected", [
+        (None, 0.0),
+        (0, 0.0),
+        (-5, 0.0),
+        (500_000, 7.5),
+        (BW_THRESHOLD_LOW, 15.0),
+        (BW_THRESHOLD_MEDIUM, 25.0),
+        (30_000_000, 30.0),
+        (BW_THRESHOLD_HIGH, 35.0),
+        (75_000_000, 37.5),
+        (2 * BW_THRESHOLD_HIGH, 40.0),
+        (10 * BW_THRESHOLD_HIGH, 40.0),
+    ])
+    def test_tier_points(self, bw, expected):
+        assert _score_bandwidth(bw) == pytest.approx(expected)
+
+    @pytest.mark.parametrize("threshold", [
+        BW_THRESHOLD_LOW, BW_THRESHOLD_MEDIUM, BW_THRESHOLD_HIGH, 2 * BW_THRESHOLD_HIGH,
+    ])
+    def test_matches_reference_around_thresholds(self, threshold):
+        for bw in (threshold - 1, threshold - 0.5, threshold, threshold + 0.5, threshold + 1):
+            assert _score_bandwidth(bw) == _reference_bandwidth_score(bw)
+
+    def test_matches_reference_across_range(self):
+        for bw in [1, 999, 1_234_567, 9_999_999.9, 49_999_999, 99_999_999, 100_000_001, 10**12]:
+            assert _score_bandwidth(bw) == _reference_bandwidth_score(bw)
+        for bw in range(0, 3 * BW_THRESHOLD_HIGH, 997_331):
+            assert _score_bandwidth(bw) == _reference_bandwidth_score(bw)
+
+
+# =============================================================================
+# FLAGS
+# =============================================================================
+
+class TestScoreFlags:
+    """Test the bitmask flag lookup table"""
+
+    def test_table_covers_every_mask(self):
+        assert set(_FLAG_BITS) == set(SCORED_FLAGS)
+        assert len(_FLAG_SCORES) == 1 << len(SCORED_FLAGS)
+
+    def test_table_values(self):
+        """Scores indexed by mask (Exit=1, Guard=2, Stable=4, Running=8, Valid=16)"""
+        assert _FLAG_SCORES == (
+            0, 28, 18, 49, 3, 31, 21, 50,
+            0, 28, 18, 49, 3, 31, 21, 50,
+            0, 28, 18, 49, 3, 31, 21, 50,
+            2, 30, 20, 50, 5, 33, 23, 50,
+        )
+
+    @pytest.mark.parametrize("flags", _flag_subsets(), ids=lambda f: "-".join(f) or "none")
+    def test_matches_reference_for_every_subset(self, flags):
+        assert _score_flags(flags) == _reference_flag_score(flags)
+        assert _score_flags(list(reversed(flags))) == _reference_flag_score(flags)
+
+    def test_unscored_and_repeated_flags(self):
+        flags = ["Fast", "Exit", "HSDir", "Exit", "V2Dir", "Guard"]
+        assert _score_flags(flags) == _reference_flag_score(flags) == 49.0
+        assert _score_flags(["Fast", "HSDir"]) == 0.0
+
+    @pytest.mark.parametrize("flags", [None, [], (), set()])
+    def test_empty_flags(self, flags):
+        assert _score_flags(flags) == 0.0
+
+    def test_accepts_any_iterable(self):
+        assert _score_flags({"Guard", "Stable"}) == 21.0
+        assert _score_flags(iter(["Running", "Valid"])) == 2.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -10,6 +10,7 @@ Tests for:
 - End-to-end correlation workflows
 """
 
+import numpy as np
 import pytest
 from datetime import datetime, timedelta
 from typing import List, Dict
@@ -20,6 +21,7 @@ import os
 # Add the backend directory to the path so we can import from app package
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
+from app import unified_confidence_engine
 from app.unified_confidence_engine import (
     UnifiedProbabilisticConfidenceEngine,
     TimeOverlapFactor,
@@ -31,7 +33,11 @@ from app.unified_confidence_engine import (
     ConfidenceLevel,
     FactorScore,
     GuardNodeCandidate,
-    ConfidenceEvolution
+    ConfidenceEvolution,
+    _time_overlap_kernel,
+    _time_overlap_kernel_numpy,
+    _bandwidth_similarity_kernel,
+    _bandwidth_similarity_kernel_numpy,
 )
 
 
@@ -202,6 +208,31 @@ class TestBandwidthSimilarityFactor:
         assert factor.validate()
 
 
+class TestBatchFactorKernels:
+    """The JIT kernels agree exactly with their NumPy fallbacks"""
+    
+    def test_time_overlap_kernel_matches_numpy(self):
+        rng = np.random.default_rng(7)
+        first = rng.integers(0, 10**13, 200).astype(np.int64)
+        last = first + rng.integers(-10**11, 10**12, 200)
+        args = (first, last, 4 * 10**12, 6 * 10**12, 2 * 10**6)
+        
+        for got, want in zip(_time_overlap_kernel(*args), _time_overlap_kernel_numpy(*args)):
+            np.testing.assert_array_equal(got, want)
+    
+    def test_bandwidth_kernel_matches_numpy(self):
+        rng = np.random.default_rng(11)
+        guard_bw = rng.uniform(-10, 500, 200)
+        guard_bw[:5] = 0.0
+        
+        got = _bandwidth_similarity_kernel(guard_bw, 100.0, 105.0)
+        want = _bandwidth_similarity_kernel_numpy(guard_bw, 100.0, 105.0)
+        valid = want[0]
+        np.testing.assert_array_equal(got[0], valid)
+        for g, w in zip(got[1:], want[1:]):
+            np.testing.assert_array_equal(g[valid], w[valid])
+
+
 # ============================================================================
 # HISTORICAL RECURRENCE FACTOR TESTS
 # ============================================================================
@@ -537,6 +568,199 @@ class TestUnifiedConfidenceEngine:
         # Should be sorted by composite_score descending
         assert candidates[0].composite_score >= candidates[1].composite_score
 
+    def test_rank_queries_exit_history_once(self, engine, sample_exit_node):
+        """Exit path count and tracking span are fetched once per ranking, not per guard"""
+        guards = [
+            {"fingerprint": f"G{i}", "nickname": f"g{i}", "country": "NL", "bandwidth_mbps": 50 + i}
+            for i in range(4)
+        ]
+        engine.db.relays.find = MagicMock(return_value=guards)
+        engine.db.path_candidates.count_documents = MagicMock(return_value=5)
+        engine.db.path_candidates.find_one = MagicMock(return_value={
+            "generated_at": "2025-11-21T10:00:00"
+        })
+
+        candidates = engine.rank_guard_candidates(sample_exit_node, "INV001", top_k=4)
+
+        assert len(candidates) == 4
+        exit_queries = [
+            c for c in engine.db.path_candidates.count_documents.call_args_list
+            if c.args[0] == {"exit.fingerprint": "EXIT001"}
+        ]
+        assert len(exit_queries) == 1
+        assert engine.db.path_candidates.count_documents.call_count == 1 + 2 * len(guards)
+        assert engine.db.path_candidates.find_one.call_count == 1
+
+    def test_rank_materializes_only_top_k(self, engine, sample_exit_node):
+        """Every guard is scored and recorded; only the top_k become candidates"""
+        guards = [
+            {"fingerprint": f"G{i}", "nickname": f"g{i}", "country": "NL", "bandwidth_mbps": bw}
+            for i, bw in enumerate([10, 95, 100, 40, 95])
+        ]
+        engine.db.relays.find = MagicMock(return_value=guards)
+        engine.db.path_candidates.count_documents = MagicMock(return_value=5)
+        engine.db.path_candidates.find_one = MagicMock(return_value=None)
+
+        with patch.object(engine, "_build_candidate", wraps=engine._build_candidate) as build:
+            candidates = engine.rank_guard_candidates(sample_exit_node, "INV001", top_k=2)
+
+        (ops,), _ = engine.db.confidence_evolution.bulk_write.call_args
+        assert len(ops) == len(guards)
+        assert build.call_count == 2
+        # G1, G2 and G4 tie on score; ties keep database order, as with a stable sort
+        assert [c.guard_fingerprint for c in candidates] == ["G1", "G2"]
+
+    def test_rank_parallel_matches_serial(self, engine, sample_exit_node):
+        """Thread-pool scoring returns the same ranking and history writes as the serial loop"""
+        guards = [
+            {"fingerprint": f"G{i}", "nickname": f"g{i}", "country": "NL" if i % 3 else "US",
+             "bandwidth_mbps": [95, 12, 0, 400, None, 100][i % 6],
+             "first_seen": f"2025-11-{1 + i % 28:02d}T00:00:00", "last_seen": "2025-12-20T00:00:00"}
+            for i in range(24)
+        ]
+        engine.db.relays.find = MagicMock(return_value=guards)
+        engine.db.path_candidates.count_documents = MagicMock(
+            side_effect=lambda query: len(query) + len(query.get("entry.fingerprint", ""))
+        )
+        engine.db.path_candidates.find_one = MagicMock(return_value=None)
+
+        def run(parallel):
+            engine.db.confidence_evolution.bulk_write.reset_mock()
+            ranked = engine.rank_guard_candidates(sample_exit_node, "INV001", top_k=8, parallel=parallel, max_workers=4)
+            (ops,), _ = engine.db.confidence_evolution.bulk_write.call_args
+            dicts = [c.to_dict() for c in ranked]
+            for d in dicts:
+                d.pop("last_updated")
+            return dicts, [op._filter["guard_fingerprint"] for op in ops]
+
+        serial = run(False)
+        assert run(True) == serial
+        # Guards with non-numeric bandwidth fail and are skipped either way
+        assert len(serial[1]) == 20
+
+    def test_rank_reuses_shared_pool(self, engine, sample_exit_node):
+        """Calls without max_workers share one module-level pool"""
+        guards = [{"fingerprint": f"G{i}", "nickname": f"g{i}", "bandwidth_mbps": 50} for i in range(4)]
+        engine.db.relays.find = MagicMock(return_value=guards)
+        engine.db.path_candidates.count_documents = MagicMock(return_value=0)
+        engine.db.path_candidates.find_one = MagicMock(return_value=None)
+
+        with patch.object(unified_confidence_engine, "_SCORING_POOL", None), \
+                patch.object(unified_confidence_engine, "ThreadPoolExecutor",
+                             wraps=unified_confidence_engine.ThreadPoolExecutor) as pool_cls:
+            first = engine.rank_guard_candidates(sample_exit_node, "INV001")
+            second = engine.rank_guard_candidates(sample_exit_node, "INV001")
+
+        assert pool_cls.call_count == 1
+        assert [c.guard_fingerprint for c in first] == [c.guard_fingerprint for c in second]
+
+    def test_rank_projects_guard_fields(self, engine, sample_exit_node):
+        """The guard query only pulls the fields the factors read"""
+        engine.db.relays.find = MagicMock(return_value=[])
+
+        engine.rank_guard_candidates(sample_exit_node, "INV001")
+
+        (query, projection), _ = engine.db.relays.find.call_args
+        assert query == {"is_guard": True}
+        assert projection["_id"] == 0
+        assert {k for k, v in projection.items() if v} == {
+            "fingerprint", "nickname", "country", "city", "asn",
+            "bandwidth_mbps", "first_seen", "last_seen"
+        }
+
+    def test_rank_batches_confidence_history_writes(self, engine, sample_exit_node):
+        """All pairs of a ranking are upserted in one unordered bulk_write"""
+        guards = [{"fingerprint": f"G{i}", "nickname": f"g{i}", "bandwidth_mbps": 50} for i in range(3)]
+        engine.db.relays.find = MagicMock(return_value=guards)
+        engine.db.path_candidates.count_documents = MagicMock(return_value=5)
+        engine.db.path_candidates.find_one = MagicMock(return_value=None)
+
+        engine.rank_guard_candidates(sample_exit_node, "INV001", top_k=3)
+
+        evolution = engine.db.confidence_evolution
+        assert evolution.bulk_write.call_count == 1
+        (ops,), kwargs = evolution.bulk_write.call_args
+        assert kwargs == {"ordered": False}
+        assert [op._filter["guard_fingerprint"] for op in ops] == ["G0", "G1", "G2"]
+        assert all(op._upsert for op in ops)
+        evolution.find_one.assert_not_called()
+        evolution.update_one.assert_not_called()
+        evolution.insert_one.assert_not_called()
+
+    def test_store_confidence_evolution_is_single_upsert(self, engine):
+        """A pair's observation is appended with one upsert, no read first"""
+        factors = [FactorScore("Time Overlap", 0.5, 0.25, "r")]
+
+        engine._store_confidence_evolution("G1", "EXIT001", "INV001", 0.5, factors)
+
+        evolution = engine.db.confidence_evolution
+        evolution.find_one.assert_not_called()
+        (query, update), kwargs = evolution.update_one.call_args
+        assert query == {"guard_fingerprint": "G1", "exit_fingerprint": "EXIT001", "investigation_id": "INV001"}
+        assert kwargs == {"upsert": True}
+        assert update["$inc"] == {"observation_count": 1}
+        assert update["$push"]["confidence_scores"] == 0.5
+
+    def test_parse_datetime_formats(self, engine):
+        """ISO strings take the fromisoformat path; other formats still parse"""
+        fallback = datetime(2000, 1, 1)
+
+        assert engine._parse_datetime("2025-12-01 10:00:00") == datetime(2025, 12, 1, 10, 0)
+        assert engine._parse_datetime("2025-12-01T10:00:00Z").utcoffset() == timedelta(0)
+        assert engine._parse_datetime("Dec 1 2025 10:00", fallback) == datetime(2025, 12, 1, 10, 0)
+        assert engine._parse_datetime("not a date", fallback) == fallback
+
+    def test_parse_datetime_reuses_parsed_strings(self, engine):
+        """Repeated relay timestamps are parsed once across calls"""
+        from app.unified_confidence_engine import _parse_timestamp
+
+        _parse_timestamp.cache_clear()
+        for _ in range(3):
+            engine._parse_datetime("2025-12-01T10:00:00")
+        engine._parse_datetime("2025-12-02T10:00:00")
+
+        info = _parse_timestamp.cache_info()
+        assert (info.hits, info.misses) == (2, 2)
+
+    def test_rank_matches_pairwise_scoring(self, engine, sample_exit_node):
+        """Batched factor scoring in rank gives the same candidates as the pairwise path"""
+        guards = [
+            {"fingerprint": "G1", "nickname": "g1", "country": "NL", "asn": "AS3352",
+             "bandwidth_mbps": 95.0, "first_seen": "2025-11-01T10:00:00", "last_seen": "2025-12-21T15:00:00"},
+            {"fingerprint": "G2", "nickname": "g2", "country": "US", "bandwidth_mbps": 12,
+             "first_seen": "2025-12-10T00:00:00", "last_seen": "2025-12-15T06:30:00"},
+            {"fingerprint": "G3", "nickname": "g3", "country": "DE", "bandwidth_mbps": 0,
+             "first_seen": "2024-01-01T00:00:00", "last_seen": "2024-02-01T00:00:00"},
+            {"fingerprint": "G4", "nickname": "g4", "country": "NL", "city": "Rotterdam",
+             "bandwidth_mbps": 400, "first_seen": "2025-12-21T14:00:00", "last_seen": "2026-01-05T00:00:00"},
+            {"fingerprint": "G5", "nickname": "g5", "country": "FR", "bandwidth_mbps": None,
+             "first_seen": "2025-12-01T00:00:00", "last_seen": "2025-12-02T00:00:00"},
+        ]
+        engine.db.relays.find = MagicMock(return_value=guards)
+        engine.db.path_candidates.count_documents = MagicMock(return_value=5)
+        engine.db.path_candidates.find_one = MagicMock(return_value={
+            "generated_at": "2025-11-21T10:00:00"
+        })
+
+        ranked = engine.rank_guard_candidates(sample_exit_node, "INV001", top_k=10)
+
+        expected = []
+        for guard in guards:
+            try:
+                expected.append(engine.correlate_guard_exit_pair(sample_exit_node, guard, "INV001"))
+            except TypeError:
+                continue
+        expected.sort(key=lambda c: c.composite_score, reverse=True)
+
+        def strip(candidate):
+            d = candidate.to_dict()
+            d.pop("last_updated")
+            return d
+
+        assert [c.guard_fingerprint for c in ranked] == [c.guard_fingerprint for c in expected]
+        assert [strip(c) for c in ranked] == [strip(c) for c in expected]
+        assert [c.composite_score for c in ranked] == [c.composite_score for c in expected]
+
 
 # ============================================================================
 # RUN TESTS